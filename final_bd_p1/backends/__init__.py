@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Motores de almacenamiento detrás de db.py (se elige con DB_BACKEND):
+- mysql: servidor MySQL vía mysql.connector (por defecto)
+- sqlite: SQLite embebido en el proceso, sin servidor ni viajes de red
+Cada motor expone la misma interfaz mínima que usa db.py:
+- NOMBRE, Error, PoolError y PARTICIONES (soporta particionado/retención)
+- connect(): conexión con la API de mysql.connector (cursor(dictionary=True), commit, ping, ...)
+- kill_query(conn, connection_id), writer_connection(), reserve_ids(conn, cur, ...) y columns(cur)
+"""  # Docstring: contrato de los motores
+
+import importlib  # Carga del motor elegido (solo se importa su driver)
+
+MOTORES = ("mysql", "sqlite")  # Motores disponibles
+
+
+def cargar(nombre: str):
+    """Devuelve el módulo del motor 'nombre'; ValueError si no existe."""
+    if nombre not in MOTORES:
+        raise ValueError(f"DB_BACKEND no soportado: {nombre} (opciones: {', '.join(MOTORES)})")
+    return importlib.import_module(f"backends.{nombre}")
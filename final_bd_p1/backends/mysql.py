@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Motor MySQL (DB_BACKEND=mysql, por defecto):
+- Conexiones con mysql.connector usando la config global
+- KILL QUERY para interrumpir la sentencia de otra conexión
+- Reserva de IDs con LAST_INSERT_ID(expr) y esquema leído de information_schema
+"""  # Docstring: responsabilidades del módulo
+
+from typing import List, Tuple  # Tipos auxiliares
+
+import mysql.connector  # Driver MySQL
+from mysql.connector import Error  # Tipo de error específico
+from mysql.connector.errors import PoolError  # Error de pool agotado
+
+from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME  # Config global
+
+NOMBRE = "mysql"
+PARTICIONES = True  # Particionado por mes y retención (modules/retencion.py)
+
+
+def connect():
+    """Abre una conexión a MySQL. Lanza Error si no puede conectar."""
+    return mysql.connector.connect(
+        host=DB_HOST,       # Host DB
+        port=DB_PORT,       # Puerto
+        user=DB_USER,       # Usuario
+        password=DB_PASSWORD,  # Contraseña
+        database=DB_NAME,   # Base de datos
+    )
+
+
+def kill_query(conn, connection_id: int) -> None:
+    """Interrumpe la sentencia en curso de la conexión 'connection_id' (KILL QUERY desde 'conn')."""
+    cur = conn.cursor()
+    try:
+        cur.execute("KILL QUERY %s", (connection_id,))
+    except Error:
+        pass  # La sentencia ya terminó o la conexión ya no existe
+    finally:
+        cur.close()
+
+
+def writer_connection():
+    """Bloqueos por fila: la reserva de IDs siempre usa una conexión propia del pool."""
+    return None
+
+
+def reserve_ids(conn, cur, table: str, pk_col: str, size: int) -> int:
+    """Suma 'size' a la secuencia de 'table' y devuelve el primer ID reservado."""
+    # LAST_INSERT_ID(expr) deja el nuevo tope en lastrowid: un solo round trip
+    sql = "UPDATE secuencias SET siguiente = LAST_INSERT_ID(siguiente + %s) WHERE nombre = %s"
+    cur.execute(sql, (size, table))
+    if cur.rowcount == 0:  # Secuencia aún no sembrada: parte de MAX(pk) una única vez
+        cur.execute(
+            f"INSERT IGNORE INTO secuencias (nombre, siguiente) "
+            f"SELECT %s, COALESCE(MAX({pk_col}), 0) + 1 FROM {table}",
+            (table,),
+        )
+        cur.execute(sql, (size, table))
+    return int(cur.lastrowid) - size  # Primer ID del bloque
+
+
+def columns(cur) -> List[Tuple[str, str]]:
+    """Pares (tabla, columna) de la BD actual, en una consulta."""
+    cur.execute(
+        "SELECT TABLE_NAME AS tabla, COLUMN_NAME AS columna FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE()"
+    )
+    return [(row["tabla"], row["columna"]) for row in cur.fetchall()]
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Motor SQLite embebido (DB_BACKEND=sqlite): la app corre en proceso, sin servidor MySQL.
+- Conexión con la misma interfaz de mysql.connector que usan db.py y modules/ (cursor(dictionary=True), ping, ...)
+- Traduce al vuelo el dialecto MySQL de modules/: %s, FOR UPDATE, INSERT IGNORE, ON DUPLICATE KEY UPDATE, SET @var
+- Registra en cada conexión las funciones MySQL que usan las consultas (TO_DAYS, INET6_ATON, IF, CONCAT, ...)
+- Crea el esquema de scripts_sql/seguridad_sqlite.sql (tablas, datos de ejemplo y triggers) si la BD está vacía
+- Un solo escritor a la vez: WAL para que las lecturas no esperen y busy_timeout para las escrituras
+"""  # Docstring: responsabilidades del módulo
+
+import atexit     # Borrado de la BD temporal (':memory:')
+import ipaddress  # INET6_ATON / INET6_NTOA
+import itertools  # Identificadores de conexión
+import logging    # Fallos al conservar el tope de una secuencia
+import os         # Ruta del script de esquema
+import random     # RAND()
+import re         # Traducción del dialecto MySQL
+import shutil     # Borrado de la BD temporal
+import sqlite3    # Driver (biblioteca estándar)
+import tempfile   # Carpeta de la BD temporal
+import threading  # Lock de inicialización y conexión de escritura por hilo
+import weakref    # Registro de conexiones para kill_query
+from datetime import date, datetime  # Adaptadores y CURDATE()/NOW()
+from functools import lru_cache, partial  # Memo de traducciones y acciones tras rollback
+from typing import Any, Callable, Dict, List, Optional, Tuple  # Tipos auxiliares
+
+from config import SQLITE_PATH, SQLITE_BUSY_TIMEOUT  # Config del motor
+
+log = logging.getLogger(__name__)
+
+NOMBRE = "sqlite"
+PARTICIONES = False  # Sin particionado: la retención de modules/retencion.py requiere MySQL
+
+Error = sqlite3.Error  # Base de los errores del driver
+
+
+class PoolError(Error):
+    """Pool agotado (equivalente a mysql.connector.errors.PoolError)."""
+
+
+ESQUEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "scripts_sql", "seguridad_sqlite.sql")  # Tablas, datos de ejemplo y triggers
+
+_TEMPORAL = SQLITE_PATH == ":memory:"  # BD descartable del proceso (pruebas, benchmarks)
+_ruta: Optional[str] = None            # Archivo efectivo (se resuelve al inicializar)
+
+sqlite3.register_adapter(date, date.isoformat)                           # Fechas como 'YYYY-MM-DD' (comparables como texto)
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(" "))
+sqlite3.register_converter("DATE", lambda v: date.fromisoformat(v.decode()[:10]))  # Columnas DATE vuelven como date, igual que en MySQL
+
+
+# ============================
+# Traducción del dialecto MySQL
+# ============================
+
+_LITERALES = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|/\*.*?\*/|--[^\n]*)", re.S)  # Literales y comentarios: se separan para no tocar su contenido
+_SET_VARIABLE = re.compile(r"^\s*SET\s+@(\w+)\s*=\s*(.+?)\s*;?\s*$", re.I | re.S)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\s*;?\s*$", re.I)
+_INSERT_IGNORE = re.compile(r"\bINSERT\s+IGNORE\b", re.I)
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_COLUMNA = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.I)
+_MARCADORES = re.compile(r"%([s%])")
+
+
+@lru_cache(maxsize=1024)
+def _traducir(sql: str, con_parametros: bool) -> Tuple[str, bool]:
+    """
+    Devuelve (sql para SQLite, bloquear). 'bloquear' indica que venía con FOR UPDATE:
+    SQLite no bloquea filas, así que se toma el bloqueo de escritura antes de leer.
+    - SET @var = v / NULL: fila en 'variables_sesion' (solo la ve la transacción del escritor)
+    - INSERT IGNORE -> INSERT OR IGNORE; ON DUPLICATE KEY UPDATE ... VALUES(col) -> ON CONFLICT DO UPDATE ... excluded.col
+    - %s -> ? y %% -> % (solo con parámetros, como mysql.connector)
+    Las reescrituras solo tocan el SQL fuera de literales ('...', "...") y comentarios (/* */, --).
+    La división no se toca: entre enteros SQLite trunca y MySQL no, así que el SQL compartido
+    usa un operando decimal (100.0 * a / b) y da lo mismo en ambos motores.
+    """
+    m = _SET_VARIABLE.match(sql)
+    if m:
+        nombre, valor = m.groups()
+        if valor.upper() == "NULL":
+            sql = f"DELETE FROM variables_sesion WHERE nombre = '{nombre}'"
+        else:
+            sql = (f"INSERT INTO variables_sesion (nombre, valor) VALUES ('{nombre}', {valor}) "
+                   f"ON CONFLICT (nombre) DO UPDATE SET valor = excluded.valor")
+    partes = _LITERALES.split(sql)  # Índices impares: literales entre comillas y comentarios
+    bloquear = bool(_FOR_UPDATE.search(partes[-1]))
+    if bloquear:
+        partes[-1] = _FOR_UPDATE.sub("", partes[-1])
+    en_upsert = False
+    for i in range(0, len(partes), 2):
+        p = _INSERT_IGNORE.sub("INSERT OR IGNORE", partes[i])
+        if _ON_DUPLICATE.search(p):
+            en_upsert = True
+            p = _ON_DUPLICATE.sub("ON CONFLICT DO UPDATE SET", p)
+        if en_upsert:
+            p = _VALUES_COLUMNA.sub(r"excluded.\1", p)
+        if con_parametros:
+            p = _MARCADORES.sub(lambda c: "?" if c.group(1) == "s" else "%", p)
+        partes[i] = p
+    return "".join(partes), bloquear
+
+
+# ============================
+# Funciones MySQL
+# ============================
+
+def _fecha(valor) -> date:
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+
+def _to_days(valor) -> Optional[int]:
+    return None if valor is None else _fecha(valor).toordinal() + 365  # TO_DAYS = ordinal + 365
+
+
+def _inet6_aton(ip) -> Optional[bytes]:
+    try:
+        return ipaddress.ip_address(ip).packed
+    except (TypeError, ValueError):
+        return None  # Igual que MySQL: NULL si no es una IP válida
+
+
+def _inet6_ntoa(valor) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address(bytes(valor)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _concat(*valores) -> Optional[str]:
+    if any(v is None for v in valores):
+        return None  # MySQL: CONCAT con un NULL devuelve NULL
+    return "".join(str(v) for v in valores)
+
+
+def _registrar_funciones(conn) -> None:
+    conn.create_function("TO_DAYS", 1, _to_days, deterministic=True)
+    conn.create_function("INET6_ATON", 1, _inet6_aton, deterministic=True)
+    conn.create_function("INET6_NTOA", 1, _inet6_ntoa, deterministic=True)
+    conn.create_function("IF", 3, lambda condicion, si, no: si if condicion else no, deterministic=True)
+    conn.create_function("CONCAT", -1, _concat, deterministic=True)
+    conn.create_function("CURDATE", 0, lambda: date.today().isoformat())
+    conn.create_function("NOW", 0, lambda: datetime.now().isoformat(" ", "seconds"))
+    conn.create_function("RAND", -1, lambda *semilla: random.random())  # La semilla no se respeta
+
+
+# ============================
+# Conexión y cursor
+# ============================
+
+_hilo = threading.local()  # Conexión del hilo con una transacción de escritura abierta
+_conexiones: "weakref.WeakValueDictionary[int, Conexion]" = weakref.WeakValueDictionary()  # connection_id -> conexión
+_ids = itertools.count(1)
+
+
+def _fila_dict(cursor, fila) -> Dict[str, Any]:
+    return {col[0]: valor for col, valor in zip(cursor.description, fila)}
+
+
+class Cursor:
+    """Cursor con la interfaz de mysql.connector; traduce cada sentencia antes de ejecutarla."""
+
+    def __init__(self, conexion: "Conexion", dictionary: bool = False):
+        self._conexion = conexion
+        self._cursor = conexion._conn.cursor()
+        if dictionary:
+            self._cursor.row_factory = _fila_dict  # Filas como dicts, igual que cursor(dictionary=True)
+
+    def execute(self, sql: str, params=None) -> None:
+        self._conexion._ejecutar(self._cursor.execute, sql, params)
+
+    def executemany(self, sql: str, seq_params) -> None:
+        self._conexion._ejecutar(self._cursor.executemany, sql, list(seq_params))
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class Conexion:
+    """
+    Conexión SQLite con la interfaz de mysql.connector que usan db.py y modules/.
+    - cursor(dictionary=..., prepared=..., buffered=...): SQLite ya cachea las sentencias compiladas
+      por conexión, y las filas se leen bajo demanda (sin buffer del lado cliente)
+    - connection_id identifica la conexión para kill_query (interrupt)
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self.connection_id = next(_ids)  # Como CONNECTION_ID() de MySQL
+        self.unread_result = False        # Nunca quedan resultados pendientes en el protocolo
+        self._al_deshacer: List[Callable[[], None]] = []  # Acciones tras un rollback (ver reserve_ids)
+        _conexiones[self.connection_id] = self
+
+    def cursor(self, dictionary: bool = False, prepared: bool = False, buffered: Optional[bool] = None) -> Cursor:
+        return Cursor(self, dictionary)
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
+
+    def _ejecutar(self, metodo, sql: str, params) -> None:
+        sentencia, bloquear = _traducir(sql, params is not None)
+        try:
+            if bloquear and not self._conn.in_transaction:
+                self._conn.execute("BEGIN IMMEDIATE")  # SELECT ... FOR UPDATE: nadie escribe hasta el commit
+            metodo(sentencia, () if params is None else params)
+        except sqlite3.Error:
+            if not self._conn.in_transaction and self._al_deshacer:
+                self._deshecha()  # SQLite deshizo la transacción por su cuenta (p.ej. interrupt)
+            raise
+        if self._conn.in_transaction:
+            _hilo.escritora = self  # Ver writer_connection()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._al_deshacer.clear()
+        self._soltar()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+        self._deshecha()
+
+    def on_rollback(self, accion: Callable[[], None]) -> None:
+        """Ejecuta 'accion' si la transacción en curso se deshace (se olvida al confirmar)."""
+        self._al_deshacer.append(accion)
+
+    def _deshecha(self) -> None:
+        pendientes, self._al_deshacer = self._al_deshacer, []
+        self._soltar()
+        for accion in pendientes:
+            accion()
+
+    def _soltar(self) -> None:
+        if getattr(_hilo, "escritora", None) is self:
+            _hilo.escritora = None
+
+    def ping(self, reconnect: bool = False, attempts: int = 1, delay: int = 0) -> None:
+        """En proceso no hay red: solo verifica que la conexión siga abierta."""
+        self._conn.execute("SELECT 1")
+
+    def interrupt(self) -> None:
+        self._conn.interrupt()  # Seguro desde otro hilo
+
+    def close(self) -> None:
+        _conexiones.pop(self.connection_id, None)
+        self._conn.close()
+
+
+# ============================
+# Inicialización del esquema
+# ============================
+
+_init_lock = threading.Lock()
+
+
+def _sentencias(ruta: str):
+    """Sentencias completas del script (los triggers BEGIN ... END incluyen ';' internos)."""
+    buffer = ""
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            buffer += linea
+            if sqlite3.complete_statement(buffer):
+                yield buffer
+                buffer = ""
+
+
+def _inicializar() -> str:
+    """
+    Crea el esquema la primera vez que se abre una BD vacía (una vez por proceso) y devuelve la ruta.
+    Con SQLITE_PATH=':memory:' usa un archivo temporal que se borra al salir: cada conexión del
+    pool ve la misma BD, con el mismo bloqueo (WAL + busy_timeout) que un archivo normal.
+    """
+    global _ruta
+    if _ruta is not None:
+        return _ruta
+    with _init_lock:
+        if _ruta is not None:
+            return _ruta
+        ruta = SQLITE_PATH
+        if _TEMPORAL:
+            carpeta = tempfile.mkdtemp(prefix="seguridad_")
+            atexit.register(shutil.rmtree, carpeta, True)
+            ruta = os.path.join(carpeta, "seguridad.db")
+        conn = sqlite3.connect(ruta, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")  # Lectores sin esperar al escritor (persistente en el archivo)
+            conn.execute("BEGIN IMMEDIATE")  # Otro proceso que arranca a la vez espera aquí
+            try:
+                existe = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usuarios'"
+                ).fetchone()
+                if existe is None:
+                    for sentencia in _sentencias(ESQUEMA):
+                        conn.execute(sentencia)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        _ruta = ruta
+        return ruta
+
+
+def connect() -> Conexion:
+    """Abre una conexión a la BD SQLite (creando el esquema si está vacía)."""
+    conn = sqlite3.connect(
+        _inicializar(),
+        timeout=SQLITE_BUSY_TIMEOUT,             # Espera por el bloqueo de escritura
+        detect_types=sqlite3.PARSE_DECLTYPES,    # DATE -> date
+        check_same_thread=False,                 # La usa un hilo a la vez, pero no siempre el que la abrió (pool)
+    )
+    conn.execute("PRAGMA foreign_keys = ON")  # Mismas FK que en MySQL
+    if _TEMPORAL:
+        conn.execute("PRAGMA synchronous = OFF")  # Descartable: sin fsync por commit
+    _registrar_funciones(conn)
+    return Conexion(conn)
+
+
+# ============================
+# Interfaz para db.py
+# ============================
+
+def kill_query(conn, connection_id: int) -> None:
+    """Interrumpe la sentencia en curso de la conexión 'connection_id' ('conn' no se usa)."""
+    objetivo = _conexiones.get(connection_id)
+    if objetivo is not None:
+        objetivo.interrupt()
+
+
+def writer_connection() -> Optional[Conexion]:
+    """
+    Conexión de este hilo con una escritura abierta. SQLite admite un solo escritor:
+    reservar IDs desde otra conexión esperaría a la propia transacción del hilo.
+    """
+    conn = getattr(_hilo, "escritora", None)
+    return conn if conn is not None and conn.in_transaction else None
+
+
+def _conservar_tope(conn: Conexion, table: str, tope: int) -> None:
+    """Tras un rollback vuelve a fijar el tope de la secuencia: los IDs ya entregados no se repiten."""
+    try:
+        conn._conn.execute(
+            "INSERT INTO secuencias (nombre, siguiente) VALUES (?, ?) "
+            "ON CONFLICT (nombre) DO UPDATE SET siguiente = max(siguiente, excluded.siguiente)",
+            (table, tope),
+        )
+        conn._conn.commit()
+    except sqlite3.Error:
+        log.exception("No se pudo conservar el tope %s de la secuencia %s", tope, table)
+
+
+def reserve_ids(conn: Conexion, cur, table: str, pk_col: str, size: int) -> int:
+    """Suma 'size' a la secuencia de 'table' y devuelve el primer ID reservado."""
+    sql = "UPDATE secuencias SET siguiente = siguiente + %s WHERE nombre = %s RETURNING siguiente"
+    cur.execute(sql, (size, table))
+    row = cur.fetchone()
+    if row is None:  # Secuencia aún no sembrada: parte de MAX(pk) una única vez
+        cur.execute(
+            f"INSERT OR IGNORE INTO secuencias (nombre, siguiente) "
+            f"SELECT %s, COALESCE(MAX({pk_col}), 0) + 1 FROM {table}",
+            (table,),
+        )
+        cur.execute(sql, (size, table))
+        row = cur.fetchone()
+    tope = int(row["siguiente"])
+    conn.on_rollback(partial(_conservar_tope, conn, table, tope))  # Si se deshace, el bloque sigue siendo nuestro
+    return tope - size  # Primer ID del bloque
+
+
+def columns(cur) -> List[Tuple[str, str]]:
+    """Pares (tabla, columna) de la BD, en una consulta."""
+    cur.execute(
+        "SELECT m.name AS tabla, p.name AS columna "
+        "FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p "
+        "WHERE m.type = 'table'"
+    )
+    return [(row["tabla"], row["columna"]) for row in cur.fetchall()]
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-  # Codificación del archivo fuente
 """
-Config global de conexión a MySQL.
+Config global de conexión a MySQL (o a SQLite embebido con DB_BACKEND=sqlite).
 Puedes sobrescribir con variables de entorno si lo prefieres.
 """  # Docstring: propósito del módulo
 
@@ -11,3 +11,65 @@ DB_PORT = int(os.getenv("MYSQL_PORT", "3306"))   # Puerto MySQL
 DB_USER = os.getenv("MYSQL_USER", "root")        # Usuario por defecto
 DB_PASSWORD = os.getenv("MYSQL_PASSWORD", "1234")  # Contraseña demo
 DB_NAME = os.getenv("MYSQL_DATABASE", "seguridad_db")  # Nombre de BD
+
+# Motor de almacenamiento (db.py, backends/)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()  # mysql (servidor) | sqlite (embebido, en proceso)
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "seguridad.db"))  # Archivo de la BD SQLite (':memory:' = en memoria)
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))  # Segundos de espera por el bloqueo de escritura
+
+# Pool de conexiones (db.py)
+DB_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))  # Conexiones simultáneas máximas
+DB_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "10"))  # Segundos de espera por una conexión libre
+DB_POOL_PING_INTERVAL = float(os.getenv("MYSQL_POOL_PING_INTERVAL", "30"))  # Inactividad (s) tras la cual se hace ping al prestar
+
+# Asignación de IDs por bloques (db.next_id)
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "50"))  # IDs reservados por viaje a 'secuencias'
+
+# Ingesta masiva de accesos (consultas.registrar_accesos_bulk)
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))  # Filas por executemany/transacción
+
+# Escritor de auditoría en segundo plano (auditoria.registrar_accion)
+AUDIT_ASYNC = os.getenv("AUDIT_ASYNC", "1") == "1"  # 0 = escritura síncrona como antes
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))  # Registros por INSERT multi-fila
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))  # Segundos máx. que espera un registro encolado
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))  # Tope de la cola (frena a los productores si se llena)
+
+# Caché de permisos por rol (seguridad.tiene_permiso)
+PERMISOS_CACHE_TTL = float(os.getenv("PERMISOS_CACHE_TTL", "60"))  # Segundos antes de recargar 'roles'
+
+# Limitador de intentos de login por usuario (seguridad.iniciar_sesion)
+LOGIN_RATE_BURST = int(os.getenv("LOGIN_RATE_BURST", "5"))  # Intentos fallidos seguidos admitidos por usuario (0 = sin límite)
+LOGIN_RATE_PER_SECOND = float(os.getenv("LOGIN_RATE_PER_SECOND", "0.1"))  # Intentos que se recuperan por segundo (1 cada 10 s)
+LOGIN_RATE_MAX_KEYS = int(os.getenv("LOGIN_RATE_MAX_KEYS", "10000"))  # Usuarios con balde en memoria (se descartan los más viejos)
+
+# Exportación en streaming (modules/exportacion.py)
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))  # Filas leídas por fetchmany del cursor sin buffer
+EXPORT_GAP_TTL = float(os.getenv("EXPORT_GAP_TTL", "86400"))  # Segundos que la exportación incremental re-busca IDs salteados
+EXPORT_MAX_GAPS = int(os.getenv("EXPORT_MAX_GAPS", "10000"))  # Huecos guardados por tabla en el archivo de estado
+
+# Instrumentación de consultas (db.stats)
+DB_STATS = os.getenv("MYSQL_STATS", "0") == "1"  # 1 = medir desde el arranque (también se activa en caliente)
+DB_SLOW_QUERY_MS = float(os.getenv("MYSQL_SLOW_QUERY_MS", "200"))  # Umbral (ms) del log de consultas lentas
+DB_SLOW_QUERY_LOG = os.getenv("MYSQL_SLOW_QUERY_LOG", "")  # Archivo del log lento (vacío = solo logging 'db.slow')
+
+# Sentencias preparadas (db.prepared_cursor)
+DB_STMT_CACHE_SIZE = int(os.getenv("MYSQL_STMT_CACHE_SIZE", "32"))  # Sentencias preparadas por conexión (0 = desactivado)
+
+# Fachada asyncio (modules/asincrono.py)
+ASYNC_WORKERS = int(os.getenv("ASYNC_WORKERS", "4"))  # Hilos del executor (cada uno con su conexión)
+ASYNC_MAX_PENDING = int(os.getenv("ASYNC_MAX_PENDING", "100"))  # Operaciones en curso o en espera como máximo
+ASYNC_TIMEOUT = float(os.getenv("ASYNC_TIMEOUT", "30"))  # Segundos máx. por operación (0 = sin límite)
+
+# Modo en vivo (modules/monitor.py)
+MONITOR_POLL_INTERVAL = float(os.getenv("MONITOR_POLL_INTERVAL", "2"))  # Segundos entre sondeos del poller compartido
+MONITOR_BATCH_SIZE = int(os.getenv("MONITOR_BATCH_SIZE", "500"))  # Filas por lectura incremental
+MONITOR_GAP_TTL = float(os.getenv("MONITOR_GAP_TTL", "120"))  # Segundos que se revisan IDs salteados (confirmados tarde)
+MONITOR_MAX_GAPS = int(os.getenv("MONITOR_MAX_GAPS", "1000"))  # Huecos revisados por tabla como máximo
+
+# Analítica de anomalías (modules/analitica.py, requiere numpy)
+ANALITICA_FETCH_SIZE = int(os.getenv("ANALITICA_FETCH_SIZE", "50000"))  # Filas por fetchmany al cargar 'accesos' en columnas
+
+# Retención y archivo de accesos/auditoría (modules/retencion.py)
+RETENCION_MESES = int(os.getenv("RETENCION_MESES", "12"))  # Meses completos que quedan en las tablas calientes
+RETENCION_MESES_FUTUROS = int(os.getenv("RETENCION_MESES_FUTUROS", "3"))  # Particiones mensuales creadas por adelantado
+RETENCION_DIR = os.getenv("RETENCION_DIR", "archivo")  # Carpeta de los archivos .jsonl.gz de las particiones archivadas
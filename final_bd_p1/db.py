@@ -1,33 +1,451 @@
 # -*- coding: utf-8 -*-  # Codificación del archivo fuente
 """
 Utilidades de base de datos:
-- Conexión centralizada (mysql.connector)
-- Context manager para cursores con commit/rollback
-- Helper para obtener el próximo ID (MAX + 1)
+- Conexión centralizada sobre el motor elegido en DB_BACKEND (MySQL o SQLite embebido, ver backends/)
+- Pool acotado de conexiones reutilizables (db_connection), o conexión fija por hilo para workers
+- Context manager para cursores con commit/rollback, y unidad de trabajo (una transacción por operación)
+- Asignación de IDs respaldada por la tabla 'secuencias': por bloques (hi/lo), o al escribir en las secuencias ordenadas
+- Registro de capacidades del esquema, inspeccionado una vez por proceso (schema)
+- Paginación por clave (keyset/seek), generadores de páginas y marcas de agua con huecos (Watermark)
+- Instrumentación opcional de consultas (stats): latencias, filas, conexiones y log lento
+- Caché LRU de sentencias preparadas por conexión para las consultas frecuentes (prepared_cursor)
 """  # Docstring: responsabilidades del módulo
 
-import mysql.connector  # Driver MySQL
-from mysql.connector import Error  # Tipo de error específico
+import atexit     # Cierre ordenado del pool al salir
+import bisect     # Bucket del histograma de latencias
+import contextlib  # Ubicación del módulo (se excluye al buscar el llamador)
+import logging    # Log de consultas lentas
+import queue      # Cola de conexiones ociosas
+import re         # Normalización de SQL para las estadísticas
+import sys        # Pila de llamadas (función que originó la consulta)
+import threading  # Semáforo y lock del pool
+import time       # Marca de último uso de cada conexión
+import weakref    # Caché de sentencias atada a la vida de cada conexión
+from collections import OrderedDict  # Orden LRU de las sentencias preparadas
+
 from contextlib import contextmanager  # Decorador para context manager
-from typing import Iterator, Optional, Any, Dict  # Tipos auxiliares
-
-from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME  # Config global
-
-
+from typing import Iterator, Iterable, Optional, Any, Dict, List, Tuple, Callable  # Tipos auxiliares
+
+from backends import cargar  # Motores de almacenamiento
+from config import DB_BACKEND  # Motor elegido
+from config import DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_INTERVAL  # Config del pool
+from config import ID_BLOCK_SIZE  # Tamaño de bloque de IDs
+from config import DB_STATS, DB_SLOW_QUERY_MS, DB_SLOW_QUERY_LOG  # Instrumentación
+from config import DB_STMT_CACHE_SIZE  # Sentencias preparadas por conexión
+
+backend = cargar(DB_BACKEND)  # Solo se importa el driver del motor elegido
+Error = backend.Error          # Errores del motor (los módulos los importan desde aquí)
+PoolError = backend.PoolError  # Pool agotado (subclase de Error)
+
+
 def get_connection():
     """
-    Crea y devuelve una conexión a MySQL usando la config global.
+    Crea y devuelve una conexión del motor configurado (MySQL o SQLite) usando la config global.
     Lanza Error si no puede conectar.
     """
-    return mysql.connector.connect(
-        host=DB_HOST,       # Host DB
-        port=DB_PORT,       # Puerto
-        user=DB_USER,       # Usuario
-        password=DB_PASSWORD,  # Contraseña
-        database=DB_NAME,   # Base de datos
-    )
-
-
+    conn = backend.connect()
+    stats.connection_opened()  # Cuenta aperturas reales (no préstamos del pool)
+    return conn
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones a la BD.
+    - Nunca presta más de 'size' conexiones a la vez (espera hasta 'timeout')
+    - Reutiliza primero la conexión ociosa más reciente (LIFO)
+    - Verifica salud al prestar: ping si estuvo ociosa más de 'ping_interval'
+    """
+
+    def __init__(self, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT,
+                 ping_interval: float = DB_POOL_PING_INTERVAL):
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser >= 1")
+        self.size = size                    # Conexiones simultáneas máximas
+        self.timeout = timeout              # Espera máxima por un cupo
+        self.ping_interval = ping_interval  # Umbral de inactividad para el ping
+        self._idle = queue.LifoQueue()      # Pares (conexión, último uso)
+        self._slots = threading.BoundedSemaphore(size)  # Cupos de préstamo
+
+    def acquire(self):
+        """Presta una conexión sana; crea una nueva si no hay ociosas."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"Pool agotado: sin conexión libre tras {self.timeout}s")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()  # Ociosa más reciente
+                except queue.Empty:
+                    return get_connection()  # Sin ociosas: abre una nueva
+                if self._is_healthy(conn, last_used):
+                    return conn
+                self._discard(conn)  # Conexión muerta: se descarta y se prueba otra
+        except BaseException:
+            self._slots.release()  # Devuelve el cupo si no se pudo prestar
+            raise
+
+    def release(self, conn) -> None:
+        """Devuelve la conexión al pool, deshaciendo cualquier transacción abierta."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()  # No filtrar estado entre préstamos
+            self._idle.put((conn, time.monotonic()))
+        except Error:
+            self._discard(conn)  # Falló el rollback: la conexión no es reutilizable
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Context manager: presta una conexión y la devuelve al salir."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Cierra todas las conexiones ociosas."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        """Chequeo de salud: solo hace ping si la conexión estuvo ociosa un buen rato."""
+        if time.monotonic() - last_used < self.ping_interval:
+            return True  # Usada hace poco: se asume viva
+        try:
+            conn.ping(reconnect=False)  # Round trip mínimo al servidor
+            return True
+        except Error:
+            return False
+
+    @staticmethod
+    def _discard(conn) -> None:
+        statements.forget(conn)  # Sus sentencias preparadas mueren con la conexión
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool: Optional[ConnectionPool] = None  # Pool global (creado bajo demanda)
+_pool_lock = threading.Lock()           # Protege la creación del pool
+
+
+def get_pool() -> ConnectionPool:
+    """Devuelve el pool global, creándolo en el primer uso."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool() -> None:
+    """Cierra las conexiones ociosas del pool global y la del asignador de IDs (se llama al salir)."""
+    if _pool is not None:
+        _pool.close()
+    _allocator.close()
+
+
+atexit.register(close_pool)  # Cierre ordenado al terminar el proceso
+
+
+_local = threading.local()       # Conexión fija del hilo (workers de la fachada async)
+_pinned: Dict[int, Any] = {}     # id de hilo -> conexión fija, para cerrarlas al final
+_pinned_lock = threading.Lock()
+
+
+def pin_thread_connection() -> None:
+    """
+    Marca el hilo actual para usar una conexión propia, fuera del pool.
+    A partir de aquí db_connection() entrega siempre esa conexión (se abre al primer uso).
+    Pensado como 'initializer' de un ThreadPoolExecutor: una conexión por worker.
+    """
+    _local.pinned = True
+    _local.depth = 0
+
+
+def thread_connection():
+    """Conexión fija del hilo actual (la abre o reabre si hace falta)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and time.monotonic() - _local.last_used >= DB_POOL_PING_INTERVAL:
+        try:
+            conn.ping(reconnect=True, attempts=1)  # Ociosa un buen rato: se verifica
+        except Error:
+            ConnectionPool._discard(conn)
+            conn = None
+    if conn is None:
+        conn = _local.conn = get_connection()
+        with _pinned_lock:
+            _pinned[threading.get_ident()] = conn
+    _local.last_used = time.monotonic()
+    return conn
+
+
+def close_thread_connections() -> None:
+    """Cierra las conexiones fijas de todos los hilos (tras apagar sus workers)."""
+    with _pinned_lock:
+        conexiones = list(_pinned.values())
+        _pinned.clear()
+    for conn in conexiones:
+        ConnectionPool._discard(conn)
+
+
+def kill_query(connection_id: int) -> None:
+    """Interrumpe la sentencia en curso de otra conexión (KILL QUERY; interrupt en SQLite), p.ej. al cancelar una tarea."""
+    with get_pool().connection() as conn:
+        backend.kill_query(conn, connection_id)
+
+
+@contextmanager
+def db_connection() -> Iterator[Any]:
+    """
+    Presta una conexión del pool y la devuelve al salir.
+    Reemplaza el patrón get_connection()/conn.close():
+        with db_connection() as conn:
+            with db_cursor(conn) as cur:
+                cur.execute("SELECT ...")
+    En un hilo marcado con pin_thread_connection() entrega la conexión fija del hilo,
+    y dentro de unit_of_work() la conexión de la unidad de trabajo.
+    """
+    uow = getattr(_local, "uow_conn", None)
+    if uow is not None:
+        yield uow  # La unidad de trabajo es dueña de la conexión y de su commit
+        return
+    if getattr(_local, "pinned", False):
+        conn = thread_connection() if _local.depth == 0 else _local.conn
+        _local.depth += 1
+        try:
+            yield conn
+        except Error:
+            _local.last_used = float("-inf")  # Tras un error se verifica con ping en el próximo uso
+            raise
+        finally:
+            _local.depth -= 1
+            if _local.depth == 0 and conn.in_transaction:
+                conn.rollback()  # Igual que el pool: no filtrar estado entre operaciones
+        return
+    with get_pool().connection() as conn:
+        yield conn
+
+
+@contextmanager
+def unit_of_work() -> Iterator[Any]:
+    """
+    Unidad de trabajo: una conexión y una transacción para toda una operación de negocio.
+    Dentro del bloque, db_connection() entrega esta misma conexión y db_cursor() no confirma;
+    se hace un único commit al salir (o rollback si escapa una excepción).
+    Las unidades anidadas se suman a la exterior, lo que permite agrupar operaciones:
+        with unit_of_work():
+            registrar_acceso(...)
+            crear_alerta(...)      # Un solo commit para ambas
+    """
+    if getattr(_local, "uow_conn", None) is not None:
+        _local.uow_depth += 1
+        try:
+            yield _local.uow_conn  # Anidada: participa de la transacción exterior
+        finally:
+            _local.uow_depth -= 1
+        return
+    with db_connection() as conn:
+        _local.uow_conn, _local.uow_depth = conn, 1
+        try:
+            yield conn
+            conn.commit()  # Un único commit para todo el bloque
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            _local.uow_conn = None
+
+
+def in_unit_of_work() -> bool:
+    """Hay una unidad de trabajo abierta en el hilo actual."""
+    return getattr(_local, "uow_conn", None) is not None
+
+
+class QueryStats:
+    """
+    Instrumentación opcional de las sentencias que pasan por db_cursor.
+    - Histograma de latencias por sentencia normalizada (literales -> ?)
+    - Filas leídas y sentencias por función llamadora (módulo.función)
+    - Conexiones abiertas contra el servidor
+    - Log de consultas lentas (logger 'db.slow') sobre 'slow_ms'
+    Desactivada no agrega costo: db_cursor entrega el cursor original.
+    """
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)  # Límites superiores del histograma
+
+    _LITERALES = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")       # Cadenas y números
+    _LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")  # IN (?, ?, ...) / VALUES (...)
+    _ESPACIOS = re.compile(r"\s+")
+
+    def __init__(self, enabled: bool = DB_STATS, slow_ms: float = DB_SLOW_QUERY_MS,
+                 slow_log: str = DB_SLOW_QUERY_LOG):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.slow_log = logging.getLogger("db.slow")
+        if slow_log:
+            handler = logging.FileHandler(slow_log, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.slow_log.addHandler(handler)
+            self.slow_log.setLevel(logging.WARNING)
+        self._lock = threading.Lock()
+        self._normalizadas: Dict[str, str] = {}  # Memo SQL crudo -> normalizado
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Descarta lo acumulado."""
+        with self._lock:
+            self._sentencias: Dict[str, Dict[str, Any]] = {}
+            self._funciones: Dict[str, Dict[str, float]] = {}
+            self.connections_opened = 0
+            self.since = time.time()
+
+    def normalize(self, sql: str) -> str:
+        """Clave de agrupación: sin literales, listas colapsadas y espacios simples."""
+        clave = self._normalizadas.get(sql)
+        if clave is None:
+            clave = self._ESPACIOS.sub(" ", sql).strip()
+            clave = self._LITERALES.sub("?", clave).replace("%s", "?")
+            clave = self._LISTAS.sub("(?, ...)", clave)
+            if len(self._normalizadas) < 10000:  # Tope: SQL armado con valores embebidos no crece sin fin
+                self._normalizadas[sql] = clave
+        return clave
+
+    def connection_opened(self) -> None:
+        if self.enabled:
+            with self._lock:
+                self.connections_opened += 1
+
+    def record(self, sql: str, seconds: float, rows: int, caller: str) -> None:
+        """Acumula una sentencia ya terminada (ejecución + lectura de filas)."""
+        clave = self.normalize(sql)
+        ms = seconds * 1000
+        with self._lock:
+            s = self._sentencias.get(clave)
+            if s is None:
+                s = self._sentencias[clave] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                    "buckets": [0] * (len(self.BUCKETS_MS) + 1),  # Último: más que el mayor límite
+                }
+            s["count"] += 1
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+            s["rows"] += rows
+            s["buckets"][bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+            f = self._funciones.setdefault(caller, {"count": 0, "total_ms": 0.0, "rows": 0})
+            f["count"] += 1
+            f["total_ms"] += ms
+            f["rows"] += rows
+        if ms >= self.slow_ms:
+            self.slow_log.warning("%.1f ms | %d filas | %s | %s", ms, rows, caller, clave)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia de las estadísticas; sentencias y funciones ordenadas por tiempo total."""
+        with self._lock:
+            sentencias = [
+                {"sql": sql, **{k: (list(v) if k == "buckets" else v) for k, v in s.items()},
+                 "avg_ms": s["total_ms"] / s["count"]}
+                for sql, s in self._sentencias.items()
+            ]
+            funciones = [{"caller": c, **f} for c, f in self._funciones.items()]
+            return {
+                "enabled": self.enabled,
+                "since": self.since,
+                "connections_opened": self.connections_opened,
+                "buckets_ms": list(self.BUCKETS_MS),
+                "statements": sorted(sentencias, key=lambda s: s["total_ms"], reverse=True),
+                "callers": sorted(funciones, key=lambda f: f["total_ms"], reverse=True),
+            }
+
+
+stats = QueryStats()  # Instrumentación global del proceso
+
+
+class _CursorInstrumentado:
+    """
+    Envoltorio de cursor que mide cada sentencia hasta que se ejecuta la siguiente
+    o se cierra el cursor, de modo que el tiempo incluye la lectura de filas.
+    """
+
+    def __init__(self, cursor, caller: str):
+        self._cursor = cursor
+        self._caller = caller
+        self._sql: Optional[str] = None  # Sentencia en curso
+        self._segundos = 0.0
+        self._filas = 0
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)  # rowcount, lastrowid, description, ...
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _medir(self, metodo, *args):
+        t0 = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            self._segundos += time.perf_counter() - t0
+
+    def _cerrar_sentencia(self) -> None:
+        if self._sql is not None:
+            stats.record(self._sql, self._segundos, self._filas, self._caller)
+            self._sql = None
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        self._cerrar_sentencia()
+        self._sql, self._segundos, self._filas = sql, 0.0, 0
+        return self._medir(lambda: self._cursor.execute(sql, params, *args, **kwargs))
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        self._cerrar_sentencia()
+        self._sql, self._segundos, self._filas = sql, 0.0, 0
+        return self._medir(lambda: self._cursor.executemany(sql, seq_params, *args, **kwargs))
+
+    def fetchone(self):
+        fila = self._medir(self._cursor.fetchone)
+        self._filas += fila is not None
+        return fila
+
+    def fetchmany(self, size: int = 1):
+        filas = self._medir(self._cursor.fetchmany, size)
+        self._filas += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._medir(self._cursor.fetchall)
+        self._filas += len(filas)
+        return filas
+
+    def close(self):
+        self._cerrar_sentencia()
+        return self._cursor.close()
+
+
+def _llamador() -> str:
+    """'módulo.función' del primer marco de la pila fuera de db.py y contextlib."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename in (__file__, contextlib.__file__):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+
 @contextmanager
 def db_cursor(conn) -> Iterator[Any]:
     """
@@ -36,24 +454,397 @@ def db_cursor(conn) -> Iterator[Any]:
         with db_cursor(conn) as cur:
             cur.execute("SELECT ...")
             rows = cur.fetchall()
+    Dentro de unit_of_work() no confirma ni deshace: lo decide la unidad de trabajo.
     """
     cursor = conn.cursor(dictionary=True)  # Devuelve dicts en fetch
+    if stats.enabled:
+        cursor = _CursorInstrumentado(cursor, _llamador())  # Mide cada sentencia del bloque
+    en_uow = conn is getattr(_local, "uow_conn", None)
     try:
         yield cursor  # Entrega cursor al bloque 'with'
-        conn.commit()  # Commit si no hubo excepción
+        if not en_uow:
+            conn.commit()  # Commit si no hubo excepción
     except Error:
-        conn.rollback()  # Rollback en error
+        if not en_uow:
+            conn.rollback()  # Rollback en error
         raise  # Propaga la excepción
     finally:
         cursor.close()  # Cierra el cursor siempre
-
-
-def get_next_id(conn, table: str, pk_col: str) -> int:
+
+
+class StatementCache:
+    """
+    Caché LRU de sentencias preparadas del lado del servidor, por conexión.
+    - Clave: texto SQL; valor: cursor preparado (dict) que la conserva preparada
+    - La primera ejecución de un SQL en una conexión lo prepara; las siguientes solo
+      envían los parámetros en protocolo binario (sin re-parsear el SQL)
+    - Al superar 'size' sentencias se cierra la menos usada (DEALLOCATE en el servidor)
+    - Las entradas se descartan junto con la conexión (WeakKeyDictionary + forget)
+    - Guarda también el objeto str con que se preparó: el conector solo reutiliza la sentencia
+      si recibe ese mismo objeto (operation is self._executed), así que un SQL armado en cada
+      llamada (f-string) se cambia por el de la caché antes de ejecutarlo
+    """
+
+    def __init__(self, size: int = DB_STMT_CACHE_SIZE):
+        self.size = size
+        self._por_conexion: "weakref.WeakKeyDictionary[Any, OrderedDict]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()  # Protege el diccionario de conexiones (cada conexión la usa un hilo a la vez)
+        self.hits = self.misses = self.evictions = 0
+
+    def cursor(self, conn, sql: str) -> Tuple[Any, str]:
+        """
+        (cursor preparado, SQL canónico) para 'sql' en 'conn'; crea el cursor y desaloja el más
+        viejo si hace falta. Hay que ejecutar el SQL canónico, no 'sql', para no volver a preparar.
+        """
+        with self._lock:
+            cache = self._por_conexion.get(conn)
+            if cache is None:
+                cache = self._por_conexion[conn] = OrderedDict()
+        entrada = cache.get(sql)
+        if entrada is not None:
+            cache.move_to_end(sql)  # Más reciente al final
+            self.hits += 1
+            return entrada
+        self.misses += 1
+        entrada = cache[sql] = (conn.cursor(prepared=True, dictionary=True), sql)
+        while len(cache) > self.size:
+            _, (viejo, _) = cache.popitem(last=False)  # Menos usada
+            self.evictions += 1
+            self._cerrar(viejo)
+        return entrada
+
+    def evict(self, conn, sql: str) -> None:
+        """Descarta la sentencia 'sql' de 'conn' (p.ej. tras un error)."""
+        cache = self._por_conexion.get(conn)
+        entrada = cache.pop(sql, None) if cache is not None else None
+        if entrada is not None:
+            self._cerrar(entrada[0])
+
+    def forget(self, conn) -> None:
+        """Olvida todas las sentencias de 'conn' sin hablar con el servidor (la conexión se cierra)."""
+        with self._lock:
+            self._por_conexion.pop(conn, None)
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            abiertas = sum(len(c) for c in self._por_conexion.values())
+        return {"size": self.size, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "prepared": abiertas}
+
+    @staticmethod
+    def _cerrar(cur) -> None:
+        try:
+            cur.close()
+        except Exception:
+            pass
+
+
+statements = StatementCache()  # Caché global del proceso
+
+
+@contextmanager
+def prepared_cursor(conn, sql: str, params: tuple = ()) -> Iterator[Any]:
+    """
+    Ejecuta 'sql' como sentencia preparada (cacheada por conexión) y entrega el cursor
+    para leer el resultado; commit/rollback como db_cursor. Pensado para SQL fijo y frecuente:
+        with prepared_cursor(conn, "SELECT ... WHERE nombre = %s", (nombre,)) as cur:
+            row = cur.fetchone()
+    Con MYSQL_STMT_CACHE_SIZE=0 se comporta igual que db_cursor (sin preparar).
+    """
+    if statements.size < 1:
+        with db_cursor(conn) as cur:
+            cur.execute(sql, params)
+            yield cur
+        return
+    cursor, sql = statements.cursor(conn, sql)  # Mismo objeto str que la vez que se preparó
+    medido = _CursorInstrumentado(cursor, _llamador()) if stats.enabled else None
+    en_uow = conn is getattr(_local, "uow_conn", None)
+    try:
+        (medido or cursor).execute(sql, params)
+        yield medido or cursor
+        if conn.unread_result:
+            cursor.fetchall()  # El cursor queda en caché: no puede dejar filas sin leer
+        if not en_uow:
+            conn.commit()
+    except Error:
+        statements.evict(conn, sql)  # Se vuelve a preparar en el próximo uso
+        if not en_uow:
+            conn.rollback()
+        raise
+    except BaseException:
+        statements.evict(conn, sql)  # Pudo quedar con filas sin leer
+        raise
+    finally:
+        if medido is not None:
+            medido._cerrar_sentencia()  # Registra la sentencia sin cerrar el cursor cacheado
+
+
+def execute_prepared(conn, sql: str, params: tuple = ()) -> int:
+    """Ejecuta una sentencia preparada sin resultado (INSERT/UPDATE) y devuelve las filas afectadas."""
+    with prepared_cursor(conn, sql, params) as cur:
+        return cur.rowcount
+
+
+def keyset_clause(col: str, before_id: Optional[int] = None,
+                  after_id: Optional[int] = None) -> Tuple[str, List[int], str]:
+    """
+    Condición de paginación por clave (seek) sobre la columna 'col'.
+    Devuelve (condición WHERE, parámetros, orden):
+    - before_id: filas con col < before_id, de la más nueva a la más vieja (DESC)
+    - after_id: filas con col > after_id, de la más vieja a la más nueva (ASC)
+    - ambos: rango abierto (after_id, before_id) en orden DESC
+    A diferencia de OFFSET, el costo por página no crece con la profundidad.
+    """
+    conds, params = [], []
+    if before_id is not None:
+        conds.append(f"{col} < %s")
+        params.append(before_id)
+    if after_id is not None:
+        conds.append(f"{col} > %s")
+        params.append(after_id)
+    orden = "ASC" if after_id is not None and before_id is None else "DESC"
+    return (" AND ".join(conds) or "1 = 1"), params, orden
+
+
+def iter_pages(fetch_page: Callable[..., List[Dict]], key: str, page_size: int,
+               before_id: Optional[int] = None, after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """
+    Genera páginas consecutivas sobre una única conexión del pool.
+    'fetch_page(conn, limit, before_id, after_id)' devuelve una página ordenada por 'key';
+    el cursor avanza con el último 'key' de cada página. Memoria: una página a la vez.
+    """
+    if page_size < 1:
+        raise ValueError("page_size debe ser >= 1")
+    descendente = after_id is None or before_id is not None
+    with db_connection() as conn:  # Se devuelve al pool al agotar o cerrar el generador
+        while True:
+            page = fetch_page(conn, page_size, before_id, after_id)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return  # Última página
+            if descendente:
+                before_id = page[-1][key]
+            else:
+                after_id = page[-1][key]
+
+
+class Watermark:
+    """
+    Marca de agua sobre una PK de una secuencia ordenada (ORDERED_SEQUENCES), para lecturas incrementales.
+    - Los IDs siguen el orden de reserva, pero cada uno se confirma recién con el commit de quien
+      lo reservó: 'pk > marca' sola saltearía lo que se confirma tarde
+    - Al avanzar, los IDs salteados quedan como huecos y se vuelven a buscar por PK
+      hasta que vencen ('ttl' s) o superan 'max_gaps' (se olvidan los más viejos)
+    Un ID confirmado después de que venció su hueco no se ve.
+    """
+
+    def __init__(self, mark: int = 0, ttl: float = 120.0, max_gaps: int = 1000,
+                 gaps: Optional[Dict[int, float]] = None):
+        self.mark = mark
+        self.ttl = ttl
+        self.max_gaps = max_gaps
+        self.gaps: "OrderedDict[int, float]" = OrderedDict(
+            sorted((gaps or {}).items(), key=lambda g: g[1])
+        )  # id -> vencimiento (epoch), en orden de vencimiento
+
+    def pending(self) -> List[int]:
+        """IDs de los huecos vigentes (descarta los vencidos: se asume que nunca se usarán)."""
+        ahora = time.time()
+        while self.gaps and next(iter(self.gaps.values())) <= ahora:
+            self.gaps.popitem(last=False)
+        return list(self.gaps)
+
+    def seen(self, pk: int) -> None:
+        """Registra una fila leída: cierra su hueco, o avanza la marca dejando huecos por los IDs salteados."""
+        if pk <= self.mark:
+            self.gaps.pop(pk, None)
+            return
+        vence = time.time() + self.ttl
+        for faltante in range(max(self.mark + 1, pk - self.max_gaps), pk):
+            self.gaps[faltante] = vence  # ID salteado: puede llegar tarde
+        self.mark = pk
+        while len(self.gaps) > self.max_gaps:
+            self.gaps.popitem(last=False)  # Tope de memoria
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado serializable en JSON (p.ej. el archivo de estado de una exportación incremental)."""
+        return {"marca": self.mark, "huecos": {str(pk): vence for pk, vence in self.gaps.items()}}
+
+    @classmethod
+    def from_dict(cls, estado: Any, ttl: float, max_gaps: int) -> "Watermark":
+        """Inverso de to_dict(); acepta también un entero (estado viejo: solo el último ID)."""
+        if isinstance(estado, int):
+            return cls(estado, ttl, max_gaps)
+        gaps = {int(pk): float(vence) for pk, vence in estado.get("huecos", {}).items()}
+        return cls(int(estado["marca"]), ttl, max_gaps, gaps)
+
+
+class SchemaRegistry:
+    """
+    Registro de capacidades del esquema (tablas y columnas presentes).
+    - Lee el catálogo (information_schema, o sqlite_master en SQLite) una sola vez por proceso y memoiza el resultado
+    - has('usuarios.password') / has('secuencias') responde sin ir a la BD
+    - refresh() tras aplicar DDL (arranque o migraciones)
+    """
+
+    def __init__(self):
+        self._tablas: Optional[Dict[str, frozenset]] = None  # tabla -> columnas
+        self._lock = threading.Lock()
+
+    def has(self, nombre: str) -> bool:
+        """'tabla' o 'tabla.columna' existe en la BD actual."""
+        tablas = self._tablas if self._tablas is not None else self._cargar()
+        tabla, _, columna = nombre.lower().partition(".")
+        cols = tablas.get(tabla)
+        if cols is None:
+            return False
+        return not columna or columna in cols
+
+    def refresh(self) -> None:
+        """Descarta lo memoizado; la próxima consulta vuelve a inspeccionar."""
+        with self._lock:
+            self._tablas = None
+
+    def _cargar(self) -> Dict[str, frozenset]:
+        with self._lock:
+            if self._tablas is None:
+                with db_connection() as conn:
+                    with db_cursor(conn) as cur:
+                        tablas: Dict[str, set] = {}
+                        for tabla, columna in backend.columns(cur):  # Todo el esquema en una consulta
+                            tablas.setdefault(tabla.lower(), set()).add(columna.lower())
+                self._tablas = {t: frozenset(c) for t, c in tablas.items()}
+            return self._tablas
+
+
+schema = SchemaRegistry()  # Registro global del proceso
+
+
+# Secuencias que también usan los triggers y que se leen en orden de ID (listados "últimos N",
+# modo en vivo, exportación incremental): se reservan al escribir, sin bloque en memoria, para que
+# el orden de los IDs siga al de escritura. Un bloque cacheado entregaría IDs menores a los que
+# los triggers ya usaron.
+ORDERED_SEQUENCES = frozenset({"accesos", "auditoria", "alertas", "eventos_seguridad"})
+
+
+class IdAllocator:
     """
-    Obtiene el próximo ID para tablas sin AUTO_INCREMENT.
-    Implementa: SELECT COALESCE(MAX(pk), 0) + 1
+    Asignador de IDs hi/lo para tablas sin AUTO_INCREMENT.
+    - Reserva bloques de 'block_size' IDs en 'secuencias' con un único UPDATE atómico
+    - Entrega los IDs del bloque desde memoria (sin consultas por insert)
+    - Las secuencias de 'ordered' no usan bloque: cada pedido reserva justo lo que se va a
+      escribir, así que sus IDs quedan en orden de reserva (los triggers reservan igual)
+    - Comparte el contador con los triggers/procedimientos (sp_siguiente_id)
+    - Reserva sobre una conexión propia, fuera del pool: quien pide IDs con una conexión
+      del pool (o un worker con conexión fija) en la mano no necesita un segundo préstamo
+    - Dentro de unit_of_work() un faltante se reserva en la propia unidad (ver take())
+    Un bloque no usado al terminar el proceso deja un hueco en la numeración.
     """
-    with db_cursor(conn) as cur:
-        cur.execute(f"SELECT COALESCE(MAX({pk_col}), 0) + 1 AS next_id FROM {table}")  # Consulta
-        row = cur.fetchone()  # Obtiene resultado
-        return int(row["next_id"])  # Convierte a int y retorna
+
+    def __init__(self, block_size: int = ID_BLOCK_SIZE, ordered: Iterable[str] = ORDERED_SEQUENCES):
+        if block_size < 1:
+            raise ValueError("El tamaño de bloque debe ser >= 1")
+        self.block_size = block_size
+        self.ordered = frozenset(ordered)
+        self._blocks: Dict[str, List[int]] = {}  # tabla -> [próximo, tope exclusivo]
+        self._lock = threading.Lock()            # Serializa entregas entre hilos (no las reservas)
+        self._conn = None                        # Conexión propia para reservas (se abre al primer uso)
+        self._conn_lock = threading.Lock()       # Una reserva a la vez sobre esa conexión
+
+    def next_id(self, table: str, pk_col: str) -> int:
+        """Devuelve el próximo ID de 'table'."""
+        return self.take(table, pk_col, 1)[0]
+
+    def take(self, table: str, pk_col: str, count: int) -> List[int]:
+        """
+        Devuelve 'count' IDs nuevos de 'table' (usa el bloque en curso y reserva más si falta).
+        En las secuencias ordenadas reserva exactamente 'count': pedirlos justo antes de escribir.
+        """
+        ids: List[int] = []
+        ordenada = table in self.ordered
+        while True:
+            if not ordenada:
+                with self._lock:
+                    block = self._blocks.get(table)
+                    if block is not None and block[0] < block[1]:
+                        n = min(count - len(ids), block[1] - block[0])
+                        ids.extend(range(block[0], block[0] + n))
+                        block[0] += n
+                    if len(ids) == count:
+                        return ids
+            uow = getattr(_local, "uow_conn", None)
+            if uow is not None:
+                # Los triggers de la unidad pueden tener bloqueada la fila de 'secuencias' hasta su commit:
+                # reservar en otra conexión esperaría a este mismo hilo. Se reserva en la unidad solo lo
+                # justo y sin compartirlo (si se deshace, esos IDs no los usó nadie más).
+                n = count - len(ids)
+                with db_cursor(uow) as cur:  # Sin commit: lo decide la unidad
+                    first = backend.reserve_ids(uow, cur, table, pk_col, n)
+                ids.extend(range(first, first + n))
+                return ids
+            if ordenada:  # Sin bloque: los IDs que otros reserven después serán mayores
+                first = self._reserve(table, pk_col, count)
+                return list(range(first, first + count))
+            # La reserva va fuera del lock: quien espera a la BD no frena a quien ya tiene IDs
+            # (en SQLite el que espera el lock podría ser justo el que tiene la escritura abierta)
+            size = max(self.block_size, count - len(ids))  # Lotes grandes: un solo viaje
+            first = self._reserve(table, pk_col, size)
+            with self._lock:
+                block = self._blocks.get(table)
+                if block is None or block[0] >= block[1]:
+                    self._blocks[table] = [first, first + size]
+                else:  # Otro hilo instaló un bloque mientras tanto: se usa lo necesario del propio
+                    n = count - len(ids)
+                    ids.extend(range(first, first + n))  # El resto del bloque queda como hueco
+                    return ids
+
+    def _reserve(self, table: str, pk_col: str, size: int) -> int:
+        """
+        Reserva 'size' IDs consecutivos y devuelve el primero.
+        Usa la conexión propia del asignador con commit inmediato para no retener el bloqueo
+        de la fila de 'secuencias' durante la transacción del llamador (ni ocupar un cupo del pool).
+        En SQLite (un solo escritor), si el hilo ya tiene una escritura abierta se reserva
+        en esa misma transacción; el motor conserva el tope aunque luego se deshaga.
+        """
+        propia = backend.writer_connection()
+        if propia is not None:
+            cur = propia.cursor(dictionary=True)
+            try:
+                return backend.reserve_ids(propia, cur, table, pk_col, size)
+            finally:
+                cur.close()
+        with self._conn_lock:
+            for intento in (1, 2):
+                conn = self._conn
+                if conn is None:
+                    conn = self._conn = get_connection()
+                try:
+                    with db_cursor(conn) as cur:
+                        return backend.reserve_ids(conn, cur, table, pk_col, size)
+                except Error:
+                    self._conn = None
+                    ConnectionPool._discard(conn)  # Caída (p.ej. wait_timeout): se reintenta con una nueva
+                    if intento == 2:
+                        raise
+
+    def close(self) -> None:
+        """Cierra la conexión de reservas (los bloques en memoria siguen sirviendo)."""
+        with self._conn_lock:
+            if self._conn is not None:
+                ConnectionPool._discard(self._conn)
+                self._conn = None
+
+
+_allocator = IdAllocator()  # Asignador global del proceso
+
+
+def next_id(table: str, pk_col: str) -> int:
+    """Próximo ID de 'table' (sin MAX() por insert): del bloque en memoria, o reservado al momento si es ordenada."""
+    return _allocator.next_id(table, pk_col)
+
+
+def next_ids(table: str, pk_col: str, count: int) -> List[int]:
+    """Lista de 'count' IDs nuevos de 'table' para inserciones en lote."""
+    return _allocator.take(table, pk_col, count)
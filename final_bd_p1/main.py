@@ -6,12 +6,15 @@ Flujo:
 - Menú inicial: iniciar sesión / ver usuarios / salir
 - Tras login: menú contextual por rol (admin/auditor/usuario)
 - Todas las operaciones relevantes registran auditoría
+- Modo en vivo: python main.py --tail [--tabla alertas ...] (login de admin/auditor)
 
 Requisitos:
 - pip install mysql-connector-python
 - BD creada con el script seguridad_db.sql
+- O sin servidor: DB_BACKEND=sqlite (crea la BD local con scripts_sql/seguridad_sqlite.sql)
 """  # Docstring de módulo: describe propósito general y requisitos
 
+import argparse  # Opciones de línea de comandos (--tail)
 import sys  # Salidas controladas y finalización del programa
 from typing import Optional  # Tipos opcionales (referencia, no crítico)
 
@@ -21,20 +24,39 @@ from modules.seguridad import (  # Importa funcionalidades de usuarios/roles
     listar_usuarios,            # Listar usuarios y estado
     agregar_usuario,            # Alta de usuario
     cambiar_estado_bloqueo,     # Bloqueo/Desbloqueo
+    cambiar_estado_bloqueo_masivo,  # Bloqueo/Desbloqueo de muchos usuarios
     tiene_permiso,              # Chequear permisos por rol (CSV)
     ensure_password_column,     # Asegurar columna password en usuarios
+    obtener_regla_bloqueo,      # Regla de bloqueo automático vigente
+    configurar_regla_bloqueo,   # Cambiar la regla de bloqueo automático
+    intentos_login_limitados,   # Reporte del limitador de login
+    reiniciar_limitador_login,  # Vaciar el limitador de login
 )
-from modules.auditoria import listar_auditoria  # Listado de auditoría
+from modules.auditoria import iterar_auditoria  # Auditoría paginada
+from modules.monitor import FUENTES, seguir  # Modo en vivo (poller compartido)
 from modules.consultas import (  # Operaciones de accesos/sistemas/eventos/alertas
     listar_sistemas,
     registrar_acceso,
-    listar_accesos,
-    accesos_por_usuario,
+    iterar_accesos,
+    iterar_accesos_por_usuario,
     crear_evento,
-    listar_eventos,
+    iterar_eventos,
+    iterar_eventos_por_usuario,
     crear_alerta,
-    listar_alertas,
+    iterar_alertas,
+    iterar_alertas_por_usuario,
+    accesos_por_cidr,
 )
+from db import stats, statements  # Instrumentación de consultas y caché de sentencias preparadas
+from modules.reportes import (  # Reportes sobre tablas resumen
+    resumen_accesos_por_usuario,
+    top_ips_fallidas,
+    resumen_alertas_por_usuario,
+    resumen_auditoria,
+    resumen_por_subred,
+)
+
+PAGE_SIZE = 20  # Filas por página en los listados paginados
 
 
 def input_int(msg: str) -> int:
@@ -73,6 +95,211 @@ def mostrar_usuarios():
         print(f" - [{u['id_usuario']}] {u['nombre']} ({u['rol']}, {estado})")
 
 
+def mostrar_reportes():
+    """
+    Imprime un tablero con los reportes principales (leídos de las tablas resumen).
+    """
+    print("\nAccesos por usuario:")
+    for r in resumen_accesos_por_usuario():
+        print(f" - [{r['id_usuario']}] {r['nombre']}: {r['total']} accesos, {r['fallidos']} fallidos, éxito {r['tasa_exito_pct'] or 0}%")
+    print("\nIPs con más fallos:")
+    for r in top_ips_fallidas():
+        print(f" - {r['ip'] or '(sin IP)'}: {r['fallidos']}/{r['total']} fallidos ({r['pct_fallos'] or 0}%)")
+    print("\nAlertas por usuario:")
+    for r in resumen_alertas_por_usuario():
+        print(f" - [{r['id_usuario']}] {r['nombre']}: {r['total_alertas']} (última {r['ultima_alerta'] or '-'})")
+    print("\nAuditoría por tabla:")
+    for r in resumen_auditoria():
+        print(f" - {r['tabla_afectada'] or '(sin tabla)'}: {r['total']} (I {r['inserts']} / U {r['updates']} / D {r['deletes']})")
+
+
+def mostrar_accesos_por_red():
+    """
+    Pide una red CIDR y muestra sus subredes con más fallos y los primeros fallos desde ella.
+    """
+    cidr = input("Red CIDR (p.ej. 10.0.0.0/8): ").strip()
+    prefijo_txt = input("Agrupar por prefijo (Enter para /24 en IPv4, /64 en IPv6): ").strip().lstrip("/")
+    try:
+        prefijo = int(prefijo_txt) if prefijo_txt else None
+        subredes = resumen_por_subred(cidr, prefijo)
+        fallos = accesos_por_cidr(cidr, exitoso=False, limit=PAGE_SIZE)
+    except ValueError as e:
+        print(f"⚠️  Red o prefijo inválido: {e}")
+        return
+    except RuntimeError as e:
+        print(f"❌ {e}")  # BD sin la migración de IP binaria
+        return
+    print(f"\nSubredes de {cidr} con más fallos:")
+    for r in subredes:
+        print(f" - {r['subred']}: {r['fallidos']}/{r['total']} fallidos ({r['pct_fallos'] or 0}%)")
+    print(f"\nFallos desde {cidr} (primeros {PAGE_SIZE} por IP):")
+    for r in fallos:
+        print(f" - [{r['id_acceso']}] usuario {r['id_usuario']} {r['fecha']} {r['ip']} (sistema {r['id_sistema']})")
+    if not subredes:
+        print("Sin accesos desde esa red.")
+
+
+def mostrar_estadisticas_bd():
+    """
+    Muestra las sentencias y funciones que más tiempo de BD consumen (db.stats).
+    Permite activar, desactivar o reiniciar la instrumentación.
+    """
+    if not stats.enabled:
+        print("\nLa instrumentación está desactivada (MYSQL_STATS=1 la activa al arrancar).")
+        if input("¿Activarla ahora? (s/n): ").strip().lower().startswith("s"):
+            stats.enable()
+            print("✅ Instrumentación activada: usa la aplicación y vuelve a esta opción.")
+        return
+    datos = stats.snapshot()
+    print(f"\nConexiones abiertas: {datos['connections_opened']}")
+    cache = statements.info()
+    print(f"Sentencias preparadas: {cache['prepared']} en caché, {cache['hits']} reutilizadas, "
+          f"{cache['misses']} preparadas, {cache['evictions']} desalojadas")
+    print("\nSentencias con más tiempo total:")
+    for s in datos["statements"][:10]:
+        print(f" - {s['total_ms']:.1f} ms en {s['count']} ejecuciones (prom {s['avg_ms']:.2f}, máx {s['max_ms']:.1f}), {s['rows']} filas :: {s['sql'][:100]}")
+    print("\nFunciones con más tiempo de BD:")
+    for f in datos["callers"][:10]:
+        print(f" - {f['caller']}: {f['total_ms']:.1f} ms en {f['count']} sentencias, {f['rows']} filas")
+    op = input("\n'r' reinicia, 'd' desactiva, Enter vuelve: ").strip().lower()
+    if op == "r":
+        stats.reset()
+        print("✅ Estadísticas reiniciadas.")
+    elif op == "d":
+        stats.disable()
+        print("✅ Instrumentación desactivada.")
+
+
+def mostrar_intentos_limitados():
+    """
+    Muestra los intentos de login rechazados por el limitador (sin llegar a la BD).
+    Permite vaciar el limitador, p.ej. tras atender a un usuario legítimo.
+    """
+    reporte = intentos_login_limitados()
+    print(f"\nIntentos de login limitados: {reporte['total']}")
+    if reporte["por_usuario"]:
+        print("\nUsuarios más limitados:")
+        for nombre, cantidad in reporte["por_usuario"]:
+            print(f" - {nombre}: {cantidad}")
+        print("\nÚltimos rechazos:")
+        for r in reversed(reporte["recientes"][-20:]):
+            print(f" - {r['fecha']:%Y-%m-%d %H:%M:%S} {r['nombre']} (reintento en {r['reintentar_en']:.0f} s)")
+    if input("\n'r' vacía el limitador, Enter vuelve: ").strip().lower() == "r":
+        reiniciar_limitador_login()
+        print("✅ Limitador vaciado.")
+
+
+FORMATOS_EN_VIVO = {
+    "alertas": lambda a: f"🚨 [{a['id_alerta']}] {a['usuario']} :: {a['mensaje']} ({a['fecha']})",
+    "eventos_seguridad": lambda e: f"🛡️ [{e['id_evento']}] {e['usuario']} :: {e['tipo_evento']} - {e['descripcion']} ({e['fecha']})",
+    "auditoria": lambda a: f"📝 [{a['id_auditoria']}] {a['usuario']} :: {a['accion']} [{a['tabla_afectada']}] ({a['fecha']})",
+}
+
+
+def seguir_en_vivo(tablas=None):
+    """
+    Imprime las filas nuevas de alertas/eventos/auditoría a medida que llegan (Ctrl+C para salir).
+    Lee solo lo insertado desde que se abre la vista, sin re-consultar lo ya mostrado.
+    """
+    tablas = tablas or list(FUENTES)
+    print(f"\n📡 Siguiendo {', '.join(tablas)} en vivo (Ctrl+C para salir)...")
+    filas = seguir(tablas)
+    try:
+        for tabla, fila in filas:
+            print(FORMATOS_EN_VIVO[tabla](fila))
+    except KeyboardInterrupt:
+        print("\n⏹️  Fin del modo en vivo.")
+    finally:
+        filas.close()  # Cancela la suscripción
+
+
+def modo_tail(tablas):
+    """
+    Entrada de 'python main.py --tail': pide credenciales de admin/auditor y sigue las tablas.
+    """
+    nombre = input("Nombre de usuario: ").strip()
+    password = input("Contraseña: ").strip()
+    u = iniciar_sesion(nombre, password)
+    if u is None or "error" in u:
+        print(f"❌ {u['error'] if u else 'Usuario no encontrado.'}")
+        sys.exit(1)
+    if not tiene_permiso(u["rol"], "ver_todo"):
+        print("❌ El modo en vivo requiere el permiso 'ver_todo' (admin o auditor).")
+        sys.exit(1)
+    seguir_en_vivo(tablas)
+
+
+def bloqueo_masivo(usuario_actual: str):
+    """
+    Pide la selección (IDs, prefijo de IP o red CIDR) y aplica el cambio masivo tras confirmar.
+    """
+    estado = input("Estado (bloquear/desbloquear): ").strip().lower().startswith("bloq")
+    ids_txt = input("IDs separados por coma (Enter para ninguno): ").strip()
+    ip_prefijo = input("Prefijo de IP o red CIDR vista en accesos, p.ej. 10.2. o 10.2.0.0/16 (Enter para ninguno): ").strip() or None
+    cidr = None
+    if ip_prefijo and "/" in ip_prefijo:
+        cidr, ip_prefijo = ip_prefijo, None  # Red CIDR: rango sobre la IP binaria
+    try:
+        ids = [int(x) for x in ids_txt.replace(" ", "").split(",") if x] if ids_txt else None
+    except ValueError:
+        print("⚠️  IDs inválidos.")
+        return
+    if ids is None and ip_prefijo is None and cidr is None:
+        print("⚠️  Indica IDs, un prefijo de IP o una red CIDR.")
+        return
+    motivo = input("Motivo (opcional): ").strip()
+    if not input(f"¿Confirmas {'bloquear' if estado else 'desbloquear'} la selección? (s/n): ").strip().lower().startswith("s"):
+        print("Operación cancelada.")
+        return
+    try:
+        cambiados = cambiar_estado_bloqueo_masivo(estado, usuario_actual, ids=ids, ip_prefijo=ip_prefijo,
+                                                  cidr=cidr, motivo=motivo)
+    except (ValueError, RuntimeError) as e:
+        print(f"⚠️  {e}")  # Red inválida o BD sin la migración de IP binaria
+        return
+    print(f"✅ {len(cambiados)} usuario(s) actualizados." + (f" IDs: {cambiados}" if cambiados else ""))
+
+
+def configurar_bloqueo(usuario_actual: str):
+    """
+    Muestra la regla de bloqueo automático vigente y la reemplaza por la que se ingrese.
+    """
+    regla = obtener_regla_bloqueo()
+    print(f"\nRegla actual: bloquear con {regla['max_fallos']} fallos en {regla['ventana_dias']} días.")
+    fallos = input_int("Fallos para bloquear: ")  # Umbral
+    dias = input_int("Ventana en días: ")         # Ventana
+    try:
+        configurar_regla_bloqueo(fallos, dias, actor=usuario_actual)
+    except ValueError as e:
+        print(f"❌ {e}")  # Umbral o ventana fuera de rango: se vuelve al menú
+        return
+    print("✅ Regla actualizada.")
+
+
+def paginar(titulo: str, paginas, formato):
+    """
+    Muestra un listado página a página (paginación por clave, sin OFFSET).
+    Enter pide la página siguiente; 'v' vuelve al menú.
+    """
+    print(f"\n{titulo}:")
+    vacio = True
+    try:
+        for pagina in paginas:  # Cada página se consulta recién al pedirla
+            vacio = False
+            for r in pagina:
+                print(formato(r))
+            if len(pagina) < PAGE_SIZE:
+                break  # No hay más
+            resp = input("\nEnter para ver más, 'v' para volver al menú: ").strip().lower()
+            if resp in ("v", "volver"):
+                return
+    finally:
+        paginas.close()  # Devuelve la conexión al pool
+    if vacio:
+        print("Sin registros.")
+    esperar_volver_menu()
+
+
 def run_menu(header: str, items):
     # Despachador genérico de menús: evita múltiples if/elif.
     # 'items' es una lista de tuplas (número, etiqueta, handler)
@@ -98,12 +325,9 @@ def menu_auditor(usuario_actual: str):
     header = f"\n🕵️ Menú AUDITOR ({usuario_actual})"  # Encabezado contextual
     items = [
         (1, "Ver usuarios", lambda: (mostrar_usuarios(), esperar_volver_menu())),
-        (2, "Ver accesos", lambda: (
-            (lambda rows: [
-                print("\nAccesos:"),
-                *[print(f" - [{r['id_acceso']}] {'✅' if r['exitoso'] else '❌'} {r['fecha']} {r['ip']} {r['sistema']}") for r in rows]
-            ])(listar_accesos()),
-            esperar_volver_menu()
+        (2, "Ver accesos", lambda: paginar(
+            "Accesos", iterar_accesos(PAGE_SIZE),
+            lambda r: f" - [{r['id_acceso']}] {'✅' if r['exitoso'] else '❌'} {r['fecha']} {r['ip']} {r['sistema']}",
         )),
         (3, "Ver sistemas", lambda: (
             (lambda sistemas: [
@@ -112,27 +336,21 @@ def menu_auditor(usuario_actual: str):
             ])(listar_sistemas()),
             esperar_volver_menu()
         )),
-        (4, "Ver eventos", lambda: (
-            (lambda eventos: [
-                print("\nEventos:"),
-                *[print(f" - [{e['id_evento']}] {e['usuario']} :: {e['tipo_evento']} - {e['descripcion']} ({e['fecha']})") for e in eventos]
-            ])(listar_eventos()),
-            esperar_volver_menu()
+        (4, "Ver eventos", lambda: paginar(
+            "Eventos", iterar_eventos(PAGE_SIZE),
+            lambda e: f" - [{e['id_evento']}] {e['usuario']} :: {e['tipo_evento']} - {e['descripcion']} ({e['fecha']})",
         )),
-        (5, "Ver alertas", lambda: (
-            (lambda alertas: [
-                print("\nAlertas:"),
-                *[print(f" - [{a['id_alerta']}] {a['usuario']} :: {a['mensaje']} ({a['fecha']})") for a in alertas]
-            ])(listar_alertas()),
-            esperar_volver_menu()
+        (5, "Ver alertas", lambda: paginar(
+            "Alertas", iterar_alertas(PAGE_SIZE),
+            lambda a: f" - [{a['id_alerta']}] {a['usuario']} :: {a['mensaje']} ({a['fecha']})",
         )),
-        (6, "Ver auditoría", lambda: (
-            (lambda aud: [
-                print("\nAuditoría:"),
-                *[print(f" - [{a['id_auditoria']}] {a['usuario']} :: {a['accion']} [{a['tabla_afectada']}] ({a['fecha']})") for a in aud]
-            ])(listar_auditoria()),
-            esperar_volver_menu()
+        (6, "Ver auditoría", lambda: paginar(
+            "Auditoría", iterar_auditoria(PAGE_SIZE),
+            lambda a: f" - [{a['id_auditoria']}] {a['usuario']} :: {a['accion']} [{a['tabla_afectada']}] ({a['fecha']})",
         )),
+        (7, "Ver reportes", lambda: (mostrar_reportes(), esperar_volver_menu())),
+        (8, "Seguir en vivo", seguir_en_vivo),
+        (9, "Accesos por red (CIDR)", lambda: (mostrar_accesos_por_red(), esperar_volver_menu())),
     ]
     run_menu(header, items)  # Llama al despachador del menú
 
@@ -141,31 +359,38 @@ def menu_usuario(usuario_actual: str, id_usuario: int):
     # Menú del rol 'usuario': vista propia y solicitud de desbloqueo
     header = f"\n👤 Menú USUARIO ({usuario_actual})"
     items = [
-        (1, "Ver mis accesos", lambda: (
-            (lambda rows: [
-                print("\nMis accesos:"),
-                *[print(f" - [{r['id_acceso']}] {'✅' if r['exitoso'] else '❌'} {r['fecha']} {r['ip']} (sistema {r['id_sistema']})") for r in rows]
-            ])(accesos_por_usuario(id_usuario)),
-            esperar_volver_menu()
+        (1, "Ver mis accesos", lambda: paginar(
+            "Mis accesos", iterar_accesos_por_usuario(id_usuario, PAGE_SIZE),
+            lambda r: f" - [{r['id_acceso']}] {'✅' if r['exitoso'] else '❌'} {r['fecha']} {r['ip']} (sistema {r['id_sistema']})",
         )),
-        (2, "Ver mis alertas", lambda: (
-            (lambda mis_alertas: [
-                print("\nMis alertas:"),
-                *[print(f" - [{a['id_alerta']}] {a['mensaje']} ({a['fecha']})") for a in mis_alertas]
-            ])([a for a in listar_alertas() if a["usuario"] == usuario_actual]),
-            esperar_volver_menu()
+        (2, "Ver mis alertas", lambda: paginar(
+            "Mis alertas", iterar_alertas_por_usuario(id_usuario, PAGE_SIZE),  # Filtrado por id_usuario en SQL
+            lambda a: f" - [{a['id_alerta']}] {a['mensaje']} ({a['fecha']})",
         )),
         (3, "Solicitar desbloqueo (crea evento)", lambda: (
             crear_evento(id_usuario, "Solicitud desbloqueo", "Usuario solicita desbloqueo", actor=usuario_actual),
             print("✅ Solicitud registrada."),
             esperar_volver_menu()
         )),
+        (4, "Ver mis eventos", lambda: paginar(
+            "Mis eventos", iterar_eventos_por_usuario(id_usuario, PAGE_SIZE),
+            lambda e: f" - [{e['id_evento']}] {e['tipo_evento']} - {e['descripcion']} ({e['fecha']})",
+        )),
     ]
     run_menu(header, items)  # Despacha el menú del usuario
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Administración de la BD seguridad_db.')
+    parser.add_argument('--tail', action='store_true', help='Seguir en vivo alertas, eventos y auditoría (admin/auditor)')
+    parser.add_argument('--tabla', action='append', choices=sorted(FUENTES),
+                        help='Tabla a seguir con --tail (repetible; por defecto todas)')
+    args = parser.parse_args()  # Parsea argumentos
+
     ensure_password_column()  # Garantiza columna 'password' en 'usuarios'
+    if args.tail:
+        modo_tail(args.tabla)
+        return
     print("=========================================")
     print("  Sistema de Seguridad - Administración  ")
     print("=========================================\n")  # Encabezado de la aplicación
@@ -250,12 +475,9 @@ def menu_admin(user):
             ),
             esperar_volver_menu()
         )),
-        (5, "Ver accesos", lambda: (
-            (lambda rows: [
-                print("\nAccesos:"),
-                *[print(f" - [{r['id_acceso']}] {r['usuario']} {'✅' if r['exitoso'] else '❌'} {r['fecha']} {r['ip']} {r['sistema']}") for r in rows]
-            ])(listar_accesos()),
-            esperar_volver_menu()
+        (5, "Ver accesos", lambda: paginar(
+            "Accesos", iterar_accesos(PAGE_SIZE),
+            lambda r: f" - [{r['id_acceso']}] {r['usuario']} {'✅' if r['exitoso'] else '❌'} {r['fecha']} {r['ip']} {r['sistema']}",
         )),
         (6, "Ver sistemas", lambda: (
             (lambda sistemas: [
@@ -274,12 +496,9 @@ def menu_admin(user):
             ),
             esperar_volver_menu()
         )),
-        (8, "Ver eventos", lambda: (
-            (lambda eventos: [
-                print("\nEventos:"),
-                *[print(f" - [{e['id_evento']}] {e['usuario']} :: {e['tipo_evento']} - {e['descripcion']} ({e['fecha']})") for e in eventos]
-            ])(listar_eventos()),
-            esperar_volver_menu()
+        (8, "Ver eventos", lambda: paginar(
+            "Eventos", iterar_eventos(PAGE_SIZE),
+            lambda e: f" - [{e['id_evento']}] {e['usuario']} :: {e['tipo_evento']} - {e['descripcion']} ({e['fecha']})",
         )),
         (9, "Crear alerta", lambda: (
             (lambda idu, msg: (
@@ -290,20 +509,21 @@ def menu_admin(user):
             ),
             esperar_volver_menu()
         )),
-        (10, "Ver alertas", lambda: (
-            (lambda alertas: [
-                print("\nAlertas:"),
-                *[print(f" - [{a['id_alerta']}] {a['usuario']} :: {a['mensaje']} ({a['fecha']})") for a in alertas]
-            ])(listar_alertas()),
-            esperar_volver_menu()
+        (10, "Ver alertas", lambda: paginar(
+            "Alertas", iterar_alertas(PAGE_SIZE),
+            lambda a: f" - [{a['id_alerta']}] {a['usuario']} :: {a['mensaje']} ({a['fecha']})",
         )),
-        (11, "Ver auditoría", lambda: (
-            (lambda aud: [
-                print("\nAuditoría:"),
-                *[print(f" - [{a['id_auditoria']}] {a['usuario']} :: {a['accion']} [{a['tabla_afectada']}] ({a['fecha']})") for a in aud]
-            ])(listar_auditoria()),
-            esperar_volver_menu()
+        (11, "Ver auditoría", lambda: paginar(
+            "Auditoría", iterar_auditoria(PAGE_SIZE),
+            lambda a: f" - [{a['id_auditoria']}] {a['usuario']} :: {a['accion']} [{a['tabla_afectada']}] ({a['fecha']})",
         )),
+        (12, "Configurar bloqueo automático", lambda: (configurar_bloqueo(usuario_actual), esperar_volver_menu())),
+        (13, "Ver reportes", lambda: (mostrar_reportes(), esperar_volver_menu())),
+        (14, "Estadísticas de consultas", lambda: (mostrar_estadisticas_bd(), esperar_volver_menu())),
+        (15, "Bloqueo/Desbloqueo masivo", lambda: (bloqueo_masivo(usuario_actual), esperar_volver_menu())),
+        (16, "Intentos de login limitados", lambda: (mostrar_intentos_limitados(), esperar_volver_menu())),
+        (17, "Seguir en vivo", seguir_en_vivo),
+        (18, "Accesos por red (CIDR)", lambda: (mostrar_accesos_por_red(), esperar_volver_menu())),
     ]
     run_menu(header, items)  # Despacha ítems del menú admin
 
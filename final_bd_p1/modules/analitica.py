@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Detección de anomalías sobre el historial de accesos, vectorizada con NumPy:
+- Carga 'accesos' en columnas (arrays alineados) leyendo por lotes con un cursor sin buffer
+- Características por usuario: totales, fallos, tasa de fallos, sistemas e IPs distintos,
+  pico de fallos por día y z-score del último día contra la línea base propia
+- Características por IP: totales, fallos, tasa, usuarios distintos con fallos y pico por día
+- Anomalías puntuadas (ráfagas, tasas atípicas, IPs que atacan a muchos usuarios)
+  que se pueden emitir como alertas en lote (consultas.crear_alertas_bulk)
+Todo el cálculo es sobre arrays (sort/bincount), sin bucles por usuario ni consultas por usuario.
+NumPy es opcional para el resto del proyecto: solo este módulo lo requiere (pip install numpy).
+"""  # Docstring de módulo: responsabilidades
+
+from datetime import date  # Filtros por fecha
+from typing import Dict, List, Optional  # Tipos auxiliares
+
+try:
+    import numpy as np  # Cálculo vectorizado
+except ImportError:  # Dependencia opcional
+    np = None
+
+from config import ANALITICA_FETCH_SIZE  # Filas por fetchmany
+from db import db_connection  # Conexión prestada del pool
+from modules.consultas import crear_alertas_bulk  # Emisión de alertas en lote
+
+
+def _requiere_numpy() -> None:
+    if np is None:
+        raise RuntimeError("modules.analitica requiere NumPy: python -m pip install numpy")
+
+
+class Accesos:
+    """
+    Historial de accesos en columnas: arrays NumPy alineados (una posición por acceso).
+    - usuario, sistema: IDs originales
+    - dia: días desde el año 0 (TO_DAYS) para agrupar por día sin objetos date
+    - exitoso: bool
+    - ip: código entero; 'ips[codigo]' devuelve el texto
+    """
+
+    def __init__(self, usuario, dia, exitoso, ip, sistema, ips: List[str]):
+        self.usuario = usuario
+        self.dia = dia
+        self.exitoso = exitoso
+        self.ip = ip
+        self.sistema = sistema
+        self.ips = ips
+
+    def __len__(self) -> int:
+        return len(self.usuario)
+
+    @property
+    def ultimo_dia(self) -> date:
+        """Día más reciente cargado."""
+        return _a_fecha(self.dia.max()) if len(self) else date.today()
+
+
+def _a_fecha(to_days) -> date:
+    """Convierte un valor TO_DAYS de MySQL a date."""
+    return date.fromordinal(int(to_days) - 365)  # TO_DAYS = ordinal + 365
+
+
+def cargar_accesos(desde: Optional[date] = None, hasta: Optional[date] = None,
+                   lote: int = ANALITICA_FETCH_SIZE) -> Accesos:
+    """
+    Lee 'accesos' (rango de fechas inclusivo opcional) en columnas.
+    Cursor sin buffer + fetchmany: en Python nunca hay más de 'lote' filas como tuplas;
+    cada lote se convierte a arrays y las IPs se codifican con np.unique por lote.
+    """
+    _requiere_numpy()
+    condiciones = ["id_usuario IS NOT NULL", "fecha IS NOT NULL", "exitoso IS NOT NULL"]
+    params: list = []
+    if desde is not None:
+        condiciones.append("fecha >= %s")
+        params.append(desde)
+    if hasta is not None:
+        condiciones.append("fecha <= %s")
+        params.append(hasta)
+    partes: Dict[str, list] = {"usuario": [], "dia": [], "exitoso": [], "ip": [], "sistema": []}
+    codigos: Dict[str, int] = {}  # IP -> código global
+    with db_connection() as conn:
+        cur = conn.cursor(buffered=False)  # Streaming desde el servidor, filas como tuplas
+        try:
+            cur.execute(
+                "SELECT id_usuario, TO_DAYS(fecha), exitoso, COALESCE(ip, ''), COALESCE(id_sistema, 0) "
+                f"FROM accesos WHERE {' AND '.join(condiciones)}",
+                tuple(params),
+            )  # Sin ORDER BY: el análisis no depende del orden
+            while True:
+                filas = cur.fetchmany(lote)
+                if not filas:
+                    break
+                usuario, dia, exitoso, ip, sistema = zip(*filas)  # Filas -> columnas
+                partes["usuario"].append(np.array(usuario, dtype=np.int64))
+                partes["dia"].append(np.array(dia, dtype=np.int32))
+                partes["exitoso"].append(np.array(exitoso, dtype=bool))
+                partes["sistema"].append(np.array(sistema, dtype=np.int64))
+                distintas, inversa = np.unique(np.array(ip, dtype=object), return_inverse=True)
+                mapa = np.array([codigos.setdefault(v, len(codigos)) for v in distintas], dtype=np.int64)
+                partes["ip"].append(mapa[inversa])  # Solo las IPs distintas del lote pasan por Python
+        finally:
+            cur.close()
+    columnas = {
+        k: (np.concatenate(v) if v else np.zeros(0, dtype=bool if k == "exitoso" else np.int64))
+        for k, v in partes.items()
+    }
+    ips = [""] * len(codigos)
+    for texto, codigo in codigos.items():
+        ips[codigo] = texto
+    return Accesos(ips=ips, **columnas)
+
+
+def _unicos(claves, con_cuentas: bool = False):
+    """
+    Valores distintos (ordenados) de un array entero y, opcionalmente, cuántas veces aparece cada uno.
+    Equivale a np.unique pero por ordenamiento + comparación con el vecino, que con decenas
+    de millones de claves es mucho más rápido que el np.unique basado en hash.
+    """
+    orden = np.sort(claves)
+    nuevo = np.empty(len(orden), dtype=bool)
+    nuevo[:1] = True
+    nuevo[1:] = orden[1:] != orden[:-1]
+    distintos = orden[nuevo]
+    if not con_cuentas:
+        return distintos
+    return distintos, np.diff(np.append(np.flatnonzero(nuevo), len(orden)))
+
+
+def _distintos(grupo, valor, n: int):
+    """Cantidad de 'valor' distintos por 'grupo' (códigos 0..n-1), con un único ordenamiento."""
+    if len(grupo) == 0:
+        return np.zeros(n, dtype=np.int64)
+    base = int(valor.max()) + 1
+    pares = _unicos(grupo.astype(np.int64) * base + valor)
+    return np.bincount(pares // base, minlength=n)
+
+
+def _fallos_por_dia(grupo, dia, fallo, n: int):
+    """
+    Fallos por (grupo, día). Devuelve (pico por grupo, fallos del último día con accesos del grupo,
+    media y desvío de sus días anteriores, ese último día en TO_DAYS).
+    La línea base de cada grupo va de su primer a su último día con accesos (este excluido):
+    los días sin fallos dentro de esa ventana cuentan como 0, pero los días previos a su primer
+    acceso o posteriores al último no la diluyen.
+    """
+    base = int(dia.min()) if len(dia) else 0
+    dias = int(dia.max()) - base + 1 if len(dia) else 1
+    d = (dia - base).astype(np.int64)
+    # Ventana propia de cada grupo: pares (grupo, día) ordenados, primero y último por grupo
+    tg, td = np.divmod(_unicos(grupo.astype(np.int64) * dias + d), dias)
+    inicio = np.flatnonzero(np.append(True, tg[1:] != tg[:-1])) if len(tg) else tg
+    fin = np.append(inicio[1:] - 1, len(tg) - 1) if len(tg) else tg
+    primero = np.zeros(n, dtype=np.int64)
+    ultimo_dia = np.zeros(n, dtype=np.int64)
+    primero[tg[inicio]] = td[inicio]
+    ultimo_dia[tg[fin]] = td[fin]
+
+    pares, cuenta = _unicos(grupo[fallo].astype(np.int64) * dias + d[fallo], con_cuentas=True)
+    pg, pd = np.divmod(pares, dias)
+    pico = np.zeros(n, dtype=np.int64)
+    np.maximum.at(pico, pg, cuenta)
+    ultimo = pd == ultimo_dia[pg]
+    reciente = np.zeros(n, dtype=np.int64)
+    reciente[pg[ultimo]] = cuenta[ultimo]
+    previos = np.maximum(ultimo_dia - primero, 1)  # Días de línea base de cada grupo
+    suma = np.bincount(pg[~ultimo], weights=cuenta[~ultimo], minlength=n)
+    suma2 = np.bincount(pg[~ultimo], weights=cuenta[~ultimo].astype(np.float64) ** 2, minlength=n)
+    media = suma / previos
+    desvio = np.sqrt(np.maximum(suma2 / previos - media ** 2, 0.0))
+    return pico, reciente, media, desvio, ultimo_dia + base
+
+
+def _zscore(valores):
+    """z-score de cada valor contra la población (0 si no hay dispersión)."""
+    if len(valores) == 0:
+        return valores.astype(np.float64)
+    desvio = valores.std()
+    return (valores - valores.mean()) / desvio if desvio > 0 else np.zeros(len(valores))
+
+
+def caracteristicas_usuarios(acc: Accesos) -> Dict[str, "np.ndarray"]:
+    """
+    Una fila por usuario (arrays alineados con 'id_usuario'):
+    total, fallos, tasa_fallos, sistemas, ips, pico_fallos_dia, ultimo_dia (TO_DAYS del último
+    día con accesos del usuario), fallos_ultimo_dia, z_ultimo_dia (ese día contra la media/desvío
+    propios de sus días previos desde su primer acceso, desvío mínimo 1)
+    y z_tasa (tasa de fallos contra el resto de los usuarios).
+    """
+    _requiere_numpy()
+    ids = _unicos(acc.usuario)
+    u = np.searchsorted(ids, acc.usuario)  # Código 0..n-1 de cada fila
+    n = len(ids)
+    fallo = ~acc.exitoso
+    total = np.bincount(u, minlength=n)
+    fallos = np.bincount(u, weights=fallo, minlength=n).astype(np.int64)
+    tasa = fallos / np.maximum(total, 1)
+    pico, reciente, media, desvio, ultimo_dia = _fallos_por_dia(u, acc.dia, fallo, n)
+    return {
+        "id_usuario": ids,
+        "total": total,
+        "fallos": fallos,
+        "tasa_fallos": tasa,
+        "sistemas": _distintos(u, acc.sistema, n),
+        "ips": _distintos(u, acc.ip, n),
+        "pico_fallos_dia": pico,
+        "ultimo_dia": ultimo_dia,
+        "fallos_ultimo_dia": reciente,
+        "z_ultimo_dia": (reciente - media) / np.maximum(desvio, 1.0),  # Piso de 1: sin historial no explota
+        "z_tasa": _zscore(tasa),
+    }
+
+
+def caracteristicas_ips(acc: Accesos) -> Dict[str, "np.ndarray"]:
+    """
+    Una fila por IP (arrays alineados con 'ip', que trae el texto):
+    total, fallos, tasa_fallos, usuarios (distintos), usuarios_fallidos (distintos con fallos),
+    pico_fallos_dia y z_usuarios_fallidos (contra el resto de las IPs).
+    """
+    _requiere_numpy()
+    n = len(acc.ips)
+    fallo = ~acc.exitoso
+    total = np.bincount(acc.ip, minlength=n)
+    fallos = np.bincount(acc.ip, weights=fallo, minlength=n).astype(np.int64)
+    usuarios_fallidos = _distintos(acc.ip[fallo], acc.usuario[fallo], n)
+    pico = _fallos_por_dia(acc.ip, acc.dia, fallo, n)[0]
+    return {
+        "ip": np.array(acc.ips, dtype=object),
+        "total": total,
+        "fallos": fallos,
+        "tasa_fallos": fallos / np.maximum(total, 1),
+        "usuarios": _distintos(acc.ip, acc.usuario, n),
+        "usuarios_fallidos": usuarios_fallidos,
+        "pico_fallos_dia": pico,
+        "z_usuarios_fallidos": _zscore(usuarios_fallidos.astype(np.float64)),
+    }
+
+
+def puntuar_anomalias(acc: Accesos, umbral_z: float = 3.0, min_fallos: int = 3, min_total: int = 10,
+                      min_usuarios_ip: int = 5, max_usuarios_por_ip: int = 20) -> List[Dict]:
+    """
+    Anomalías ordenadas por 'score' (un z-score) descendente:
+    - 'rafaga_usuario': fallos del último día con accesos del usuario >= min_fallos y z_ultimo_dia >= umbral_z
+    - 'tasa_fallos_usuario': total >= min_total y z_tasa >= umbral_z
+    - 'ip_multiusuario': usuarios_fallidos >= min_usuarios_ip y z_usuarios_fallidos >= umbral_z;
+      'usuarios' lista hasta max_usuarios_por_ip IDs con fallos desde esa IP
+    """
+    _requiere_numpy()
+    anomalias: List[Dict] = []
+    if len(acc) == 0:
+        return anomalias
+
+    fu = caracteristicas_usuarios(acc)
+    for i in np.flatnonzero((fu["fallos_ultimo_dia"] >= min_fallos) & (fu["z_ultimo_dia"] >= umbral_z)):
+        anomalias.append({
+            "tipo": "rafaga_usuario", "id_usuario": int(fu["id_usuario"][i]), "ip": None,
+            "score": float(fu["z_ultimo_dia"][i]),
+            "detalle": f"{fu['fallos_ultimo_dia'][i]} fallos el {_a_fecha(fu['ultimo_dia'][i]).isoformat()} (z={fu['z_ultimo_dia'][i]:.1f} vs. su historial)",
+        })
+    for i in np.flatnonzero((fu["total"] >= min_total) & (fu["z_tasa"] >= umbral_z)):
+        anomalias.append({
+            "tipo": "tasa_fallos_usuario", "id_usuario": int(fu["id_usuario"][i]), "ip": None,
+            "score": float(fu["z_tasa"][i]),
+            "detalle": f"tasa de fallos {fu['tasa_fallos'][i]:.0%} en {fu['total'][i]} accesos (z={fu['z_tasa'][i]:.1f})",
+        })
+
+    fi = caracteristicas_ips(acc)
+    sospechosas = np.flatnonzero((fi["usuarios_fallidos"] >= min_usuarios_ip) & (fi["z_usuarios_fallidos"] >= umbral_z))
+    if len(sospechosas):
+        fallo = ~acc.exitoso & np.isin(acc.ip, sospechosas)  # Solo las filas de las IPs sospechosas
+        base = int(acc.usuario.max()) + 1
+        pares = _unicos(acc.ip[fallo] * base + acc.usuario[fallo])  # (ip, usuario) distintos
+        pares_ip, pares_usuario = np.divmod(pares, base)
+        for codigo in sospechosas:
+            usuarios = pares_usuario[pares_ip == codigo][:max_usuarios_por_ip]
+            anomalias.append({
+                "tipo": "ip_multiusuario", "id_usuario": None, "ip": acc.ips[codigo],
+                "score": float(fi["z_usuarios_fallidos"][codigo]),
+                "usuarios": [int(x) for x in usuarios],
+                "detalle": f"{fi['fallos'][codigo]} fallos contra {fi['usuarios_fallidos'][codigo]} usuarios "
+                           f"(z={fi['z_usuarios_fallidos'][codigo]:.1f})",
+            })
+    anomalias.sort(key=lambda a: a["score"], reverse=True)
+    return anomalias
+
+
+def emitir_alertas(anomalias: List[Dict], actor: str, max_alertas: int = 1000) -> List[int]:
+    """
+    Convierte anomalías en alertas y las inserta en lote (una transacción).
+    Las de IP generan una alerta por usuario afectado. Devuelve los IDs de alerta creados.
+    """
+    alertas = []
+    for a in anomalias:
+        if a["tipo"] == "ip_multiusuario":
+            for id_usuario in a["usuarios"]:
+                alertas.append((id_usuario, f"Anomalía: IP {a['ip']} con {a['detalle']}"[:255]))
+        else:
+            alertas.append((a["id_usuario"], f"Anomalía ({a['tipo']}): {a['detalle']}"[:255]))
+    return crear_alertas_bulk(alertas[:max_alertas], actor=actor)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Fachada asyncio sobre la API de modules/ (seguridad, consultas, auditoría):
+- Cada operación bloqueante corre en un ThreadPoolExecutor acotado, fuera del event loop
+- Cada worker usa su propia conexión fija (db.pin_thread_connection), no compite por el pool
+- Límite de operaciones en curso/en espera (semáforo) y timeout por operación
+- Cancelar la tarea descarta la operación si no empezó o interrumpe su sentencia (KILL QUERY),
+  solo mientras la operación sigue en curso sobre la conexión del worker
+Uso:
+    from modules import asincrono
+    usuario = await asincrono.iniciar_sesion("Ana Torres", "1234")
+    await asincrono.cerrar()
+"""  # Docstring de módulo: responsabilidades
+
+import asyncio  # Event loop, semáforo y timeouts
+import logging  # Errores al cancelar
+import threading  # Lock de creación de la fachada global
+from concurrent.futures import ThreadPoolExecutor  # Workers con conexión propia
+from functools import partial, wraps  # Envoltura de las funciones bloqueantes
+from typing import Any, Callable, Optional  # Tipos auxiliares
+
+from config import ASYNC_WORKERS, ASYNC_MAX_PENDING, ASYNC_TIMEOUT  # Config de la fachada
+from db import pin_thread_connection, thread_connection, close_thread_connections, kill_query  # Conexión por worker
+from modules import auditoria, consultas, seguridad  # API bloqueante
+
+log = logging.getLogger(__name__)
+
+
+class _Operacion:
+    """Estado compartido entre la tarea async y el worker que ejecuta la operación."""
+
+    def __init__(self):
+        self.cancelada = False                    # La tarea se canceló antes de empezar
+        self.connection_id: Optional[int] = None  # Conexión del worker mientras ejecuta
+        self.lock = threading.Lock()              # KILL y liberación de la conexión no se cruzan
+
+
+class FachadaAsync:
+    """
+    Ejecuta funciones bloqueantes de modules/ desde corrutinas.
+    - workers: hilos del executor; cada uno abre una conexión propia al primer uso
+    - max_pendientes: operaciones admitidas a la vez (en curso + en cola); el resto espera
+    - timeout: segundos máximos por operación (None o 0 = sin límite); al vencer se cancela
+    """
+
+    def __init__(self, workers: int = ASYNC_WORKERS, max_pendientes: int = ASYNC_MAX_PENDING,
+                 timeout: Optional[float] = ASYNC_TIMEOUT):
+        if workers < 1 or max_pendientes < 1:
+            raise ValueError("workers y max_pendientes deben ser >= 1")
+        self.timeout = timeout or None
+        self.max_pendientes = max_pendientes
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="db-async",
+            initializer=pin_thread_connection,  # Una conexión fija por worker
+        )
+        self._semaforo: Optional[asyncio.Semaphore] = None  # Se crea dentro del event loop
+        self._cerrada = False
+
+    async def ejecutar(self, funcion: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta funcion(*args, **kwargs) en un worker y devuelve su resultado."""
+        if self._cerrada:
+            raise RuntimeError("La fachada async está cerrada")
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_pendientes)
+        async with self._semaforo:  # Contrapresión: no se encolan más de max_pendientes
+            op = _Operacion()
+            loop = asyncio.get_running_loop()
+            futuro = loop.run_in_executor(self._executor, partial(self._en_worker, op, funcion, args, kwargs))
+            try:
+                return await asyncio.wait_for(futuro, self.timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                op.cancelada = True  # Si aún no empezó, el worker la descarta
+                await self._interrumpir(loop, op)
+                raise
+
+    @staticmethod
+    def _en_worker(op: _Operacion, funcion: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        """Cuerpo que corre en el hilo worker, sobre su conexión fija."""
+        connection_id = thread_connection().connection_id
+        with op.lock:
+            if op.cancelada:
+                raise asyncio.CancelledError()  # Cancelada mientras esperaba en la cola
+            op.connection_id = connection_id  # Para KILL QUERY si se cancela
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            with op.lock:
+                op.connection_id = None  # Antes de que la conexión atienda a la próxima operación
+
+    async def _interrumpir(self, loop, op: _Operacion) -> None:
+        """Corta la sentencia en curso del worker; su transacción se deshace y el worker queda libre."""
+        try:
+            await loop.run_in_executor(None, self._matar, op)  # Fuera del executor de workers
+        except Exception:
+            log.exception("No se pudo interrumpir la conexión %s", op.connection_id)
+
+    @staticmethod
+    def _matar(op: _Operacion) -> None:
+        """KILL QUERY de la operación si sigue en curso; con el lock tomado el worker no suelta la conexión."""
+        with op.lock:
+            if op.connection_id is not None:  # Ya terminó: no se toca lo que corra después en esa conexión
+                kill_query(op.connection_id)
+
+    async def cerrar(self) -> None:
+        """Espera las operaciones en curso, apaga los workers y cierra sus conexiones."""
+        if self._cerrada:
+            return
+        self._cerrada = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, partial(self._executor.shutdown, wait=True, cancel_futures=True))
+        close_thread_connections()
+
+
+_fachada: Optional[FachadaAsync] = None  # Fachada global (creada bajo demanda)
+_fachada_lock = threading.Lock()
+
+
+def obtener_fachada() -> FachadaAsync:
+    """Devuelve la fachada global, creándola en el primer uso."""
+    global _fachada
+    if _fachada is None or _fachada._cerrada:
+        with _fachada_lock:
+            if _fachada is None or _fachada._cerrada:
+                _fachada = FachadaAsync()
+    return _fachada
+
+
+async def cerrar() -> None:
+    """Cierra la fachada global (llamar al apagar el servicio)."""
+    if _fachada is not None:
+        await _fachada.cerrar()
+
+
+def _asincrona(funcion: Callable[..., Any]) -> Callable[..., Any]:
+    """Versión awaitable de una función bloqueante de modules/, ejecutada en la fachada global."""
+    @wraps(funcion)
+    async def envoltura(*args, **kwargs):
+        return await obtener_fachada().ejecutar(funcion, *args, **kwargs)
+    return envoltura
+
+
+# Seguridad
+iniciar_sesion = _asincrona(seguridad.iniciar_sesion)
+obtener_usuario_por_nombre = _asincrona(seguridad.obtener_usuario_por_nombre)
+agregar_usuario = _asincrona(seguridad.agregar_usuario)
+cambiar_estado_bloqueo = _asincrona(seguridad.cambiar_estado_bloqueo)
+listar_usuarios = _asincrona(seguridad.listar_usuarios)
+listar_roles = _asincrona(seguridad.listar_roles)
+tiene_permiso = _asincrona(seguridad.tiene_permiso)
+obtener_regla_bloqueo = _asincrona(seguridad.obtener_regla_bloqueo)
+configurar_regla_bloqueo = _asincrona(seguridad.configurar_regla_bloqueo)
+
+# Consultas
+listar_sistemas = _asincrona(consultas.listar_sistemas)
+registrar_acceso = _asincrona(consultas.registrar_acceso)
+registrar_accesos_bulk = _asincrona(consultas.registrar_accesos_bulk)
+listar_accesos = _asincrona(consultas.listar_accesos)
+accesos_por_cidr = _asincrona(consultas.accesos_por_cidr)
+accesos_por_usuario = _asincrona(consultas.accesos_por_usuario)
+crear_evento = _asincrona(consultas.crear_evento)
+listar_eventos = _asincrona(consultas.listar_eventos)
+eventos_por_usuario = _asincrona(consultas.eventos_por_usuario)
+crear_alerta = _asincrona(consultas.crear_alerta)
+crear_alertas_bulk = _asincrona(consultas.crear_alertas_bulk)
+listar_alertas = _asincrona(consultas.listar_alertas)
+alertas_por_usuario = _asincrona(consultas.alertas_por_usuario)
+
+# Auditoría
+registrar_accion = _asincrona(auditoria.registrar_accion)
+listar_auditoria = _asincrona(auditoria.listar_auditoria)
+flush_auditoria = _asincrona(auditoria.flush_auditoria)
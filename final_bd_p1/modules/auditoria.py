@@ -2,46 +2,215 @@
 """
 Módulo de auditoría:
 - Registrar acciones (INSERT/UPDATE/DELETE/LOGIN/LOGOUT)
+- Escritor en segundo plano con group commit (AuditWriter)
 - Listar auditoría
 """  # Docstring: alcance del módulo
-
+
+import atexit     # Vaciado durable de la cola al salir
+import logging    # Reporte de fallos del hilo escritor
+import queue      # Cola de registros pendientes
+import threading  # Hilo escritor
+import time       # Intervalo de vaciado y reintentos
 from datetime import date  # Fecha del registro de auditoría
-from typing import List, Dict  # Tipos de ayuda
-
-from db import get_connection, db_cursor, get_next_id  # Helpers de BD
-
-
-def registrar_accion(usuario: str, accion: str, tabla_afectada: str) -> None:
-    """Inserta una fila en 'auditoria' con la acción efectuada."""
-    conn = get_connection()
-    try:
-        nuevo_id = get_next_id(conn, "auditoria", "id_auditoria")  # Próximo ID
-        with db_cursor(conn) as cur:
-            cur.execute(
-                """
-                INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (nuevo_id, usuario, accion, tabla_afectada, date.today()),
-            )  # Inserta registro de auditoría
-    finally:
-        conn.close()
+from typing import List, Dict, Optional, Iterator  # Tipos de ayuda
+
+from config import AUDIT_ASYNC, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_QUEUE_MAX  # Config del escritor
+from db import Error  # Errores del motor de BD (MySQL o SQLite)
+from db import db_connection, db_cursor, execute_prepared, in_unit_of_work  # Helpers de BD
+from db import next_id, next_ids, keyset_clause, iter_pages  # IDs y paginación
+
+log = logging.getLogger(__name__)
+
+INSERT_AUDITORIA = """
+    INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
+    VALUES (%s, %s, %s, %s, %s)
+"""  # Sentencia compartida por la escritura síncrona (preparada) y la por lotes
+
+
+class _Senal:
+    """Marca en la cola: pide vaciar lo pendiente (y opcionalmente detener el hilo)."""
+
+    def __init__(self, detener: bool = False):
+        self.detener = detener
+        self.evento = threading.Event()  # Se activa cuando el lote previo quedó confirmado
+
+
+class AuditWriter:
+    """
+    Escritor de auditoría en segundo plano (group commit).
+    - Encola registros en memoria y los inserta con un INSERT multi-fila por lote
+    - Vacía al juntar 'batch_size' registros o cuando el más antiguo espera 'flush_interval' s
+    - flush() bloquea hasta que todo lo encolado antes esté confirmado
+    - close() vacía y detiene el hilo (se registra con atexit para no perder registros)
+    - Tras close(), submit() rechaza el registro (quien llama lo escribe síncrono) y flush() no espera
+    """
+
+    REINTENTOS = 3  # Intentos por lote antes de descartarlo
+
+    def __init__(self, batch_size: int = AUDIT_BATCH_SIZE, flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 max_queue: int = AUDIT_QUEUE_MAX):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)  # Cota de memoria
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # Ordena arranque, encolado y cierre (nada se encola tras la señal de parada)
+        self._closed = False
+
+    @property
+    def activo(self) -> bool:
+        return not self._closed
+
+    def submit(self, usuario: str, accion: str, tabla_afectada: str) -> bool:
+        """
+        Encola un registro; arranca el hilo escritor en el primer uso.
+        Devuelve False si el escritor ya está cerrado (el registro no se encoló).
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if self._thread is None:
+                self._start()
+            self._queue.put((usuario, accion, tabla_afectada, date.today()))  # Bloquea si la cola está llena
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que lo encolado hasta ahora esté confirmado. Devuelve False si vence 'timeout'."""
+        with self._lock:
+            if self._thread is None:
+                return True  # Nada se encoló todavía
+            if self._closed or not self._thread.is_alive():
+                hilo = self._thread  # Nadie lee ya la cola: se espera a que termine el vaciado de close()
+                senal = None
+            else:
+                senal = _Senal()
+                self._queue.put(senal)
+        if senal is None:
+            hilo.join(timeout)
+            return not hilo.is_alive()
+        return senal.evento.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Vacía la cola de forma durable y detiene el hilo escritor."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None:
+            senal = _Senal(detener=True)
+            self._queue.put(senal)
+            senal.evento.wait(timeout)
+
+    def _start(self) -> None:
+        """Arranca el hilo escritor (se llama con self._lock tomado)."""
+        self._thread = threading.Thread(target=self._run, name="auditoria-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Bucle del hilo: junta registros y los escribe por tamaño, tiempo o señal."""
+        lote: List[tuple] = []
+        limite = 0.0  # Momento en que vence el registro más antiguo del lote
+        while True:
+            espera = None if not lote else max(0.0, limite - time.monotonic())
+            try:
+                item = self._queue.get(timeout=espera)
+            except queue.Empty:
+                item = None  # Venció el intervalo con registros pendientes
+            if item is None:
+                self._write(lote)
+                lote = []
+                continue
+            if isinstance(item, _Senal):
+                self._write(lote)
+                lote = []
+                item.evento.set()
+                if item.detener:
+                    return
+                continue
+            if not lote:
+                limite = time.monotonic() + self.flush_interval
+            lote.append(item)
+            if len(lote) >= self.batch_size:
+                self._write(lote)
+                lote = []
+
+    def _write(self, lote: List[tuple]) -> None:
+        """Inserta el lote en una sola transacción, con reintentos ante errores de la BD."""
+        if not lote:
+            return
+        ids = None
+        for intento in range(1, self.REINTENTOS + 1):
+            try:
+                if ids is None:
+                    ids = next_ids("auditoria", "id_auditoria", len(lote))  # Un bloque por lote
+                with db_connection() as conn:
+                    with db_cursor(conn) as cur:
+                        cur.executemany(INSERT_AUDITORIA, [(i, *r) for i, r in zip(ids, lote)])
+                return
+            except Error as e:
+                log.warning("Fallo al escribir %d registros de auditoría (intento %d): %s", len(lote), intento, e)
+                time.sleep(0.5 * intento)
+            except Exception:
+                log.exception("Error inesperado en el escritor de auditoría")
+                break
+        log.error("Se descartaron %d registros de auditoría tras %d intentos", len(lote), self.REINTENTOS)
+
+
+_writer = AuditWriter()  # Escritor global del proceso
+atexit.register(_writer.close)  # Vaciado durable al terminar
+
+
+def flush_auditoria(timeout: Optional[float] = None) -> bool:
+    """Bloquea hasta que la auditoría encolada esté confirmada en la BD."""
+    return _writer.flush(timeout)
+
+
+def registrar_accion(usuario: str, accion: str, tabla_afectada: str, sincrono: bool = False,
+                     id_auditoria: Optional[int] = None) -> None:
+    """
+    Registra una fila en 'auditoria' con la acción efectuada.
+    Por defecto se encola en el escritor en segundo plano; con sincrono=True
+    (o AUDIT_ASYNC=0) se inserta y confirma antes de volver; también si el escritor ya se cerró.
+    Dentro de unit_of_work() se inserta en la conexión de la unidad y se confirma con ella.
+    'id_auditoria' es un ID reservado de antemano: quien abre una unidad de trabajo lo toma antes,
+    porque dentro de ella los triggers ya pueden tener bloqueada la fila 'auditoria' de 'secuencias'.
+    """
+    if AUDIT_ASYNC and not sincrono and not in_unit_of_work():
+        if _writer.submit(usuario, accion, tabla_afectada):  # Fuera del camino de latencia
+            return
+    nuevo_id = id_auditoria if id_auditoria is not None else next_id("auditoria", "id_auditoria")  # Próximo ID
+    with db_connection() as conn:  # Conexión del pool, o la de la unidad de trabajo en curso
+        execute_prepared(
+            conn, INSERT_AUDITORIA, (nuevo_id, usuario, accion, tabla_afectada, date.today())
+        )  # Inserta registro de auditoría (sentencia preparada)
 
 
-def listar_auditoria(limit: int = 50) -> List[Dict]:
-    """Devuelve las últimas 'limit' entradas de auditoría."""
-    conn = get_connection()
-    try:
-        with db_cursor(conn) as cur:
-            cur.execute(
-                """
-                SELECT id_auditoria, usuario, accion, tabla_afectada, fecha
-                FROM auditoria
-                ORDER BY id_auditoria DESC
-                LIMIT %s
-                """,
-                (limit,),
-            )
-            return cur.fetchall()  # Lista de auditoría
-    finally:
-        conn.close()
+def _pagina_auditoria(conn, limit: int, before_id: Optional[int], after_id: Optional[int]) -> List[Dict]:
+    """Una página de auditoría paginada por id_auditoria."""
+    cond, params, orden = keyset_clause("id_auditoria", before_id, after_id)
+    with db_cursor(conn) as cur:
+        cur.execute(
+            f"""
+            SELECT id_auditoria, usuario, accion, tabla_afectada, fecha
+            FROM auditoria
+            WHERE {cond}
+            ORDER BY id_auditoria {orden}
+            LIMIT %s
+            """,
+            (*params, limit),
+        )
+        return cur.fetchall()
+
+
+def listar_auditoria(limit: int = 50, before_id: Optional[int] = None,
+                     after_id: Optional[int] = None) -> List[Dict]:
+    """Devuelve 'limit' entradas de auditoría (las últimas, o relativas al cursor before_id/after_id)."""
+    flush_auditoria()  # Lee lo propio: confirma primero lo encolado por este proceso
+    with db_connection() as conn:  # Conexión prestada del pool
+        return _pagina_auditoria(conn, limit, before_id, after_id)  # Lista de auditoría
+
+
+def iterar_auditoria(page_size: int = 50, before_id: Optional[int] = None,
+                     after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Genera páginas de auditoría (más nuevas primero) sobre una sola conexión."""
+    flush_auditoria()
+    return iter_pages(_pagina_auditoria, "id_auditoria", page_size, before_id, after_id)
@@ -1,97 +1,222 @@
 # -*- coding: utf-8 -*-  # Codificación del archivo fuente
 """
 Consultas y registros en tablas operativas:
-- Accesos (registro y listados, propios y generales)
+- Accesos (registro individual y masivo, listados propios y generales, por red CIDR)
 - Sistemas (listado)
-- Eventos de seguridad (crear y listar)
-- Alertas (crear y listar)
+- Eventos de seguridad (crear, listar y por usuario)
+- Alertas (crear individual o en lote, listar y por usuario)
 """  # Docstring de módulo: responsabilidades
 
+import ipaddress  # IPs empaquetadas y rangos CIDR
 from datetime import date  # Fechas para registros
-from typing import List, Dict, Optional  # Tipos de retorno
-
-from db import get_connection, db_cursor, get_next_id  # Helpers de BD
+from functools import partial  # Fija id_usuario en los paginadores por usuario
+from itertools import islice  # Corte del iterable en lotes
+from typing import List, Dict, Optional, Iterable, Iterator, Callable, Tuple  # Tipos de retorno
+
+from config import BULK_CHUNK_SIZE  # Tamaño de lote por defecto
+from db import db_connection, db_cursor, prepared_cursor, execute_prepared, unit_of_work  # Helpers de BD
+from db import next_id, next_ids, keyset_clause, iter_pages, schema  # IDs, paginación y esquema
 from modules.auditoria import registrar_accion         # Registro de auditoría
+
+INSERT_ACCESO = """
+    INSERT INTO accesos (id_acceso, id_usuario, fecha, exitoso, ip, id_sistema)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""  # Sentencia compartida por el registro individual (preparado) y el masivo
+
+INSERT_ACCESO_IP_BIN = """
+    INSERT INTO accesos (id_acceso, id_usuario, fecha, exitoso, ip, id_sistema, ip_bin)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""  # Igual, con la IP empaquetada (BD con la migración 2 aplicada)
+
+
+def ip_binaria(ip: Optional[str]) -> Optional[bytes]:
+    """IP empaquetada igual que INET6_ATON (4 bytes IPv4, 16 bytes IPv6); None si no es válida."""
+    try:
+        return ipaddress.ip_address((ip or "").strip()).packed
+    except ValueError:
+        return None
+
+
+def condicion_cidr(cidr: str, columna: str = "ip_bin") -> Tuple[str, tuple]:
+    """
+    Filtro SQL de pertenencia a una red ('10.0.0.0/8', '2001:db8::/32'; una IP sola es /32 o /128).
+    Es un rango BETWEEN sobre la columna empaquetada (usa idx_accesos_ip_bin). El LENGTH separa
+    familias: una IPv6 de 16 bytes puede caer entre dos límites IPv4 de 4 bytes al comparar por bytes.
+    Lanza ValueError si 'cidr' no es una red válida.
+    """
+    red = ipaddress.ip_network(cidr.strip(), strict=False)
+    inicio, fin = red.network_address.packed, red.broadcast_address.packed
+    return f"{columna} BETWEEN %s AND %s AND LENGTH({columna}) = %s", (inicio, fin, len(inicio))
+
+
+def requiere_ip_binaria() -> None:
+    """Falla con un mensaje claro si la BD aún no tiene `accesos.ip_bin`."""
+    if not schema.has("accesos.ip_bin"):
+        raise RuntimeError("Falta la columna accesos.ip_bin: aplica las migraciones (execute_sql_file.py --migrate-only)")
 
 
 def listar_sistemas() -> List[Dict]:
-    conn = get_connection()  # Abre conexión
-    try:
+    with db_connection() as conn:  # Conexión prestada del pool
         with db_cursor(conn) as cur:  # Cursor con commit/rollback automático
             cur.execute(
                 "SELECT id_sistema, nombre_sistema, descripcion FROM sistemas ORDER BY id_sistema"
             )  # Consulta ordenada
             return cur.fetchall()  # Retorna lista de sistemas
-    finally:
-        conn.close()
 
 
 def registrar_acceso(id_usuario: int, exitoso: bool, ip: str, id_sistema: int, actor: str) -> int:
     """Inserta un acceso y registra auditoría."""
-    conn = get_connection()
-    try:
-        nuevo_id = get_next_id(conn, "accesos", "id_acceso")  # Próximo ID
-        with db_cursor(conn) as cur:
-            cur.execute(
-                """
-                INSERT INTO accesos (id_acceso, id_usuario, fecha, exitoso, ip, id_sistema)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                (nuevo_id, id_usuario, date.today(), exitoso, ip, id_sistema),
-            )  # Inserta registro de acceso
-        registrar_accion(actor, "INSERT", "accesos")  # Auditoría del actor
+    nuevo_id = next_id("accesos", "id_acceso")  # Próximo ID
+    id_auditoria = next_id("auditoria", "id_auditoria")  # Antes de abrir la unidad (ver registrar_accion)
+    fila = (nuevo_id, id_usuario, date.today(), exitoso, ip, id_sistema)
+    sql = INSERT_ACCESO
+    if schema.has("accesos.ip_bin"):  # Registro memoizado: sin consulta extra
+        sql, fila = INSERT_ACCESO_IP_BIN, fila + (ip_binaria(ip),)
+    with unit_of_work() as conn:  # Insert y auditoría: una conexión, un commit
+        execute_prepared(conn, sql, fila)  # Inserta registro de acceso (sentencia preparada)
+        registrar_accion(actor, "INSERT", "accesos", id_auditoria=id_auditoria)  # Auditoría del actor
         return nuevo_id
-    finally:
-        conn.close()
 
 
-def listar_accesos(limit: int = 100) -> List[Dict]:
-    """Lista accesos con nombre de usuario y sistema (JOIN)."""
-    conn = get_connection()
-    try:
-        with db_cursor(conn) as cur:
-            cur.execute(
-                """
-                SELECT a.id_acceso, u.nombre AS usuario, a.fecha, a.exitoso, a.ip,
-                       s.nombre_sistema AS sistema
-                FROM accesos a
-                JOIN usuarios u ON a.id_usuario = u.id_usuario
-                JOIN sistemas s ON a.id_sistema = s.id_sistema
-                ORDER BY a.id_acceso DESC
-                LIMIT %s
-                """,
-                (limit,),
-            )
-            return cur.fetchall()  # Devuelve lista con joins
-    finally:
-        conn.close()
+def registrar_accesos_bulk(
+    registros: Iterable[Dict],
+    actor: str,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    progreso: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Inserta accesos desde un iterable (puede ser un generador) en lotes.
+    Cada registro es un dict con id_usuario, exitoso, ip, id_sistema y opcionalmente fecha.
+    Por lote: un bloque de IDs (reservado antes de tomar la conexión), un executemany
+    multi-fila y un único commit; la conexión vuelve al pool entre lotes.
+    'progreso' recibe el total acumulado tras cada lote. Devuelve filas insertadas.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size debe ser >= 1")
+    total = 0
+    it = iter(registros)
+    con_ip_bin = schema.has("accesos.ip_bin")  # BD migrada: también la IP empaquetada
+    while True:
+        lote = list(islice(it, chunk_size))  # Solo un lote en memoria
+        if not lote:
+            break
+        ids = next_ids("accesos", "id_acceso", len(lote))  # Bloque de IDs sin MAX(), sin conexión tomada
+        hoy = date.today()
+        filas = [
+            (nuevo_id, r["id_usuario"], r.get("fecha") or hoy, bool(r["exitoso"]), r["ip"], r["id_sistema"])
+            for nuevo_id, r in zip(ids, lote)
+        ]
+        if con_ip_bin:
+            filas = [f + (ip_binaria(f[4]),) for f in filas]
+        with db_connection() as conn:  # Un préstamo por lote: la reserva de IDs no pide un segundo
+            with db_cursor(conn) as cur:  # Una transacción por lote
+                cur.executemany(INSERT_ACCESO_IP_BIN if con_ip_bin else INSERT_ACCESO, filas)  # El conector lo reescribe como INSERT multi-fila
+        total += len(filas)
+        if progreso:
+            progreso(total)
+    if total:
+        registrar_accion(actor, "INSERT", "accesos")  # Una auditoría por ingesta
+    return total
+
+
+def _pagina_accesos(conn, limit: int, before_id: Optional[int], after_id: Optional[int]) -> List[Dict]:
+    """Una página de accesos (JOIN) paginada por id_acceso."""
+    cond, params, orden = keyset_clause("a.id_acceso", before_id, after_id)
+    with db_cursor(conn) as cur:
+        cur.execute(
+            f"""
+            SELECT a.id_acceso, u.nombre AS usuario, a.fecha, a.exitoso, a.ip,
+                   s.nombre_sistema AS sistema
+            FROM accesos a
+            JOIN usuarios u ON a.id_usuario = u.id_usuario
+            JOIN sistemas s ON a.id_sistema = s.id_sistema
+            WHERE {cond}
+            ORDER BY a.id_acceso {orden}
+            LIMIT %s
+            """,
+            (*params, limit),
+        )  # Recorrido por rango de PK: costo constante por página
+        return cur.fetchall()
+
+
+def listar_accesos(limit: int = 100, before_id: Optional[int] = None,
+                   after_id: Optional[int] = None) -> List[Dict]:
+    """Lista accesos con nombre de usuario y sistema (JOIN); admite cursor before_id/after_id."""
+    with db_connection() as conn:  # Conexión prestada del pool
+        return _pagina_accesos(conn, limit, before_id, after_id)  # Devuelve lista con joins
+
+
+def iterar_accesos(page_size: int = 100, before_id: Optional[int] = None,
+                   after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Genera páginas de accesos (más nuevos primero) sobre una sola conexión."""
+    return iter_pages(_pagina_accesos, "id_acceso", page_size, before_id, after_id)
 
 
-def accesos_por_usuario(id_usuario: int, limit: int = 50) -> List[Dict]:
+def _pagina_accesos_usuario(conn, limit: int, before_id: Optional[int], after_id: Optional[int],
+                            id_usuario: int) -> List[Dict]:
+    """Una página de accesos de un usuario (índice idx_accesos_usuario)."""
+    cond, params, orden = keyset_clause("id_acceso", before_id, after_id)
+    with prepared_cursor(
+        conn,
+        f"""
+        SELECT id_acceso, fecha, exitoso, ip, id_sistema
+        FROM accesos
+        WHERE id_usuario = %s AND {cond}
+        ORDER BY id_acceso {orden}
+        LIMIT %s
+        """,  # A lo sumo 4 variantes de SQL (según el cursor): cada una se prepara una vez
+        (id_usuario, *params, limit),
+    ) as cur:
+        return cur.fetchall()
+
+
+def accesos_por_usuario(id_usuario: int, limit: int = 50, before_id: Optional[int] = None,
+                        after_id: Optional[int] = None) -> List[Dict]:
     """Lista accesos del usuario dado."""
-    conn = get_connection()
-    try:
+    with db_connection() as conn:  # Conexión prestada del pool
+        return _pagina_accesos_usuario(conn, limit, before_id, after_id, id_usuario)  # Accesos del usuario
+
+
+def iterar_accesos_por_usuario(id_usuario: int, page_size: int = 50, before_id: Optional[int] = None,
+                               after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Genera páginas de accesos del usuario sobre una sola conexión."""
+    return iter_pages(partial(_pagina_accesos_usuario, id_usuario=id_usuario), "id_acceso",
+                      page_size, before_id, after_id)
+
+
+def accesos_por_cidr(cidr: str, exitoso: Optional[bool] = None, limit: int = 100) -> List[Dict]:
+    """
+    Accesos desde IPs de la red 'cidr' (p.ej. todos los fallos desde 10.0.0.0/8 con exitoso=False).
+    Recorre el rango de idx_accesos_ip_bin en el orden del índice (IP, resultado, id), así que
+    el LIMIT corta el recorrido sin ordenar el rango completo.
+    """
+    requiere_ip_binaria()
+    cond, params = condicion_cidr(cidr)
+    orden = "ip_bin, exitoso, id_acceso"
+    if exitoso is not None:
+        cond += " AND exitoso = %s"
+        params += (exitoso,)
+        orden = "ip_bin, id_acceso"  # Resultado fijo: el índice ya viene en este orden
+    with db_connection() as conn:  # Conexión prestada del pool
         with db_cursor(conn) as cur:
             cur.execute(
-                """
-                SELECT id_acceso, fecha, exitoso, ip, id_sistema
+                f"""
+                SELECT id_acceso, id_usuario, fecha, exitoso, ip, id_sistema
                 FROM accesos
-                WHERE id_usuario = %s
-                ORDER BY id_acceso DESC
+                WHERE {cond}
+                ORDER BY {orden}
                 LIMIT %s
                 """,
-                (id_usuario, limit),
-            )
-            return cur.fetchall()  # Accesos del usuario
-    finally:
-        conn.close()
+                (*params, limit),
+            )  # Rango sobre idx_accesos_ip_bin
+            return cur.fetchall()
 
 
 def crear_evento(id_usuario: int, tipo_evento: str, descripcion: str, actor: str) -> int:
     """Inserta evento de seguridad para usuario."""
-    conn = get_connection()
-    try:
-        nuevo_id = get_next_id(conn, "eventos_seguridad", "id_evento")  # Próximo ID
+    nuevo_id = next_id("eventos_seguridad", "id_evento")  # Próximo ID
+    id_auditoria = next_id("auditoria", "id_auditoria")  # Antes de abrir la unidad (ver registrar_accion)
+    with unit_of_work() as conn:  # Insert y auditoría: una conexión, un commit
         with db_cursor(conn) as cur:
             cur.execute(
                 """
@@ -100,35 +225,76 @@ def crear_evento(id_usuario: int, tipo_evento: str, descripcion: str, actor: str
                 """,
                 (nuevo_id, id_usuario, tipo_evento, descripcion, date.today()),
             )  # Inserta evento
-        registrar_accion(actor, "INSERT", "eventos_seguridad")  # Auditoría
+        registrar_accion(actor, "INSERT", "eventos_seguridad", id_auditoria=id_auditoria)  # Auditoría
         return nuevo_id
-    finally:
-        conn.close()
 
 
-def listar_eventos(limit: int = 100) -> List[Dict]:
-    conn = get_connection()
-    try:
-        with db_cursor(conn) as cur:
-            cur.execute(
-                """
-                SELECT e.id_evento, u.nombre AS usuario, e.tipo_evento, e.descripcion, e.fecha
-                FROM eventos_seguridad e
-                JOIN usuarios u ON e.id_usuario = u.id_usuario
-                ORDER BY e.id_evento DESC
-                LIMIT %s
-                """,
-                (limit,),
-            )
-            return cur.fetchall()  # Lista con join de usuarios
-    finally:
-        conn.close()
+def _pagina_eventos(conn, limit: int, before_id: Optional[int], after_id: Optional[int]) -> List[Dict]:
+    """Una página de eventos (JOIN usuarios) paginada por id_evento."""
+    cond, params, orden = keyset_clause("e.id_evento", before_id, after_id)
+    with db_cursor(conn) as cur:
+        cur.execute(
+            f"""
+            SELECT e.id_evento, u.nombre AS usuario, e.tipo_evento, e.descripcion, e.fecha
+            FROM eventos_seguridad e
+            JOIN usuarios u ON e.id_usuario = u.id_usuario
+            WHERE {cond}
+            ORDER BY e.id_evento {orden}
+            LIMIT %s
+            """,
+            (*params, limit),
+        )
+        return cur.fetchall()
+
+
+def listar_eventos(limit: int = 100, before_id: Optional[int] = None,
+                   after_id: Optional[int] = None) -> List[Dict]:
+    with db_connection() as conn:  # Conexión prestada del pool
+        return _pagina_eventos(conn, limit, before_id, after_id)  # Lista con join de usuarios
+
+
+def iterar_eventos(page_size: int = 100, before_id: Optional[int] = None,
+                   after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Genera páginas de eventos (más nuevos primero) sobre una sola conexión."""
+    return iter_pages(_pagina_eventos, "id_evento", page_size, before_id, after_id)
 
 
+def _pagina_eventos_usuario(conn, limit: int, before_id: Optional[int], after_id: Optional[int],
+                            id_usuario: int) -> List[Dict]:
+    """Una página de eventos de un usuario (índice idx_eventos_usuario, sin JOIN)."""
+    cond, params, orden = keyset_clause("id_evento", before_id, after_id)
+    with db_cursor(conn) as cur:
+        cur.execute(
+            f"""
+            SELECT id_evento, tipo_evento, descripcion, fecha
+            FROM eventos_seguridad
+            WHERE id_usuario = %s AND {cond}
+            ORDER BY id_evento {orden}
+            LIMIT %s
+            """,
+            (id_usuario, *params, limit),
+        )
+        return cur.fetchall()
+
+
+def eventos_por_usuario(id_usuario: int, limit: int = 50, before_id: Optional[int] = None,
+                        after_id: Optional[int] = None) -> List[Dict]:
+    """Lista eventos de seguridad del usuario dado (filtrado en SQL)."""
+    with db_connection() as conn:  # Conexión prestada del pool
+        return _pagina_eventos_usuario(conn, limit, before_id, after_id, id_usuario)
+
+
+def iterar_eventos_por_usuario(id_usuario: int, page_size: int = 50, before_id: Optional[int] = None,
+                               after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Genera páginas de eventos del usuario sobre una sola conexión."""
+    return iter_pages(partial(_pagina_eventos_usuario, id_usuario=id_usuario), "id_evento",
+                      page_size, before_id, after_id)
+
+
 def crear_alerta(id_usuario: int, mensaje: str, actor: str) -> int:
-    conn = get_connection()
-    try:
-        nuevo_id = get_next_id(conn, "alertas", "id_alerta")  # Próximo ID
+    nuevo_id = next_id("alertas", "id_alerta")  # Próximo ID
+    id_auditoria = next_id("auditoria", "id_auditoria")  # Antes de abrir la unidad (ver registrar_accion)
+    with unit_of_work() as conn:  # Insert y auditoría: una conexión, un commit
         with db_cursor(conn) as cur:
             cur.execute(
                 """
@@ -137,26 +303,88 @@ def crear_alerta(id_usuario: int, mensaje: str, actor: str) -> int:
                 """,
                 (nuevo_id, id_usuario, mensaje, date.today()),
             )  # Inserta alerta
-        registrar_accion(actor, "INSERT", "alertas")  # Auditoría
+        registrar_accion(actor, "INSERT", "alertas", id_auditoria=id_auditoria)  # Auditoría
         return nuevo_id
-    finally:
-        conn.close()
-
-
-def listar_alertas(limit: int = 100) -> List[Dict]:
-    conn = get_connection()
-    try:
+
+
+def crear_alertas_bulk(alertas: Iterable[Tuple[int, str]], actor: str) -> List[int]:
+    """
+    Inserta muchas alertas (id_usuario, mensaje) en una transacción: un bloque de IDs,
+    un executemany multi-fila y una sola fila de auditoría. Devuelve los IDs en el mismo orden.
+    """
+    filas = list(alertas)
+    if not filas:
+        return []
+    ids = next_ids("alertas", "id_alerta", len(filas))  # Un bloque para todo el lote
+    id_auditoria = next_id("auditoria", "id_auditoria")  # Antes de abrir la unidad (ver registrar_accion)
+    hoy = date.today()
+    with unit_of_work() as conn:  # Inserts y auditoría: una conexión, un commit
         with db_cursor(conn) as cur:
-            cur.execute(
-                """
-                SELECT a.id_alerta, u.nombre AS usuario, a.mensaje, a.fecha
-                FROM alertas a
-                JOIN usuarios u ON a.id_usuario = u.id_usuario
-                ORDER BY a.id_alerta DESC
-                LIMIT %s
-                """,
-                (limit,),
-            )
-            return cur.fetchall()  # Lista de alertas con join
-    finally:
-        conn.close()
+            cur.executemany(
+                "INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha) VALUES (%s, %s, %s, %s)",
+                [(nuevo_id, id_usuario, mensaje, hoy) for nuevo_id, (id_usuario, mensaje) in zip(ids, filas)],
+            )  # El conector lo reescribe como INSERT multi-fila
+        registrar_accion(actor, "INSERT", "alertas", id_auditoria=id_auditoria)  # Una auditoría por lote
+    return ids
+
+
+def _pagina_alertas(conn, limit: int, before_id: Optional[int], after_id: Optional[int]) -> List[Dict]:
+    """Una página de alertas (JOIN usuarios) paginada por id_alerta."""
+    cond, params, orden = keyset_clause("a.id_alerta", before_id, after_id)
+    with db_cursor(conn) as cur:
+        cur.execute(
+            f"""
+            SELECT a.id_alerta, u.nombre AS usuario, a.mensaje, a.fecha
+            FROM alertas a
+            JOIN usuarios u ON a.id_usuario = u.id_usuario
+            WHERE {cond}
+            ORDER BY a.id_alerta {orden}
+            LIMIT %s
+            """,
+            (*params, limit),
+        )
+        return cur.fetchall()
+
+
+def listar_alertas(limit: int = 100, before_id: Optional[int] = None,
+                   after_id: Optional[int] = None) -> List[Dict]:
+    with db_connection() as conn:  # Conexión prestada del pool
+        return _pagina_alertas(conn, limit, before_id, after_id)  # Lista de alertas con join
+
+
+def iterar_alertas(page_size: int = 100, before_id: Optional[int] = None,
+                   after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Genera páginas de alertas (más nuevas primero) sobre una sola conexión."""
+    return iter_pages(_pagina_alertas, "id_alerta", page_size, before_id, after_id)
+
+
+def _pagina_alertas_usuario(conn, limit: int, before_id: Optional[int], after_id: Optional[int],
+                            id_usuario: int) -> List[Dict]:
+    """Una página de alertas de un usuario (índice idx_alertas_usuario, sin JOIN)."""
+    cond, params, orden = keyset_clause("id_alerta", before_id, after_id)
+    with db_cursor(conn) as cur:
+        cur.execute(
+            f"""
+            SELECT id_alerta, mensaje, fecha
+            FROM alertas
+            WHERE id_usuario = %s AND {cond}
+            ORDER BY id_alerta {orden}
+            LIMIT %s
+            """,
+            (id_usuario, *params, limit),
+        )
+        return cur.fetchall()
+
+
+def alertas_por_usuario(id_usuario: int, limit: int = 50, before_id: Optional[int] = None,
+                        after_id: Optional[int] = None) -> List[Dict]:
+    """Lista alertas del usuario dado (filtrado en SQL por id_usuario)."""
+    with db_connection() as conn:  # Conexión prestada del pool
+        return _pagina_alertas_usuario(conn, limit, before_id, after_id, id_usuario)
+
+
+def iterar_alertas_por_usuario(id_usuario: int, page_size: int = 50, before_id: Optional[int] = None,
+                               after_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Genera páginas de alertas del usuario sobre una sola conexión."""
+    return iter_pages(partial(_pagina_alertas_usuario, id_usuario=id_usuario), "id_alerta",
+                      page_size, before_id, after_id)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Exportación en streaming de tablas operativas (accesos, eventos, alertas, auditoría):
+- Cursor sin buffer: las filas se leen del servidor a medida que se escriben
+- Salida CSV o JSONL, opcionalmente comprimida con gzip, escrita de forma incremental
+- Filtros por rango de fechas y reanudación incremental por marca de agua (último ID más huecos)
+La memoria usada es constante: a lo sumo 'lote' filas a la vez, sin importar el tamaño de la tabla.
+"""  # Docstring de módulo: responsabilidades
+
+import csv   # Escritura CSV incremental
+import gzip  # Compresión opcional
+import json  # Escritura JSONL
+from contextlib import closing  # Cierre garantizado del generador de filas
+from datetime import date  # Filtros por fecha
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple  # Tipos auxiliares
+
+from config import EXPORT_FETCH_SIZE  # Filas por fetchmany
+from db import db_connection, Watermark  # Conexión prestada del pool y marca de agua con huecos
+
+# Tablas exportables: tabla -> (columna PK, columnas exportadas)
+TABLAS_EXPORTABLES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "accesos": ("id_acceso", ("id_acceso", "id_usuario", "fecha", "exitoso", "ip", "id_sistema")),
+    "eventos_seguridad": ("id_evento", ("id_evento", "id_usuario", "tipo_evento", "descripcion", "fecha")),
+    "alertas": ("id_alerta", ("id_alerta", "id_usuario", "mensaje", "fecha")),
+    "auditoria": ("id_auditoria", ("id_auditoria", "usuario", "accion", "tabla_afectada", "fecha")),
+}
+
+FORMATOS = ("csv", "jsonl")  # Formatos soportados
+
+
+def iterar_filas(tabla: str, desde: Optional[date] = None, hasta: Optional[date] = None,
+                 desde_id: Optional[int] = None, lote: int = EXPORT_FETCH_SIZE,
+                 origen: Optional[str] = None, huecos: Iterable[int] = ()) -> Iterator[tuple]:
+    """
+    Genera las filas de 'tabla' (tuplas en el orden de TABLAS_EXPORTABLES) por PK ascendente.
+    - desde/hasta: rango de fechas inclusivo sobre la columna 'fecha'
+    - desde_id: reanuda con las filas de PK mayor a este valor
+    - huecos: IDs por debajo de 'desde_id' que se vuelven a buscar (confirmados tarde, ver Watermark)
+    - origen: tabla física a leer con las columnas de 'tabla' (p.ej. una partición intercambiada)
+    Usa un cursor sin buffer y fetchmany: nunca hay más de 'lote' filas en memoria.
+    """
+    if tabla not in TABLAS_EXPORTABLES:
+        raise ValueError(f"Tabla no exportable: {tabla}")
+    pk, columnas = TABLAS_EXPORTABLES[tabla]
+    condiciones, params = [], []
+    ids = list(huecos)
+    if desde_id is not None and ids:
+        condiciones.append(f"({pk} > %s OR {pk} IN ({', '.join(['%s'] * len(ids))}))")  # Rango más puntuales
+        params.extend([desde_id, *ids])
+    elif desde_id is not None:
+        condiciones.append(f"{pk} > %s")  # Rango sobre la PK: reanudar no relee lo exportado
+        params.append(desde_id)
+    if desde is not None:
+        condiciones.append("fecha >= %s")
+        params.append(desde)
+    if hasta is not None:
+        condiciones.append("fecha <= %s")
+        params.append(hasta)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with db_connection() as conn:  # Una conexión durante toda la exportación
+        cur = conn.cursor(buffered=False)  # Streaming desde el servidor, filas como tuplas
+        try:
+            cur.execute(f"SELECT {', '.join(columnas)} FROM {origen or tabla} {where} ORDER BY {pk}", tuple(params))
+            while True:
+                filas = cur.fetchmany(lote)
+                if not filas:
+                    break
+                yield from filas
+        finally:
+            cur.close()  # Descarta lo no leído si el consumidor cortó antes
+
+
+def _abrir_salida(ruta: str, comprimir: bool):
+    """Abre el archivo destino en modo texto, con gzip si corresponde."""
+    if comprimir:
+        return gzip.open(ruta, "wt", encoding="utf-8", newline="")
+    return open(ruta, "w", encoding="utf-8", newline="")
+
+
+def _valor_json(valor):
+    """Serializa fechas como ISO 8601 en JSONL."""
+    return valor.isoformat() if isinstance(valor, date) else str(valor)
+
+
+def exportar_tabla(tabla: str, ruta: str, formato: str = "csv", comprimir: bool = False,
+                   desde: Optional[date] = None, hasta: Optional[date] = None,
+                   desde_id: Optional[int] = None, lote: int = EXPORT_FETCH_SIZE,
+                   origen: Optional[str] = None, marca: Optional[Watermark] = None) -> Tuple[int, Optional[int]]:
+    """
+    Exporta 'tabla' a 'ruta' en el formato pedido.
+    Devuelve (filas escritas, último ID exportado). Si no hubo filas nuevas, el último ID es 'desde_id'.
+    Las tablas exportables usan secuencias ordenadas (db.ORDERED_SEQUENCES): una fila escrita después
+    de la corrida anterior tiene un ID mayor al último exportado, sea de la app o de un trigger.
+    Reanudar solo con 'desde_id' igual saltea un ID reservado antes pero confirmado después del
+    export; para exportaciones incrementales conviene pasar 'marca' (la Watermark de la corrida
+    anterior): se leen las filas nuevas y los huecos pendientes, y se actualiza con lo exportado.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    if tabla not in TABLAS_EXPORTABLES:
+        raise ValueError(f"Tabla no exportable: {tabla}")
+    pk, columnas = TABLAS_EXPORTABLES[tabla]
+    posicion_pk = columnas.index(pk)
+    huecos: List[int] = []
+    if marca is not None:
+        desde_id, huecos = marca.mark, marca.pending()
+    total, ultimo_id = 0, desde_id
+    filas = iterar_filas(tabla, desde=desde, hasta=hasta, desde_id=desde_id, lote=lote, origen=origen,
+                         huecos=huecos)
+    with _abrir_salida(ruta, comprimir) as f, closing(filas):  # closing: libera la conexión aunque falle la escritura
+        if formato == "csv":
+            escritor = csv.writer(f)
+            escritor.writerow(columnas)  # Encabezado
+            for fila in filas:
+                escritor.writerow(fila)
+                total += 1
+                ultimo_id = _avanzar(marca, ultimo_id, fila[posicion_pk])
+        else:
+            for fila in filas:
+                f.write(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_valor_json))
+                f.write("\n")
+                total += 1
+                ultimo_id = _avanzar(marca, ultimo_id, fila[posicion_pk])
+    return total, ultimo_id
+
+
+def _avanzar(marca: Optional[Watermark], ultimo_id: Optional[int], pk: int) -> int:
+    """Último ID exportado tras escribir 'pk' (un hueco recuperado no lo hace retroceder)."""
+    if marca is not None:
+        marca.seen(pk)
+        return marca.mark
+    return pk if ultimo_id is None else max(ultimo_id, pk)
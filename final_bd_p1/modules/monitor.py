@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Modo en vivo (tail) sobre alertas, eventos de seguridad y auditoría:
+- Un único hilo poller compartido por todos los suscriptores del proceso
+- Lectura incremental por marca de agua (último ID visto): rango sobre la PK, sin re-consultar lo ya visto
+- Solo consulta las tablas que tienen al menos un suscriptor
+- Los IDs siguen el orden de reserva (db.ORDERED_SEQUENCES), pero cada uno se confirma con el commit
+  de quien lo reservó: los huecos por debajo de la marca se vuelven a revisar durante MONITOR_GAP_TTL
+  segundos, incluidos los IDs que faltaban al suscribirse
+Uso:
+    from modules import monitor
+    sus = monitor.suscribir(lambda tabla, filas: print(tabla, filas), tablas=["alertas"])
+    ...
+    sus.cancelar()
+    for tabla, fila in monitor.seguir(["alertas", "eventos_seguridad"]):  # Iterador bloqueante
+        ...
+"""  # Docstring de módulo: responsabilidades
+
+import logging    # Errores del poller y de los suscriptores
+import queue      # Cola del iterador seguir()
+import threading  # Hilo poller
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple  # Tipos auxiliares
+
+from config import MONITOR_POLL_INTERVAL, MONITOR_BATCH_SIZE, MONITOR_GAP_TTL, MONITOR_MAX_GAPS  # Config del poller
+from db import db_connection, db_cursor, prepared_cursor, Watermark  # Helpers de BD y marca de agua con huecos
+
+log = logging.getLogger(__name__)
+
+# Tablas seguibles: tabla -> (columna PK, columnas del SELECT, FROM/JOIN)
+FUENTES: Dict[str, Tuple[str, str, str]] = {
+    "alertas": (
+        "a.id_alerta",
+        "a.id_alerta, a.id_usuario, u.nombre AS usuario, a.mensaje, a.fecha",
+        "alertas a JOIN usuarios u ON a.id_usuario = u.id_usuario",
+    ),
+    "eventos_seguridad": (
+        "e.id_evento",
+        "e.id_evento, e.id_usuario, u.nombre AS usuario, e.tipo_evento, e.descripcion, e.fecha",
+        "eventos_seguridad e JOIN usuarios u ON e.id_usuario = u.id_usuario",
+    ),
+    "auditoria": (
+        "id_auditoria",
+        "id_auditoria, usuario, accion, tabla_afectada, fecha",
+        "auditoria",
+    ),
+}
+
+Callback = Callable[[str, List[Dict]], None]  # callback(tabla, filas nuevas)
+
+
+class Suscripcion:
+    """Registro de un suscriptor; cancelar() (o salir del 'with') lo da de baja."""
+
+    def __init__(self, monitor: "Monitor", tablas: frozenset, callback: Callback):
+        self.tablas = tablas
+        self.callback = callback
+        self._monitor = monitor
+
+    def cancelar(self) -> None:
+        self._monitor.cancelar(self)
+
+    def __enter__(self) -> "Suscripcion":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cancelar()
+
+
+class Seguimiento:
+    """
+    Iterador bloqueante de (tabla, fila) nuevas sobre una suscripción propia.
+    - Se suscribe al crearse: no se pierde lo que llegue antes de la primera lectura
+    - Las filas pasan por una cola acotada: si el consumidor no da abasto se descartan (y se avisa)
+    - close() (o salir del 'with') cancela la suscripción
+    """
+
+    def __init__(self, monitor: "Monitor", tablas: Optional[Iterable[str]], max_pendientes: int):
+        self._cola: "queue.Queue" = queue.Queue(maxsize=max_pendientes)
+        self._cerrado = False
+        self._sus = monitor.suscribir(self._encolar, tablas)
+
+    def _encolar(self, tabla: str, filas: List[Dict]) -> None:
+        for fila in filas:
+            try:
+                self._cola.put_nowait((tabla, fila))
+            except queue.Full:
+                log.warning("Consumidor lento: se descartó una fila de %s", tabla)
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict]]:
+        return self
+
+    def __next__(self) -> Tuple[str, Dict]:
+        while True:
+            try:
+                return self._cola.get(timeout=0.5)  # Timeout corto: Ctrl+C se atiende enseguida
+            except queue.Empty:
+                if self._cerrado:
+                    raise StopIteration
+
+    def close(self) -> None:
+        self._cerrado = True
+        self._sus.cancelar()
+
+    def __enter__(self) -> "Seguimiento":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Monitor:
+    """
+    Poller compartido: sondea cada 'intervalo' s las tablas con suscriptores y entrega
+    a cada uno solo las filas nuevas de las tablas que pidió.
+    - Marca de agua por tabla: SELECT ... WHERE pk > marca ORDER BY pk LIMIT lote (rango sobre la PK)
+    - Si un sondeo trae 'lote' filas, vuelve a leer de inmediato hasta ponerse al día
+    - Huecos: IDs salteados por debajo de la marca se revisan por PK hasta 'ttl_huecos' s
+      (a lo sumo 'max_huecos' por tabla), por si los confirma tarde otro proceso
+    Los callbacks corren en el hilo poller: deben ser rápidos (ver seguir() para desacoplarlos).
+    """
+
+    def __init__(self, intervalo: float = MONITOR_POLL_INTERVAL, lote: int = MONITOR_BATCH_SIZE,
+                 ttl_huecos: float = MONITOR_GAP_TTL, max_huecos: int = MONITOR_MAX_GAPS):
+        if intervalo <= 0 or lote < 1:
+            raise ValueError("intervalo debe ser > 0 y lote >= 1")
+        self.intervalo = intervalo
+        self.lote = lote
+        self.ttl_huecos = ttl_huecos
+        self.max_huecos = max_huecos
+        self._suscripciones: List[Suscripcion] = []
+        self._cursores: Dict[str, Watermark] = {}  # Solo tablas con suscriptores
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()      # Corta la espera (baja de suscriptores, detener)
+        self._thread: Optional[threading.Thread] = None
+
+    def suscribir(self, callback: Callback, tablas: Optional[Iterable[str]] = None) -> Suscripcion:
+        """
+        Registra 'callback(tabla, filas)' para las filas nuevas de 'tablas' (por defecto todas).
+        Recibe lo que se inserte desde ahora; arranca el poller si no estaba corriendo.
+        """
+        tablas = frozenset(tablas or FUENTES)
+        desconocidas = tablas - FUENTES.keys()
+        if desconocidas:
+            raise ValueError(f"Tablas no soportadas: {', '.join(sorted(desconocidas))}")
+        nuevas = [t for t in tablas if t not in self._cursores]
+        marcas = self._marcas_actuales(nuevas) if nuevas else {}  # Fuera del lock: consulta a la BD
+        sus = Suscripcion(self, tablas, callback)
+        with self._lock:
+            for tabla, marca in marcas.items():
+                self._cursores.setdefault(tabla, marca)  # Si otro la agregó antes, se comparte
+            self._suscripciones.append(sus)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="monitor-poller", daemon=True)
+                self._thread.start()
+        return sus
+
+    def cancelar(self, sus: Suscripcion) -> None:
+        """Da de baja 'sus'; las tablas que quedan sin suscriptores dejan de sondearse."""
+        with self._lock:
+            if sus in self._suscripciones:
+                self._suscripciones.remove(sus)
+            en_uso = set().union(*(s.tablas for s in self._suscripciones))
+            for tabla in list(self._cursores):
+                if tabla not in en_uso:
+                    del self._cursores[tabla]
+        self._despertar.set()  # Sin suscriptores el hilo termina
+
+    def seguir(self, tablas: Optional[Iterable[str]] = None, max_pendientes: int = 10000) -> "Seguimiento":
+        """Iterador bloqueante de (tabla, fila) nuevas desde este momento (ver Seguimiento)."""
+        return Seguimiento(self, tablas, max_pendientes)
+
+    def detener(self) -> None:
+        """Da de baja a todos los suscriptores y detiene el poller."""
+        with self._lock:
+            self._suscripciones.clear()
+            self._cursores.clear()
+        self._despertar.set()
+
+    def _marcas_actuales(self, tablas: List[str]) -> Dict[str, Watermark]:
+        """
+        Marca de agua inicial de cada tabla: MAX(pk), y los IDs que faltan entre los últimos
+        'max_huecos' como huecos (una transacción abierta puede tenerlos reservados).
+        Un descenso y un rango corto sobre el índice de la PK por tabla.
+        """
+        marcas = {}
+        with db_connection() as conn:
+            with db_cursor(conn) as cur:
+                for tabla in tablas:
+                    pk = FUENTES[tabla][0].split(".")[-1]
+                    cur.execute(f"SELECT COALESCE(MAX({pk}), 0) AS marca FROM {tabla}")
+                    tope = int(cur.fetchone()["marca"])
+                    marca = Watermark(max(tope - self.max_huecos, 0), self.ttl_huecos, self.max_huecos)
+                    cur.execute(
+                        f"SELECT {pk} AS pk FROM {tabla} WHERE {pk} > %s AND {pk} <= %s ORDER BY {pk}",
+                        (marca.mark, tope),
+                    )  # Hasta 'tope': lo confirmado después de MAX() se entrega en el primer sondeo
+                    for fila in cur.fetchall():
+                        marca.seen(fila["pk"])  # Ya estaba: no se entrega; los IDs ausentes quedan como huecos
+                    marcas[tabla] = marca
+        return marcas
+
+    def _run(self) -> None:
+        """Bucle del hilo poller: sondea, reparte y espera el intervalo."""
+        while True:
+            with self._lock:
+                if not self._suscripciones:
+                    self._thread = None
+                    return
+                tablas = list(self._cursores)
+            self._despertar.clear()
+            try:
+                with db_connection() as conn:  # Una conexión por vuelta para todas las tablas
+                    for tabla in tablas:
+                        try:
+                            self._sondear(conn, tabla)
+                        except Exception:
+                            log.exception("Fallo al sondear %s", tabla)  # Las demás tablas siguen
+            except Exception:
+                log.exception("Sin conexión para sondear")
+            self._despertar.wait(self.intervalo)
+
+    def _sondear(self, conn, tabla: str) -> None:
+        """Lee lo nuevo de 'tabla' (y los huecos vigentes) y lo entrega a sus suscriptores."""
+        with self._lock:
+            cursor = self._cursores.get(tabla)
+        if cursor is None:
+            return  # Se quedó sin suscriptores
+        pk, columnas, origen = FUENTES[tabla]
+        clave = pk.split(".")[-1]
+        filas: List[Dict] = []
+        ids = cursor.pending()  # Huecos vigentes
+        if ids:
+            with db_cursor(conn) as cur:
+                cur.execute(
+                    f"SELECT {columnas} FROM {origen} WHERE {pk} IN ({', '.join(['%s'] * len(ids))}) ORDER BY {pk}",
+                    tuple(ids),
+                )  # Búsquedas puntuales por PK
+                for fila in cur.fetchall():
+                    cursor.seen(fila[clave])  # Confirmado tarde: se cierra el hueco
+                    filas.append(fila)
+        sql = f"SELECT {columnas} FROM {origen} WHERE {pk} > %s ORDER BY {pk} LIMIT %s"  # Rango sobre la PK
+        while True:
+            with prepared_cursor(conn, sql, (cursor.mark, self.lote)) as cur:
+                nuevas = cur.fetchall()
+            for fila in nuevas:
+                cursor.seen(fila[clave])  # Avanza la marca; los IDs salteados quedan como huecos
+            filas.extend(nuevas)
+            if len(nuevas) < self.lote:
+                break  # Al día
+        if filas:
+            self._entregar(tabla, filas)
+
+    def _entregar(self, tabla: str, filas: List[Dict]) -> None:
+        with self._lock:
+            destinatarios = [s for s in self._suscripciones if tabla in s.tablas]
+        for sus in destinatarios:
+            try:
+                sus.callback(tabla, filas)
+            except Exception:
+                log.exception("Error en un suscriptor de %s", tabla)  # No afecta a los demás
+
+
+_monitor: Optional[Monitor] = None  # Monitor global del proceso
+_monitor_lock = threading.Lock()
+
+
+def obtener_monitor() -> Monitor:
+    """Devuelve el monitor global, creándolo en el primer uso."""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = Monitor()
+    return _monitor
+
+
+def suscribir(callback: Callback, tablas: Optional[Iterable[str]] = None) -> Suscripcion:
+    """Suscribe 'callback(tabla, filas)' al monitor global."""
+    return obtener_monitor().suscribir(callback, tablas)
+
+
+def seguir(tablas: Optional[Iterable[str]] = None) -> Seguimiento:
+    """Iterador de (tabla, fila) nuevas sobre el monitor global."""
+    return obtener_monitor().seguir(tablas)
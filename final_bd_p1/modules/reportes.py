@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Reportes basados en las "Consultas avanzadas" del script SQL:
+- Leen tablas resumen (resumen_*) mantenidas de forma incremental por los triggers
+- Evitan GROUP BY sobre accesos/auditoría completos en cada consulta
+- Permiten reconstruir los resúmenes desde las tablas base si se desincronizan
+- Agregan por subred sobre la IP empaquetada (rango de idx_accesos_ip_bin, sin tabla resumen)
+"""  # Docstring de módulo: responsabilidades
+
+import ipaddress  # Redes CIDR y subredes
+from datetime import date  # Filtros por rango de fechas
+from typing import List, Dict, Optional  # Tipos de retorno
+
+from db import db_connection, db_cursor  # Helpers de BD
+from modules.auditoria import registrar_accion  # Auditoría de la reconstrucción
+from modules.consultas import condicion_cidr, requiere_ip_binaria  # Filtro por red sobre accesos.ip_bin
+
+# Reconstrucción completa: (tabla resumen, INSERT ... SELECT desde la tabla base)
+RECONSTRUCCION = [
+    (
+        "resumen_accesos_usuario",
+        """
+        INSERT INTO resumen_accesos_usuario (id_usuario, total, exitosos, fallidos)
+        SELECT id_usuario, COUNT(*), COALESCE(SUM(exitoso = TRUE), 0), COALESCE(SUM(exitoso = FALSE), 0)
+        FROM accesos WHERE id_usuario IS NOT NULL
+        GROUP BY id_usuario
+        """,
+    ),
+    (
+        "resumen_accesos_ip",
+        """
+        INSERT INTO resumen_accesos_ip (ip, total, fallidos)
+        SELECT COALESCE(ip, ''), COUNT(*), COALESCE(SUM(exitoso = FALSE), 0)
+        FROM accesos
+        GROUP BY COALESCE(ip, '')
+        """,
+    ),
+    (
+        "resumen_accesos_sistema_dia",
+        """
+        INSERT INTO resumen_accesos_sistema_dia (fecha, id_sistema, total, exitosos)
+        SELECT fecha, id_sistema, COUNT(*), COALESCE(SUM(exitoso = TRUE), 0)
+        FROM accesos WHERE fecha IS NOT NULL AND id_sistema IS NOT NULL
+        GROUP BY fecha, id_sistema
+        """,
+    ),
+    (
+        "resumen_alertas_usuario",
+        """
+        INSERT INTO resumen_alertas_usuario (id_usuario, total, ultima_fecha)
+        SELECT id_usuario, COUNT(*), MAX(fecha)
+        FROM alertas WHERE id_usuario IS NOT NULL
+        GROUP BY id_usuario
+        """,
+    ),
+    (
+        "resumen_auditoria",
+        """
+        INSERT INTO resumen_auditoria (tabla_afectada, accion, total)
+        SELECT COALESCE(tabla_afectada, ''), COALESCE(accion, ''), COUNT(*)
+        FROM auditoria
+        GROUP BY COALESCE(tabla_afectada, ''), COALESCE(accion, '')
+        """,
+    ),
+    (
+        "fallos_diarios",
+        """
+        INSERT INTO fallos_diarios (id_usuario, fecha, fallos)
+        SELECT id_usuario, fecha, COUNT(*)
+        FROM accesos WHERE exitoso = FALSE AND id_usuario IS NOT NULL AND fecha IS NOT NULL
+        GROUP BY id_usuario, fecha
+        """,
+    ),  # Contadores del bloqueo automático (trigger) y de fallos_acumulados
+]
+
+
+def resumen_accesos_por_usuario() -> List[Dict]:
+    """Consulta 1: accesos por usuario con tasa de éxito (desde resumen_accesos_usuario)."""
+    with db_connection() as conn:  # Conexión prestada del pool
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT u.id_usuario, u.nombre,
+                       COALESCE(r.total, 0) AS total,
+                       COALESCE(r.exitosos, 0) AS exitosos,
+                       COALESCE(r.fallidos, 0) AS fallidos,
+                       ROUND(100.0 * r.exitosos / NULLIF(r.total, 0), 2) AS tasa_exito_pct
+                FROM usuarios u
+                LEFT JOIN resumen_accesos_usuario r ON r.id_usuario = u.id_usuario
+                ORDER BY tasa_exito_pct DESC
+                """
+            )  # Una fila por usuario, sin recorrer accesos
+            return cur.fetchall()
+
+
+def top_ips_fallidas(limit: int = 5) -> List[Dict]:
+    """Consulta 2: IPs con más fallos y porcentaje de fallos."""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT ip, total, fallidos,
+                       ROUND(100.0 * fallidos / NULLIF(total, 0), 2) AS pct_fallos
+                FROM resumen_accesos_ip
+                ORDER BY fallidos DESC, total DESC
+                LIMIT %s
+                """,
+                (limit,),
+            )  # Usa idx_resumen_ip_fallidos
+            return cur.fetchall()
+
+
+def accesos_por_sistema_dia(desde: Optional[date] = None, hasta: Optional[date] = None,
+                            limit: int = 100) -> List[Dict]:
+    """Consulta 3: accesos por sistema y día con tasa de éxito, opcionalmente en un rango de fechas."""
+    condiciones, params = [], []
+    if desde is not None:
+        condiciones.append("r.fecha >= %s")
+        params.append(desde)
+    if hasta is not None:
+        condiciones.append("r.fecha <= %s")
+        params.append(hasta)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                f"""
+                SELECT s.id_sistema, s.nombre_sistema, r.fecha, r.total, r.exitosos,
+                       ROUND(100.0 * r.exitosos / NULLIF(r.total, 0), 2) AS tasa_exito_pct
+                FROM resumen_accesos_sistema_dia r
+                JOIN sistemas s ON s.id_sistema = r.id_sistema
+                {where}
+                ORDER BY r.fecha DESC, s.id_sistema
+                LIMIT %s
+                """,
+                (*params, limit),
+            )  # Rango sobre la PK (fecha, id_sistema)
+            return cur.fetchall()
+
+
+def usuarios_por_rol() -> List[Dict]:
+    """Consulta 4: usuarios por rol y estado de bloqueo (tabla pequeña, se consulta en vivo)."""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT rol,
+                       SUM(bloqueado) AS bloqueados,
+                       SUM(NOT bloqueado) AS activos,
+                       COUNT(*) AS total
+                FROM usuarios
+                GROUP BY rol
+                ORDER BY bloqueados DESC
+                """
+            )
+            return cur.fetchall()
+
+
+def eventos_recientes_por_usuario(por_usuario: int = 5) -> List[Dict]:
+    """
+    Consulta 5: últimos eventos de cada usuario.
+    Acota a 'por_usuario' eventos con ROW_NUMBER en vez de concatenar el historial completo.
+    """
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT u.id_usuario, u.nombre, e.tipo_evento, e.fecha
+                FROM usuarios u
+                JOIN (
+                    SELECT id_usuario, tipo_evento, fecha,
+                           ROW_NUMBER() OVER (PARTITION BY id_usuario ORDER BY fecha DESC, id_evento DESC) AS n
+                    FROM eventos_seguridad
+                ) e ON e.id_usuario = u.id_usuario AND e.n <= %s
+                ORDER BY u.id_usuario, e.fecha DESC
+                """,
+                (por_usuario,),
+            )  # Recorre idx_eventos_usuario
+            return cur.fetchall()
+
+
+def resumen_alertas_por_usuario() -> List[Dict]:
+    """Consulta 6: alertas por usuario (conteo y última fecha)."""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT u.id_usuario, u.nombre,
+                       COALESCE(r.total, 0) AS total_alertas,
+                       r.ultima_fecha AS ultima_alerta
+                FROM usuarios u
+                LEFT JOIN resumen_alertas_usuario r ON r.id_usuario = u.id_usuario
+                ORDER BY total_alertas DESC, ultima_alerta DESC
+                """
+            )
+            return cur.fetchall()
+
+
+def ranking_tasa_fallos(min_total: int = 1, limit: int = 100) -> List[Dict]:
+    """Consulta 7: ranking por tasa de fallos entre usuarios con al menos 'min_total' accesos."""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT u.id_usuario, u.nombre, r.fallidos AS fallos, r.total,
+                       ROUND(100.0 * r.fallidos / NULLIF(r.total, 0), 2) AS tasa_fallos_pct
+                FROM resumen_accesos_usuario r
+                JOIN usuarios u ON u.id_usuario = r.id_usuario
+                WHERE r.total >= %s
+                ORDER BY tasa_fallos_pct DESC
+                LIMIT %s
+                """,
+                (min_total, limit),
+            )
+            return cur.fetchall()
+
+
+def resumen_auditoria() -> List[Dict]:
+    """Consulta 8: auditoría por tabla con totales por tipo de acción."""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT tabla_afectada,
+                       SUM(IF(accion = 'INSERT', total, 0)) AS inserts,
+                       SUM(IF(accion = 'UPDATE', total, 0)) AS updates,
+                       SUM(IF(accion = 'DELETE', total, 0)) AS deletes,
+                       SUM(total) AS total
+                FROM resumen_auditoria
+                GROUP BY tabla_afectada
+                ORDER BY total DESC
+                """
+            )  # Pivot sobre pocas filas (tabla x acción)
+            return cur.fetchall()
+
+
+def fallos_acumulados(id_usuario: Optional[int] = None) -> List[Dict]:
+    """
+    Consulta 9: acumulado de fallos por usuario a lo largo del tiempo.
+    Ventana sobre fallos_diarios (una fila por usuario y día) en vez de sobre cada acceso.
+    """
+    where, params = ("WHERE f.id_usuario = %s", (id_usuario,)) if id_usuario is not None else ("", ())
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                f"""
+                SELECT f.id_usuario, u.nombre, f.fecha, f.fallos,
+                       SUM(f.fallos) OVER (PARTITION BY f.id_usuario ORDER BY f.fecha
+                                           ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS fallos_acumulados
+                FROM fallos_diarios f
+                JOIN usuarios u ON u.id_usuario = f.id_usuario
+                {where}
+                ORDER BY f.id_usuario, f.fecha
+                """,
+                params,
+            )
+            return cur.fetchall()
+
+
+def resumen_por_subred(cidr: str, prefijo: Optional[int] = None, limit: int = 20) -> List[Dict]:
+    """
+    Accesos y fallos por subred /prefijo dentro de 'cidr' (p.ej. las /24 con más fallos en 10.0.0.0/8).
+    Sin prefijo: /24 en IPv4 y /64 en IPv6 (o el de la red, si es más largo).
+    Agrupa por los primeros bytes de ip_bin recorriendo solo el rango de la red en idx_accesos_ip_bin
+    (cubriente: no lee filas). Con un prefijo que no es múltiplo de 8 se agrupa por el byte siguiente
+    y el último byte se enmascara al combinar.
+    """
+    requiere_ip_binaria()
+    red = ipaddress.ip_network(cidr.strip(), strict=False)
+    if prefijo is None:
+        prefijo = max(red.prefixlen, 24 if red.version == 4 else 64)
+    if not red.prefixlen <= prefijo <= red.max_prefixlen:
+        raise ValueError(f"prefijo debe estar entre {red.prefixlen} y {red.max_prefixlen} para {red}")
+    cond, params = condicion_cidr(cidr)
+    n_bytes = -(-prefijo // 8)  # Bytes que cubren el prefijo
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                f"""
+                SELECT SUBSTRING(ip_bin, 1, %s) AS red, COUNT(*) AS total,
+                       COALESCE(SUM(exitoso = FALSE), 0) AS fallidos
+                FROM accesos
+                WHERE {cond}
+                GROUP BY red
+                """,
+                (n_bytes, *params),
+            )  # Rango sobre idx_accesos_ip_bin
+            filas = cur.fetchall()
+
+    mascara = (0xFF << (8 * n_bytes - prefijo)) & 0xFF  # Bits del último byte que pertenecen al prefijo
+    grupos: Dict[bytes, list] = {}
+    for r in filas:
+        clave = bytes(r["red"])
+        clave = clave[:-1] + bytes([clave[-1] & mascara])
+        acumulado = grupos.setdefault(clave, [0, 0])
+        acumulado[0] += int(r["total"])
+        acumulado[1] += int(r["fallidos"])
+    ancho = red.max_prefixlen // 8
+    resultado = [
+        {
+            "subred": str(type(red)((clave.ljust(ancho, b"\0"), prefijo))),
+            "total": total,
+            "fallidos": fallidos,
+            "pct_fallos": round(100 * fallidos / total, 2) if total else None,
+        }
+        for clave, (total, fallidos) in grupos.items()
+    ]
+    resultado.sort(key=lambda r: (-r["fallidos"], -r["total"], r["subred"]))
+    return resultado[:limit]
+
+
+def reconstruir_resumenes(actor: str) -> Dict[str, int]:
+    """
+    Recalcula todas las tablas resumen (y los contadores de fallos_diarios) desde las tablas base
+    en una sola transacción.
+    Útil tras cargas fuera de los triggers o correcciones manuales. Devuelve filas por tabla.
+    Con retención solo cuenta lo que sigue en la base: los meses archivados salen de los totales.
+    """
+    filas = {}
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:  # Todo o nada: los lectores nunca ven resúmenes a medias
+            for tabla, insert in RECONSTRUCCION:
+                cur.execute(f"DELETE FROM {tabla}")  # DELETE (no TRUNCATE) para seguir en la transacción
+                cur.execute(insert)
+                filas[tabla] = cur.rowcount
+    registrar_accion(actor, "REBUILD", "resumenes")  # Auditoría de la reconstrucción
+    return filas
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Retención y archivo de las tablas particionadas por mes (accesos y auditoría, migración 3):
+- Crea por adelantado las particiones de los meses próximos (partiendo 'pmax')
+- Archiva los meses más viejos que el horizonte en archivos .jsonl.gz locales y elimina sus particiones
+- Lee rangos de fechas combinando lo archivado con lo que sigue en la base, si se pide
+Archivar una partición: EXCHANGE PARTITION la pasa a una tabla de paso (solo metadatos), DROP PARTITION
+la quita y recién entonces se exporta la tabla de paso y se borra. Si el proceso se corta a mitad,
+la próxima corrida encuentra la tabla de paso y termina de archivarla: ninguna fila se pierde.
+"""  # Docstring de módulo: responsabilidades
+
+import gzip  # Lectura de los archivos comprimidos
+import json  # Filas en JSONL
+import logging  # Avance del archivado
+import os  # Carpeta y renombrado atómico de archivos
+import re  # Nombres de particiones y archivos
+from datetime import date  # Límites mensuales
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple  # Tipos auxiliares
+
+from config import RETENCION_MESES, RETENCION_MESES_FUTUROS, RETENCION_DIR  # Horizonte y carpeta de archivo
+from db import backend, db_connection, db_cursor  # Helpers de BD
+from modules.auditoria import registrar_accion  # Auditoría del archivado
+from modules.exportacion import TABLAS_EXPORTABLES, exportar_tabla, iterar_filas  # Exportación en streaming
+
+log = logging.getLogger(__name__)
+
+TABLAS_RETENCION = ("accesos", "auditoria")  # Tablas particionadas por la migración 3
+
+_PARTICION = re.compile(r"^p(\d{4})(\d{2})$")  # pAAAAMM: filas con fecha anterior al mes siguiente
+_ARCHIVO = re.compile(
+    r"^(?P<tabla>\w+?)_(?P<desde>\d{4}-\d{2}-\d{2})_(?P<hasta>\d{4}-\d{2}-\d{2})(?:_\d+)?\.jsonl\.gz$"
+)  # <tabla>_<desde>_<hasta>[_n].jsonl.gz (hasta exclusivo)
+
+
+def _sumar_meses(primer_dia: date, meses: int) -> date:
+    """Primer día del mes desplazado 'meses' (negativo = hacia atrás)."""
+    anio, mes = divmod(primer_dia.month - 1 + meses, 12)
+    return date(primer_dia.year + anio, mes + 1, 1)
+
+
+def _tabla_de_paso(tabla: str, particion: str) -> str:
+    return f"{tabla}_archivo_{particion}"
+
+
+def _requiere_particiones() -> None:
+    """Falla con un mensaje claro si el motor no soporta particionado (SQLite)."""
+    if not backend.PARTICIONES:
+        raise RuntimeError(f"La retención por particiones requiere MySQL (DB_BACKEND={backend.NOMBRE})")
+
+
+def listar_particiones(tabla: str) -> List[Dict]:
+    """Particiones mensuales de 'tabla' en orden: nombre, límite superior (exclusivo) y filas estimadas."""
+    _requiere_particiones()
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                """
+                SELECT PARTITION_NAME AS particion, TABLE_ROWS AS filas
+                FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+                ORDER BY PARTITION_ORDINAL_POSITION
+                """,
+                (tabla,),
+            )
+            filas = cur.fetchall()
+    particiones = []
+    for f in filas:
+        m = _PARTICION.match(f["particion"])
+        hasta = _sumar_meses(date(int(m.group(1)), int(m.group(2)), 1), 1) if m else None  # pmax: sin límite
+        particiones.append({"particion": f["particion"], "hasta": hasta, "filas": f["filas"]})
+    return particiones
+
+
+def _crear_particiones_futuras(cur, tabla: str, existentes: List[Dict], hasta_mes: date) -> List[str]:
+    """Parte 'pmax' para que existan las particiones hasta 'hasta_mes' inclusive."""
+    ultimo = max((p["hasta"] for p in existentes if p["hasta"]), default=None)
+    if ultimo is None:
+        return []
+    nuevas = []
+    mes = ultimo  # Primer mes sin partición propia
+    while mes <= hasta_mes:
+        nuevas.append((f"p{mes:%Y%m}", _sumar_meses(mes, 1)))
+        mes = _sumar_meses(mes, 1)
+    if not nuevas:
+        return []
+    definiciones = [f"PARTITION {nombre} VALUES LESS THAN ('{limite.isoformat()}')" for nombre, limite in nuevas]
+    definiciones.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    cur.execute(f"ALTER TABLE {tabla} REORGANIZE PARTITION pmax INTO ({', '.join(definiciones)})")  # pmax suele estar vacía
+    return [nombre for nombre, _ in nuevas]
+
+
+def _separar_particion(cur, tabla: str, particion: str) -> str:
+    """Pasa la partición a su tabla de paso (EXCHANGE) y la elimina de la tabla caliente."""
+    paso = _tabla_de_paso(tabla, particion)
+    cur.execute(f"CREATE TABLE {paso} LIKE {tabla}")
+    cur.execute(f"ALTER TABLE {paso} REMOVE PARTITIONING")  # EXCHANGE pide una tabla sin particiones
+    cur.execute(f"ALTER TABLE {tabla} EXCHANGE PARTITION {particion} WITH TABLE {paso}")  # Solo metadatos
+    cur.execute(f"ALTER TABLE {tabla} DROP PARTITION {particion}")  # Ya vacía: instantáneo
+    return paso
+
+
+def _archivar_tabla_de_paso(tabla: str, paso: str, hasta: date, directorio: str) -> Dict:
+    """Exporta la tabla de paso a <tabla>_<desde>_<hasta>.jsonl.gz y la borra cuando el archivo está en disco."""
+    particion = paso.rsplit("_", 1)[-1]
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(f"SELECT COUNT(*) AS filas, MIN(fecha) AS desde FROM {paso}")
+            conteo = cur.fetchone()
+            if not conteo["filas"]:
+                cur.execute(f"DROP TABLE {paso}")  # Partición vacía: nada que archivar
+                return {"tabla": tabla, "particion": particion, "filas": 0, "archivo": None}
+    carpeta = os.path.join(directorio, tabla)
+    os.makedirs(carpeta, exist_ok=True)
+    base = f"{tabla}_{conteo['desde'].isoformat()}_{hasta.isoformat()}"
+    ruta, n = os.path.join(carpeta, f"{base}.jsonl.gz"), 1
+    while os.path.exists(ruta):  # Nunca se pisa un archivo previo
+        ruta, n = os.path.join(carpeta, f"{base}_{n}.jsonl.gz"), n + 1
+    temporal = ruta + ".tmp"
+    filas, _ = exportar_tabla(tabla, temporal, formato="jsonl", comprimir=True, origen=paso)
+    with open(temporal, "rb") as f:
+        os.fsync(f.fileno())  # El archivo queda en disco antes de borrar la fuente
+    os.replace(temporal, ruta)  # Atómico: nunca queda un .jsonl.gz a medias
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(f"DROP TABLE {paso}")
+    return {"tabla": tabla, "particion": particion, "filas": filas, "archivo": ruta}
+
+
+def _tablas_de_paso_pendientes(tabla: str) -> List[str]:
+    """Tablas de paso que quedaron de una corrida interrumpida."""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                "SELECT TABLE_NAME AS nombre FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME LIKE %s ORDER BY TABLE_NAME",
+                (f"{tabla}\\_archivo\\_p%",),
+            )
+            return [r["nombre"] for r in cur.fetchall()]
+
+
+def aplicar_retencion(meses: int = RETENCION_MESES, directorio: str = RETENCION_DIR,
+                      meses_futuros: int = RETENCION_MESES_FUTUROS,
+                      tablas: Iterable[str] = TABLAS_RETENCION, actor: str = "RETENCION",
+                      simular: bool = False) -> List[Dict]:
+    """
+    Mantiene las particiones mensuales de 'tablas':
+    - crea las de los próximos 'meses_futuros' meses
+    - archiva y elimina las que terminan antes del primer día del mes actual menos 'meses'
+      (meses=12 conserva los 12 meses completos anteriores más el mes en curso)
+    Con simular=True solo informa qué archivaría. Devuelve una fila por partición archivada
+    (tabla, particion, filas, archivo). También descarta de fallos_diarios los días ya archivados.
+    """
+    if meses < 1:
+        raise ValueError("meses debe ser >= 1")
+    _requiere_particiones()
+    actual = date.today().replace(day=1)
+    corte = _sumar_meses(actual, -meses)  # Se archivan particiones con límite <= corte
+    resultado = []
+    for tabla in tablas:
+        if tabla not in TABLAS_RETENCION:
+            raise ValueError(f"Tabla sin retención: {tabla}")
+        if not simular:
+            for paso in _tablas_de_paso_pendientes(tabla):  # Corrida anterior interrumpida
+                limite = _sumar_meses(date(int(paso[-6:-2]), int(paso[-2:]), 1), 1)
+                log.warning("Retomando el archivo de %s", paso)
+                resultado.append(_archivar_tabla_de_paso(tabla, paso, limite, directorio))
+        particiones = listar_particiones(tabla)
+        if not particiones:
+            log.warning("%s no está particionada: aplica la migración 3 (execute_sql_file.py --migrate-only --with-partitioning)", tabla)
+            continue
+        vencidas = [p for p in particiones if p["hasta"] and p["hasta"] <= corte]
+        if simular:
+            resultado.extend({"tabla": tabla, "particion": p["particion"], "filas": p["filas"], "archivo": None}
+                             for p in vencidas)
+            continue
+        with db_connection() as conn:
+            with db_cursor(conn) as cur:  # DDL: cada ALTER confirma por sí mismo
+                creadas = _crear_particiones_futuras(cur, tabla, particiones, _sumar_meses(actual, meses_futuros))
+                if creadas:
+                    log.info("%s: particiones nuevas %s", tabla, ", ".join(creadas))
+        for p in vencidas:
+            with db_connection() as conn:
+                with db_cursor(conn) as cur:
+                    paso = _separar_particion(cur, tabla, p["particion"])
+            fila = _archivar_tabla_de_paso(tabla, paso, p["hasta"], directorio)
+            log.info("%s: %s archivada (%s filas) en %s", tabla, p["particion"], fila["filas"], fila["archivo"])
+            resultado.append(fila)
+        if vencidas:
+            registrar_accion(actor, "ARCHIVE", tabla)  # Una auditoría por tabla archivada
+    if not simular:
+        with db_connection() as conn:
+            with db_cursor(conn) as cur:
+                cur.execute("DELETE FROM fallos_diarios WHERE fecha < %s", (corte,))  # Contadores de días archivados
+    return resultado
+
+
+def archivos(tabla: str, directorio: str = RETENCION_DIR) -> List[Tuple[date, date, str]]:
+    """Archivos de 'tabla' como (desde inclusive, hasta exclusivo, ruta), ordenados por fecha."""
+    carpeta = os.path.join(directorio, tabla)
+    if not os.path.isdir(carpeta):
+        return []
+    encontrados = []
+    for nombre in os.listdir(carpeta):
+        m = _ARCHIVO.match(nombre)
+        if m and m.group("tabla") == tabla:
+            encontrados.append((date.fromisoformat(m.group("desde")), date.fromisoformat(m.group("hasta")),
+                                os.path.join(carpeta, nombre)))
+    return sorted(encontrados)
+
+
+def _leer_archivo(ruta: str, desde: Optional[date], hasta: Optional[date]) -> Iterator[Dict]:
+    """Filas de un archivo .jsonl.gz dentro del rango inclusivo [desde, hasta]."""
+    with gzip.open(ruta, "rt", encoding="utf-8") as f:
+        for linea in f:
+            fila = json.loads(linea)
+            fecha = date.fromisoformat(fila["fecha"]) if fila.get("fecha") else None
+            if (desde is not None and (fecha is None or fecha < desde)) or (hasta is not None and fecha and fecha > hasta):
+                continue
+            fila["fecha"] = fecha
+            yield fila
+
+
+def iterar_historial(tabla: str, desde: Optional[date] = None, hasta: Optional[date] = None,
+                     incluir_archivo: bool = False, directorio: str = RETENCION_DIR) -> Iterator[Dict]:
+    """
+    Filas de 'tabla' (dicts con las columnas de exportación) con fecha en [desde, hasta].
+    Sin incluir_archivo solo lee la base (que solo tiene los meses calientes). Con incluir_archivo,
+    primero recorre los archivos que se solapan con el rango y luego la base: el resultado va por
+    fecha de archivo y, dentro de cada tramo, por PK. En la base, el filtro por fecha recorre
+    solo las particiones del rango.
+    """
+    if tabla not in TABLAS_RETENCION:
+        raise ValueError(f"Tabla sin retención: {tabla}")
+    if incluir_archivo:
+        for inicio, fin, ruta in archivos(tabla, directorio):
+            if (hasta is None or inicio <= hasta) and (desde is None or fin > desde):
+                yield from _leer_archivo(ruta, desde, hasta)
+    columnas = TABLAS_EXPORTABLES[tabla][1]
+    filas = iterar_filas(tabla, desde=desde, hasta=hasta)
+    try:
+        for fila in filas:
+            yield dict(zip(columnas, fila))
+    finally:
+        filas.close()  # Libera la conexión si el consumidor corta antes
@@ -2,43 +2,58 @@
 """
 Seguridad y usuarios:
 - Inicio de sesión (por 'nombre')
-- Gestión de usuarios (alta, bloqueo/desbloqueo, listado)
+- Gestión de usuarios (alta, bloqueo/desbloqueo individual o masivo, listado)
+- Regla de bloqueo automático configurable (fallos máximos en ventana de días)
 - Roles y permisos (lectura de 'roles' y su columna 'permisos')
+- Caché de permisos en memoria con máscaras de bits (tiene_permiso)
+- Limitador de intentos de login por usuario (token bucket en memoria)
 """  # Docstring: responsabilidades del módulo
-
-from typing import Optional, Dict, List  # Tipos de apoyo
-
-from db import get_connection, db_cursor, get_next_id  # Helpers de BD
+
+import logging    # Reporte de intentos de login limitados
+import threading  # Lock de recarga de la caché
+import time       # TTL de la caché
+from collections import Counter, OrderedDict, deque  # Baldes LRU, rechazos por usuario e historial de intentos limitados
+from datetime import date, datetime  # Fechas de eventos/alertas masivos e intentos limitados
+from typing import Optional, Dict, List, Tuple, Iterable  # Tipos de apoyo
+
+from config import PERMISOS_CACHE_TTL  # TTL de la caché de permisos
+from config import LOGIN_RATE_BURST, LOGIN_RATE_PER_SECOND, LOGIN_RATE_MAX_KEYS  # Limitador de login
+from db import db_connection, db_cursor, prepared_cursor, unit_of_work, next_id, next_ids, schema  # Helpers de BD
 from modules.auditoria import registrar_accion         # Auditoría centralizada
+from modules.consultas import condicion_cidr, requiere_ip_binaria  # Selección por red CIDR
+
+log = logging.getLogger(__name__)
 
 
 def ensure_password_column():
     """Asegura que la tabla `usuarios` tenga la columna `password`.
-    Si no existe, la agrega con DEFAULT '1234'.
+    Los esquemas actuales ya la traen (y la migración 4 la agrega a BDs viejas);
+    esto cubre una BD vieja sin migrar: la agrega con DEFAULT '1234'.
+    Es DDL: se llama solo al arrancar (main) o desde migraciones, nunca en el login.
     """
-    conn = get_connection()  # Abre conexión
-    try:
+    if schema.has("usuarios.password"):  # Registro memoizado: sin consulta extra
+        return
+    with db_connection() as conn:  # Conexión prestada del pool
         with db_cursor(conn) as cur:  # Cursor con commit/rollback automático
-            cur.execute("SHOW COLUMNS FROM usuarios LIKE 'password'")  # Chequea columna
-            exists = cur.fetchone()  # Obtiene resultado
-            if not exists:  # Si no existe, la agrega
-                cur.execute("ALTER TABLE usuarios ADD COLUMN password VARCHAR(255) NOT NULL DEFAULT '1234'")
-    finally:
-        try:
-            conn.close()  # Cierra conexión
-        except Exception:
-            pass
+            cur.execute("ALTER TABLE usuarios ADD COLUMN password VARCHAR(255) NOT NULL DEFAULT '1234'")
+    schema.refresh()  # El esquema cambió
+
+
+def _requiere_columna_password() -> None:
+    """Falla con un mensaje claro si la BD no tiene `usuarios.password` (esquema viejo sin migrar)."""
+    if not schema.has("usuarios.password"):
+        raise RuntimeError("Falta la columna usuarios.password: aplica las migraciones "
+                           "(scripts_sql/execute_sql_file.py --migrate-only)")
 
 
 def obtener_usuario_por_nombre(nombre: str) -> Optional[Dict]:
     """Busca usuario por nombre exacto."""
-    conn = get_connection()
-    try:
-        with db_cursor(conn) as cur:
-            cur.execute(
-                "SELECT id_usuario, nombre, rol, bloqueado, password FROM usuarios WHERE nombre = %s",
-                (nombre,)
-            )  # Consulta por nombre
+    with db_connection() as conn:  # Conexión prestada del pool
+        with prepared_cursor(
+            conn,
+            "SELECT id_usuario, nombre, rol, bloqueado, password FROM usuarios WHERE nombre = %s",
+            (nombre,),
+        ) as cur:  # Sentencia preparada: en cada login solo viaja el parámetro
             row = cur.fetchone()  # Trae un único resultado
             if row:
                 return {
@@ -49,16 +64,21 @@ def obtener_usuario_por_nombre(nombre: str) -> Optional[Dict]:
                     "password": row.get("password"),
                 }
             return None  # No encontrado
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 
 def iniciar_sesion(nombre: str, password: str):
-    """Inicia sesión validando nombre y contraseña."""
-    ensure_password_column()  # Garantiza columna de password
+    """
+    Inicia sesión validando nombre y contraseña.
+    Camino rápido: chequeo de columna en memoria, una conexión con una búsqueda preparada
+    sobre idx_usuarios_nombre y auditoría encolada. Antes de ir a la BD pasa por el
+    limitador por usuario: una ráfaga de fallos se rechaza sin consultar MySQL y devuelve
+    {"error": ..., "limitado": True, "reintentar_en": segundos}.
+    """
+    _requiere_columna_password()  # Chequeo en memoria (sin SHOW COLUMNS)
+    espera = _limitador.tomar(nombre)
+    if espera:
+        return {"error": f"Demasiados intentos fallidos: reintenta en {espera:.0f} s",
+                "limitado": True, "reintentar_en": espera}
     usuario = obtener_usuario_por_nombre(nombre)  # Busca usuario
     if not usuario:
         return None  # Usuario inexistente
@@ -68,87 +88,362 @@ def iniciar_sesion(nombre: str, password: str):
     if usuario.get("password") != password:  # Verifica contraseña
         return {"error": "Contraseña incorrecta", **{k: v for k, v in usuario.items() if k != "password"}}
 
+    _limitador.devolver(nombre)  # Login correcto: solo los fallos consumen la cuota
     registrar_accion(usuario["nombre"], "LOGIN", "usuarios")  # Auditoría de login
     return {k: v for k, v in usuario.items() if k != "password"}  # Retorna sin password
 
 
 def listar_roles() -> List[Dict]:
     """Lee tabla 'roles' con permisos CSV (ej: 'ver_todo,modificar,...')."""
-    conn = get_connection()
-    try:
+    with db_connection() as conn:  # Conexión prestada del pool
         with db_cursor(conn) as cur:
             cur.execute("SELECT id_rol, nombre_rol, permisos FROM roles ORDER BY id_rol")
             return cur.fetchall()  # Lista de roles
-    finally:
-        conn.close()
 
 
 def agregar_usuario(nombre: str, rol: str, bloqueado: bool = False, password: str = "1234"):
     """Agrega un nuevo usuario con rol y contraseña."""
-    ensure_password_column()  # Asegura estructura
-    conn = get_connection()
-    try:
+    _requiere_columna_password()  # Chequeo en memoria (sin SHOW COLUMNS)
+    new_id = next_id("usuarios", "id_usuario")  # Calcula próximo ID (antes de abrir la unidad)
+    id_auditoria = next_id("auditoria", "id_auditoria")  # Ver registrar_accion
+    with unit_of_work() as conn:  # Insert y auditoría: una conexión, un commit
         with db_cursor(conn) as cur:
             # Verificar que el rol exista (referencia FK por nombre_rol)
             cur.execute("SELECT nombre_rol FROM roles WHERE nombre_rol = %s", (rol,))
             if cur.fetchone() is None:
                 raise ValueError(f"El rol '{rol}' no existe")  # Validación de rol
 
-            new_id = get_next_id(conn, "usuarios", "id_usuario")  # Calcula próximo ID
             cur.execute(
                 "INSERT INTO usuarios (id_usuario, nombre, rol, bloqueado, password) VALUES (%s, %s, %s, %s, %s)",
                 (new_id, nombre, rol, int(bloqueado), password)
             )  # Inserta usuario
-        registrar_accion(nombre, "INSERT", "usuarios")  # Auditoría
+        registrar_accion(nombre, "INSERT", "usuarios", id_auditoria=id_auditoria)  # Auditoría
         return new_id  # Devuelve ID del nuevo usuario
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 
 def cambiar_estado_bloqueo(id_usuario: int, estado: bool, actor: str) -> None:
     """Actualiza 'bloqueado' en usuarios; actor es quien ejecuta (para auditoría)."""
-    conn = get_connection()
-    try:
+    id_auditoria = next_id("auditoria", "id_auditoria")  # Antes de abrir la unidad (ver registrar_accion)
+    with unit_of_work() as conn:  # Cambio y auditoría: una conexión, un commit
         with db_cursor(conn) as cur:
             cur.execute(
                 "UPDATE usuarios SET bloqueado = %s WHERE id_usuario = %s",
                 (estado, id_usuario),
             )  # Actualiza flag de bloqueo
-        registrar_accion(actor, "UPDATE", "usuarios")  # Auditoría del cambio
-    finally:
-        conn.close()
-
-
+        registrar_accion(actor, "UPDATE", "usuarios", id_auditoria=id_auditoria)  # Auditoría del cambio
+
+
+def _patron_like(prefijo: str) -> str:
+    """Patrón LIKE 'prefijo%' escapando los comodines del propio prefijo."""
+    return prefijo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def cambiar_estado_bloqueo_masivo(estado: bool, actor: str, ids: Optional[Iterable[int]] = None,
+                                  ip_prefijo: Optional[str] = None, desde: Optional[date] = None,
+                                  motivo: str = "", cidr: Optional[str] = None) -> List[int]:
+    """
+    Bloquea/desbloquea muchos usuarios en una sola transacción.
+    Selección (se combinan con AND; al menos una es obligatoria):
+    - ids: lista de id_usuario
+    - ip_prefijo: usuarios vistos en accesos desde IPs que empiezan así (p.ej. '10.2.' o una IP exacta)
+    - cidr: usuarios vistos en accesos desde la red dada (p.ej. '10.2.0.0/16'); requiere accesos.ip_bin
+    - desde: con ip_prefijo o cidr, solo accesos desde esa fecha
+    Un único UPDATE set-based; eventos, alertas y auditoría se insertan por lotes (executemany).
+    Los IDs se reservan antes de abrir la transacción: dentro de ella los triggers bloquean filas
+    de 'secuencias' y una reserva en otra conexión esperaría a este mismo commit.
+    Devuelve los IDs cuyo estado cambió.
+    """
+    if ids is None and not ip_prefijo and not cidr:
+        raise ValueError("Indica ids, ip_prefijo o cidr para el cambio masivo")
+    condiciones, params = ["bloqueado <> %s"], [estado]
+    if ids is not None:
+        ids = sorted({int(i) for i in ids})
+        if not ids:
+            return []
+        condiciones.append(f"id_usuario IN ({', '.join(['%s'] * len(ids))})")
+        params.extend(ids)
+    if ip_prefijo:
+        sub = "SELECT id_usuario FROM accesos WHERE ip LIKE %s AND id_usuario IS NOT NULL"  # Rango sobre idx_accesos_ip
+        params.append(_patron_like(ip_prefijo))
+        if desde is not None:
+            sub += " AND fecha >= %s"
+            params.append(desde)
+        condiciones.append(f"id_usuario IN ({sub})")
+    if cidr:
+        requiere_ip_binaria()
+        cond, params_red = condicion_cidr(cidr)  # ValueError si la red no es válida
+        sub = f"SELECT id_usuario FROM accesos WHERE {cond} AND id_usuario IS NOT NULL"  # Rango sobre idx_accesos_ip_bin
+        params.extend(params_red)
+        if desde is not None:
+            sub += " AND fecha >= %s"
+            params.append(desde)
+        condiciones.append(f"id_usuario IN ({sub})")
+
+    accion = "Bloqueo" if estado else "Desbloqueo"
+    detalle = f"{accion} masivo por {actor}" + (f": {motivo}" if motivo else "")
+    mensaje = "Cuenta bloqueada por un administrador" if estado else "Cuenta desbloqueada por un administrador"
+    hoy = date.today()
+    with db_connection() as conn:  # Una conexión; la transacción del cambio empieza tras reservar los IDs
+        with db_cursor(conn) as cur:
+            cur.execute(f"SELECT id_usuario FROM usuarios WHERE {' AND '.join(condiciones)}", tuple(params))
+            candidatos = [u["id_usuario"] for u in cur.fetchall()]  # Lectura sin bloqueos: solo para dimensionar
+        if not candidatos:
+            return []
+        n = len(candidatos)
+        ids_eventos = next_ids("eventos_seguridad", "id_evento", n)  # Los que no se usen quedan como hueco
+        ids_alertas = next_ids("alertas", "id_alerta", n)
+        ids_auditoria = next_ids("auditoria", "id_auditoria", n + 1)  # Una por usuario más la del actor
+        with db_cursor(conn) as cur:  # Una transacción para todo el lote
+            cur.execute(
+                f"SELECT id_usuario, nombre FROM usuarios WHERE {' AND '.join(condiciones)} "
+                f"AND id_usuario IN ({', '.join(['%s'] * n)}) FOR UPDATE",
+                (*params, *candidatos),
+            )  # Bloquea las filas objetivo (las que siguen cumpliendo la selección)
+            objetivo = cur.fetchall()
+            if not objetivo:
+                return []
+            cambiados = [u["id_usuario"] for u in objetivo]
+            cur.execute("SET @omitir_auditoria_trigger = 1")  # La auditoría por fila se escribe en lote más abajo
+            try:
+                cur.execute(
+                    f"UPDATE usuarios SET bloqueado = %s WHERE id_usuario IN ({', '.join(['%s'] * len(cambiados))})",
+                    (estado, *cambiados),
+                )  # Un único UPDATE para todos
+            finally:
+                cur.execute("SET @omitir_auditoria_trigger = NULL")  # La conexión vuelve al pool limpia
+            cur.executemany(
+                "INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(eid, u, f"{accion} masivo", detalle, hoy) for eid, u in zip(ids_eventos, cambiados)],
+            )  # Un evento por usuario, en un INSERT multi-fila
+            cur.executemany(
+                "INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha) VALUES (%s, %s, %s, %s)",
+                [(aid, u, mensaje, hoy) for aid, u in zip(ids_alertas, cambiados)],
+            )  # Una alerta por usuario
+            auditoria = [(u["nombre"], "UPDATE", "usuarios") for u in objetivo]  # Lo que registraría el trigger
+            auditoria.append((actor, "UPDATE", "usuarios"))                       # Más el registro del actor
+            cur.executemany(
+                "INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(aid, *fila, hoy) for aid, fila in zip(ids_auditoria, auditoria)],
+            )  # Misma transacción: si algo falla no queda nada a medias
+    return cambiados
+
+
+def obtener_regla_bloqueo() -> Dict[str, int]:
+    """Devuelve la regla del bloqueo automático: {'max_fallos': n, 'ventana_dias': d}."""
+    regla = {"max_fallos": 3, "ventana_dias": 7}  # Valores por defecto del trigger
+    with db_connection() as conn:  # Conexión prestada del pool
+        with db_cursor(conn) as cur:
+            cur.execute(
+                "SELECT clave, valor FROM parametros_seguridad "
+                "WHERE clave IN ('bloqueo_max_fallos', 'bloqueo_ventana_dias')"
+            )
+            for row in cur.fetchall():
+                regla["max_fallos" if row["clave"] == "bloqueo_max_fallos" else "ventana_dias"] = int(row["valor"])
+    return regla
+
+
+def configurar_regla_bloqueo(max_fallos: int, ventana_dias: int, actor: str) -> None:
+    """
+    Cambia la regla que aplica trg_accesos_after_insert: bloquear al usuario
+    con 'max_fallos' accesos fallidos o más en los últimos 'ventana_dias' días.
+    """
+    if max_fallos < 1 or ventana_dias < 0:
+        raise ValueError("max_fallos debe ser >= 1 y ventana_dias >= 0")
+    id_auditoria = next_id("auditoria", "id_auditoria")  # Antes de abrir la unidad (ver registrar_accion)
+    with unit_of_work() as conn:  # Cambio y auditoría: una conexión, un commit
+        with db_cursor(conn) as cur:
+            cur.executemany(
+                "INSERT INTO parametros_seguridad (clave, valor) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE valor = VALUES(valor)",
+                [("bloqueo_max_fallos", max_fallos), ("bloqueo_ventana_dias", ventana_dias)],
+            )  # Upsert de ambos parámetros
+        registrar_accion(actor, "UPDATE", "parametros_seguridad", id_auditoria=id_auditoria)  # Auditoría en la misma transacción
+
+
 def listar_usuarios() -> List[Dict]:
     """Lista usuarios con su rol y estado."""
-    conn = get_connection()
-    try:
+    with db_connection() as conn:  # Conexión prestada del pool
         with db_cursor(conn) as cur:
             cur.execute(
                 "SELECT id_usuario, nombre, rol, bloqueado FROM usuarios ORDER BY id_usuario"
             )
             return cur.fetchall()  # Devuelve lista de dicts
-    finally:
-        conn.close()
 
 
 def obtener_permisos_por_rol(rol: str) -> List[str]:
     """Convierte CSV 'permisos' en lista (ej: ['ver_todo', 'modificar'])."""
-    conn = get_connection()
-    try:
-        with db_cursor(conn) as cur:
-            cur.execute("SELECT permisos FROM roles WHERE nombre_rol = %s", (rol,))
+    with db_connection() as conn:  # Conexión prestada del pool
+        with prepared_cursor(conn, "SELECT permisos FROM roles WHERE nombre_rol = %s", (rol,)) as cur:
             row = cur.fetchone()
             if not row or not row["permisos"]:
                 return []  # Sin permisos definidos
             return [p.strip() for p in row["permisos"].split(",") if p.strip()]  # Lista limpia
-    finally:
-        conn.close()
 
 
+class PermisosCache:
+    """
+    Caché en proceso de la tabla 'roles'.
+    - Carga todos los roles en una consulta y asigna un bit a cada permiso distinto
+    - Cada rol queda representado como un entero (máscara de sus permisos)
+    - Un chequeo es una prueba de bit, sin ir a la BD
+    - Se recarga al vencer el TTL o al invalidarla (p.ej. tras modificar 'roles')
+    """
+
+    def __init__(self, ttl: float = PERMISOS_CACHE_TTL):
+        self.ttl = ttl
+        # (bits por permiso, máscara por rol, momento de carga); se reemplaza entera al recargar
+        self._estado: Tuple[Dict[str, int], Dict[str, int], float] = ({}, {}, float("-inf"))
+        self._lock = threading.Lock()
+
+    def tiene(self, rol: str, permiso: str) -> bool:
+        """True si la máscara de 'rol' incluye el bit de 'permiso'."""
+        bits, mascaras, _ = self._vigente()
+        bit = bits.get(permiso, 0)
+        return bool(bit and mascaras.get(rol, 0) & bit)
+
+    def mascara(self, rol: str) -> int:
+        """Máscara de permisos del rol (0 si no existe)."""
+        return self._vigente()[1].get(rol, 0)
+
+    def bit(self, permiso: str) -> int:
+        """Bit asignado al permiso (0 si ningún rol lo tiene)."""
+        return self._vigente()[0].get(permiso, 0)
+
+    def invalidar(self) -> None:
+        """Fuerza la recarga en el próximo chequeo."""
+        with self._lock:
+            bits, mascaras, _ = self._estado
+            self._estado = (bits, mascaras, float("-inf"))
+
+    def _vigente(self) -> Tuple[Dict[str, int], Dict[str, int], float]:
+        estado = self._estado  # Lectura atómica de la tupla completa
+        if time.monotonic() - estado[2] < self.ttl:
+            return estado
+        with self._lock:
+            if time.monotonic() - self._estado[2] >= self.ttl:  # Otro hilo pudo recargar ya
+                self._estado = self._cargar()
+            return self._estado
+
+    @staticmethod
+    def _cargar() -> Tuple[Dict[str, int], Dict[str, int], float]:
+        bits: Dict[str, int] = {}
+        mascaras: Dict[str, int] = {}
+        for r in listar_roles():  # Una sola consulta para todos los roles
+            mascara = 0
+            for p in (r["permisos"] or "").split(","):
+                p = p.strip()
+                if p:
+                    bit = bits.setdefault(p, 1 << len(bits))  # Nuevo permiso -> siguiente bit
+                    mascara |= bit
+            mascaras[r["nombre_rol"]] = mascara
+        return bits, mascaras, time.monotonic()
+
+
+_permisos = PermisosCache()  # Caché global del proceso
+
+
+def invalidar_cache_permisos() -> None:
+    """Descarta la caché de permisos (llamar tras cambiar la tabla 'roles')."""
+    _permisos.invalidar()
+
+
 def tiene_permiso(rol: str, permiso: str) -> bool:
-    """Chequea si el rol posee 'permiso' dentro del CSV de 'permisos'."""
-    return permiso in obtener_permisos_por_rol(rol)
+    """Chequea si el rol posee 'permiso' usando la caché de máscaras (sin ir a la BD)."""
+    return _permisos.tiene(rol, permiso)
+
+
+class LimitadorLogin:
+    """
+    Limitador token bucket de intentos de login, por nombre de usuario y en memoria del proceso.
+    - Cada nombre tiene un balde de 'rafaga' fichas que se repone a 'por_segundo' fichas/s
+    - Cada intento toma una ficha antes de ir a la BD; un login correcto la devuelve,
+      así que solo los fallos (usuario inexistente, bloqueado o contraseña incorrecta) gastan cuota
+    - Sin fichas, el intento se rechaza sin tocar MySQL y queda registrado (reporte())
+    - Conserva a lo sumo 'max_claves' baldes (descarta el usado hace más tiempo) y 'max_claves'
+      contadores de rechazos (al pasarse, se quedan los más limitados): nombres al azar no agotan la memoria
+    """
+
+    def __init__(self, rafaga: int = LOGIN_RATE_BURST, por_segundo: float = LOGIN_RATE_PER_SECOND,
+                 max_claves: int = LOGIN_RATE_MAX_KEYS, historial: int = 100):
+        self.rafaga = rafaga            # 0 = sin límite
+        self.por_segundo = por_segundo
+        self.max_claves = max(1, max_claves)
+        self._baldes: "OrderedDict[str, List[float]]" = OrderedDict()  # clave -> [fichas, último cálculo]
+        self._lock = threading.Lock()
+        self._recientes: deque = deque(maxlen=historial)  # Últimos intentos rechazados
+        self._por_usuario: Counter = Counter()  # clave -> intentos rechazados (acotado a max_claves)
+        self.total_limitados = 0
+
+    @staticmethod
+    def _clave(nombre: str) -> str:
+        return nombre.strip().casefold()  # Igual que la collation de 'nombre': sin distinguir mayúsculas
+
+    def tomar(self, nombre: str) -> float:
+        """Consume una ficha de 'nombre'. Devuelve 0 si el intento pasa, o los segundos hasta la próxima ficha."""
+        if self.rafaga < 1:
+            return 0.0
+        clave = self._clave(nombre)
+        ahora = time.monotonic()
+        with self._lock:
+            balde = self._baldes.get(clave)
+            if balde is None:
+                balde = self._baldes[clave] = [float(self.rafaga), ahora]
+                if len(self._baldes) > self.max_claves:
+                    self._baldes.popitem(last=False)  # El más viejo
+            else:
+                self._baldes.move_to_end(clave)
+                balde[0] = min(float(self.rafaga), balde[0] + (ahora - balde[1]) * self.por_segundo)
+                balde[1] = ahora
+            if balde[0] >= 1.0:
+                balde[0] -= 1.0
+                return 0.0
+            espera = (1.0 - balde[0]) / self.por_segundo if self.por_segundo > 0 else float("inf")
+            self.total_limitados += 1
+            self._por_usuario[clave] += 1
+            if len(self._por_usuario) > self.max_claves:
+                # Poda amortizada: se conserva la mitad más limitada (la que muestra reporte())
+                self._por_usuario = Counter(dict(self._por_usuario.most_common(max(1, self.max_claves // 2))))
+            self._recientes.append({"fecha": datetime.now(), "nombre": nombre, "reintentar_en": espera})
+        log.warning("Login limitado para %r: reintento en %.0f s", nombre, espera)
+        return espera
+
+    def devolver(self, nombre: str) -> None:
+        """Reintegra la ficha tomada por un intento exitoso."""
+        if self.rafaga < 1:
+            return
+        with self._lock:
+            balde = self._baldes.get(self._clave(nombre))
+            if balde is not None:
+                balde[0] = min(float(self.rafaga), balde[0] + 1.0)
+
+    def reporte(self, top: int = 10) -> Dict:
+        """Intentos rechazados: total, usuarios más limitados y los últimos rechazos."""
+        with self._lock:
+            return {
+                "total": self.total_limitados,
+                "por_usuario": self._por_usuario.most_common(top),
+                "recientes": list(self._recientes),
+            }
+
+    def reiniciar(self) -> None:
+        """Vacía los baldes y el reporte (p.ej. tras desbloquear a un usuario legítimo)."""
+        with self._lock:
+            self._baldes.clear()
+            self._recientes.clear()
+            self._por_usuario.clear()
+            self.total_limitados = 0
+
+
+_limitador = LimitadorLogin()  # Limitador global del proceso
+
+
+def intentos_login_limitados(top: int = 10) -> Dict:
+    """Reporte de los intentos de login rechazados por el limitador."""
+    return _limitador.reporte(top)
+
+
+def reiniciar_limitador_login() -> None:
+    """Descarta el estado del limitador de login."""
+    _limitador.reiniciar()
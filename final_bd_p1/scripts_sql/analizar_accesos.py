@@ -0,0 +1,64 @@
+#!/usr/bin/env python3  # Shebang para ejecución directa
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Análisis de anomalías sobre 'accesos' con modules/analitica.py (requiere numpy).
+- Carga el historial en columnas, calcula características por usuario e IP y puntúa anomalías
+- Muestra las más altas y, con --emitir, las inserta como alertas en una sola transacción
+
+Ejemplo (corrida diaria sobre los últimos 30 días):
+  python scripts_sql/analizar_accesos.py --dias 30 --umbral-z 3 --emitir
+"""  # Docstring: propósito y uso
+
+import argparse  # Parseo de argumentos CLI
+import os, sys   # Manejo de rutas para importar 'db' y 'modules'
+import time      # Medición de tiempos
+from datetime import date, timedelta  # Rango de fechas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Agrega raíz del proyecto al path
+
+from config import ANALITICA_FETCH_SIZE  # Tamaño de lote por defecto
+from modules.analitica import cargar_accesos, puntuar_anomalias, emitir_alertas  # Motor vectorizado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detectar accesos anómalos y opcionalmente emitir alertas.')
+    parser.add_argument('--dias', type=int, default=None, help='Analizar solo los últimos N días (por defecto todo)')
+    parser.add_argument('--desde', type=date.fromisoformat, default=None, help='Fecha mínima (YYYY-MM-DD)')
+    parser.add_argument('--hasta', type=date.fromisoformat, default=None, help='Fecha máxima (YYYY-MM-DD)')
+    parser.add_argument('--umbral-z', type=float, default=3.0, help='z-score mínimo para reportar una anomalía')
+    parser.add_argument('--min-fallos', type=int, default=3, help='Fallos mínimos del último día para una ráfaga')
+    parser.add_argument('--min-usuarios-ip', type=int, default=5, help='Usuarios distintos con fallos para marcar una IP')
+    parser.add_argument('--top', type=int, default=20, help='Anomalías a mostrar')
+    parser.add_argument('--emitir', action='store_true', help='Insertar las anomalías como alertas')
+    parser.add_argument('--max-alertas', type=int, default=1000, help='Tope de alertas por corrida')
+    parser.add_argument('--actor', default='ANALITICA', help='Actor registrado en auditoría')
+    parser.add_argument('--lote', type=int, default=ANALITICA_FETCH_SIZE, help=f'Filas por fetch (por defecto {ANALITICA_FETCH_SIZE})')
+    args = parser.parse_args()  # Parsea argumentos
+
+    desde = args.desde
+    if args.dias is not None:
+        desde = date.today() - timedelta(days=args.dias - 1)
+
+    try:
+        inicio = time.monotonic()
+        accesos = cargar_accesos(desde=desde, hasta=args.hasta, lote=args.lote)
+    except RuntimeError as e:
+        print(f"❌ {e}")  # NumPy no instalado
+        sys.exit(1)
+    carga = time.monotonic() - inicio
+    print(f"📥 {len(accesos)} accesos cargados en {carga:.1f}s ({len(accesos) / carga if carga > 0 else 0:.0f} filas/s)")
+
+    inicio = time.monotonic()
+    anomalias = puntuar_anomalias(accesos, umbral_z=args.umbral_z, min_fallos=args.min_fallos,
+                                  min_usuarios_ip=args.min_usuarios_ip)
+    print(f"🧮 {len(anomalias)} anomalías en {time.monotonic() - inicio:.2f}s")
+    for a in anomalias[:args.top]:
+        sujeto = f"usuario {a['id_usuario']}" if a["id_usuario"] is not None else f"IP {a['ip']}"
+        print(f" - [{a['score']:6.1f}] {a['tipo']:20} {sujeto}: {a['detalle']}")
+
+    if args.emitir and anomalias:
+        ids = emitir_alertas(anomalias, actor=args.actor, max_alertas=args.max_alertas)
+        print(f"🚨 {len(ids)} alertas creadas.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3  # Shebang para ejecución directa
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Retención de accesos y auditoría con modules/retencion.py (requiere la migración 3).
+- Crea las particiones mensuales de los próximos meses
+- Archiva en .jsonl.gz y elimina las particiones más viejas que el horizonte
+- Con --simular solo muestra qué haría; con --listar muestra las particiones actuales
+
+Ejemplo (cron mensual, 12 meses calientes):
+  python scripts_sql/aplicar_retencion.py --meses 12 --dir /var/archivo/seguridad
+"""  # Docstring: propósito y uso
+
+import argparse  # Parseo de argumentos CLI
+import logging   # Avance del archivado en consola
+import os, sys   # Manejo de rutas para importar 'db' y 'modules'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Agrega raíz del proyecto al path
+
+from config import RETENCION_MESES, RETENCION_MESES_FUTUROS, RETENCION_DIR  # Valores por defecto
+from modules.auditoria import flush_auditoria  # La auditoría encolada no queda pendiente al salir
+from modules.retencion import TABLAS_RETENCION, aplicar_retencion, listar_particiones  # Retención
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archivar y eliminar las particiones vencidas de accesos/auditoría.')
+    parser.add_argument('--meses', type=int, default=RETENCION_MESES, help=f'Meses completos que se conservan (por defecto {RETENCION_MESES})')
+    parser.add_argument('--futuros', type=int, default=RETENCION_MESES_FUTUROS, help='Particiones mensuales a crear por adelantado')
+    parser.add_argument('--dir', default=RETENCION_DIR, help=f'Carpeta de archivo (por defecto {RETENCION_DIR})')
+    parser.add_argument('--tabla', action='append', choices=TABLAS_RETENCION, default=None, help='Tabla a procesar (repetible; por defecto ambas)')
+    parser.add_argument('--simular', action='store_true', help='Solo mostrar qué particiones se archivarían')
+    parser.add_argument('--listar', action='store_true', help='Mostrar las particiones actuales y salir')
+    args = parser.parse_args()  # Parsea argumentos
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    tablas = args.tabla or list(TABLAS_RETENCION)
+
+    if args.listar:
+        try:
+            for tabla in tablas:
+                particiones = listar_particiones(tabla)
+                print(f"\n{tabla}:")
+                for p in particiones or [{"particion": "(sin particionar)", "hasta": None, "filas": ""}]:
+                    print(f" - {p['particion']:10} < {p['hasta'] or 'MAXVALUE'}  ~{p['filas']} filas")
+        except RuntimeError as e:
+            print(f"❌ {e}")  # Motor sin particionado (SQLite)
+            sys.exit(1)
+        return
+
+    try:
+        archivadas = aplicar_retencion(meses=args.meses, directorio=args.dir, meses_futuros=args.futuros,
+                                       tablas=tablas, simular=args.simular)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        flush_auditoria()
+    for a in archivadas:
+        destino = a['archivo'] or ('(simulado)' if args.simular else '(vacía)')
+        print(f" - {a['tabla']}.{a['particion']}: {a['filas']} filas -> {destino}")
+    print(f"✅ {len(archivadas)} partición(es) {'por archivar' if args.simular else 'archivadas'}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3  # Shebang para ejecución directa
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Benchmark de las rutas de lectura de 'modules/' contra la base configurada.
+- Ejecuta cada caso N veces (tras un calentamiento) y mide la latencia de cada llamada
+- Informa p50/p95/p99, media y operaciones por segundo
+- Guarda los resultados en JSON y compara contra una corrida previa para detectar regresiones
+
+Ejemplo:
+  python scripts_sql/benchmark.py --iteraciones 200 --guardar base.json
+  python scripts_sql/benchmark.py --iteraciones 200 --comparar base.json --umbral 20
+"""  # Docstring: propósito y uso
+
+import argparse  # Parseo de argumentos CLI
+import json      # Resultados en JSON
+import math      # Percentil por rango más cercano
+import os, sys   # Manejo de rutas para importar 'db' y 'modules'
+import platform  # Metadatos de la corrida
+import random    # Parámetros variados entre iteraciones
+import time      # Medición de latencias
+from datetime import datetime  # Marca de tiempo de la corrida
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Agrega raíz del proyecto al path
+
+from config import DB_HOST, DB_NAME  # Metadatos de la corrida
+from db import db_connection, db_cursor  # Muestreo de claves existentes
+from modules import consultas, reportes  # Casos de lectura
+from modules.auditoria import listar_auditoria, flush_auditoria  # Auditoría paginada
+from modules.seguridad import (  # Login, permisos y listados
+    ensure_password_column,
+    iniciar_sesion,
+    listar_roles,
+    listar_usuarios,
+    obtener_regla_bloqueo,
+    obtener_usuario_por_nombre,
+    tiene_permiso,
+)
+
+PERCENTILES = (50, 95, 99)  # Percentiles informados
+
+
+def muestrear_claves(rng: random.Random, cantidad: int = 200) -> dict:
+    """Toma IDs y nombres existentes para que los casos consulten datos reales."""
+    with db_connection() as conn:
+        with db_cursor(conn) as cur:
+            cur.execute(
+                "SELECT id_usuario, nombre, rol FROM usuarios ORDER BY RAND(%s) LIMIT %s",
+                (rng.randrange(2 ** 31), cantidad),
+            )  # Muestra reproducible con la semilla
+            usuarios = cur.fetchall()
+            cur.execute("SELECT MAX(id_acceso) AS maximo FROM accesos")
+            max_acceso = cur.fetchone()["maximo"] or 1
+    if not usuarios:
+        raise RuntimeError("No hay usuarios: carga datos con seguridad_db.sql o generar_datos.py")
+    return {"usuarios": usuarios, "max_acceso": max_acceso}
+
+
+def definir_casos(claves: dict, rng: random.Random) -> dict:
+    """Casos de benchmark: nombre -> función sin argumentos que hace una llamada."""
+    usuarios = claves["usuarios"]
+    usuario = lambda: rng.choice(usuarios)  # Usuario al azar por iteración
+    return {
+        "consultas.listar_sistemas": consultas.listar_sistemas,
+        "consultas.listar_accesos": lambda: consultas.listar_accesos(100),
+        "consultas.listar_accesos.profundo": lambda: consultas.listar_accesos(
+            100, before_id=rng.randint(1, claves["max_acceso"])),  # Página en el medio de la tabla
+        "consultas.accesos_por_usuario": lambda: consultas.accesos_por_usuario(usuario()["id_usuario"]),
+        "consultas.listar_eventos": lambda: consultas.listar_eventos(100),
+        "consultas.eventos_por_usuario": lambda: consultas.eventos_por_usuario(usuario()["id_usuario"]),
+        "consultas.listar_alertas": lambda: consultas.listar_alertas(100),
+        "consultas.alertas_por_usuario": lambda: consultas.alertas_por_usuario(usuario()["id_usuario"]),
+        "auditoria.listar_auditoria": lambda: listar_auditoria(100),
+        "seguridad.obtener_usuario_por_nombre": lambda: obtener_usuario_por_nombre(usuario()["nombre"]),
+        "seguridad.iniciar_sesion": lambda: iniciar_sesion(usuario()["nombre"], "1234"),
+        "seguridad.tiene_permiso": lambda: tiene_permiso(usuario()["rol"], "ver_todo"),
+        "seguridad.listar_usuarios": listar_usuarios,
+        "seguridad.listar_roles": listar_roles,
+        "seguridad.obtener_regla_bloqueo": obtener_regla_bloqueo,
+        "reportes.resumen_accesos_por_usuario": reportes.resumen_accesos_por_usuario,
+        "reportes.top_ips_fallidas": reportes.top_ips_fallidas,
+        "reportes.accesos_por_sistema_dia": reportes.accesos_por_sistema_dia,
+        "reportes.usuarios_por_rol": reportes.usuarios_por_rol,
+        "reportes.eventos_recientes_por_usuario": reportes.eventos_recientes_por_usuario,
+        "reportes.resumen_alertas_por_usuario": reportes.resumen_alertas_por_usuario,
+        "reportes.ranking_tasa_fallos": reportes.ranking_tasa_fallos,
+        "reportes.resumen_auditoria": reportes.resumen_auditoria,
+        "reportes.fallos_acumulados": lambda: reportes.fallos_acumulados(usuario()["id_usuario"]),
+    }
+
+
+def percentil(ordenadas: list, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    indice = max(0, math.ceil(p / 100 * len(ordenadas)) - 1)
+    return ordenadas[indice]
+
+
+def medir(funcion, iteraciones: int, calentamiento: int) -> dict:
+    """Ejecuta 'funcion' y resume sus latencias en milisegundos."""
+    for _ in range(calentamiento):
+        funcion()  # Llena cachés y el pool antes de medir
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        t0 = time.perf_counter()
+        funcion()
+        latencias.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    resultado = {f"p{p}_ms": round(percentil(latencias, p), 3) for p in PERCENTILES}
+    resultado.update({
+        "media_ms": round(sum(latencias) / len(latencias), 3),
+        "max_ms": round(latencias[-1], 3),
+        "ops_s": round(iteraciones / total, 1) if total > 0 else 0.0,
+        "iteraciones": iteraciones,
+    })
+    return resultado
+
+
+def comparar(actual: dict, base: dict, umbral: float) -> list:
+    """Imprime la variación de p95 contra 'base'; devuelve los casos que empeoraron más del umbral (%)."""
+    regresiones = []
+    print(f"\n{'caso':45} {'p95 base':>10} {'p95 ahora':>10} {'var %':>8}")
+    for nombre, r in actual.items():
+        previo = base.get(nombre)
+        if not previo:
+            continue  # Caso nuevo: no hay con qué comparar
+        var = 100 * (r["p95_ms"] - previo["p95_ms"]) / previo["p95_ms"] if previo["p95_ms"] else 0.0
+        marca = " ⚠️" if var > umbral else ""
+        print(f"{nombre:45} {previo['p95_ms']:>10.3f} {r['p95_ms']:>10.3f} {var:>+8.1f}{marca}")
+        if var > umbral:
+            regresiones.append(nombre)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de las funciones de lectura de modules/.')
+    parser.add_argument('--iteraciones', type=int, default=100, help='Llamadas medidas por caso')
+    parser.add_argument('--calentamiento', type=int, default=5, help='Llamadas previas sin medir')
+    parser.add_argument('--caso', action='append', default=None, help='Ejecutar solo los casos que contengan este texto (repetible)')
+    parser.add_argument('--guardar', default=None, help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--comparar', default=None, help='Archivo JSON de una corrida previa')
+    parser.add_argument('--umbral', type=float, default=20.0, help='Aumento de p95 (%%) considerado regresión')
+    parser.add_argument('--semilla', type=int, default=1, help='Semilla de los parámetros aleatorios')
+    args = parser.parse_args()  # Parsea argumentos
+
+    if args.iteraciones < 1:
+        print("❌ --iteraciones debe ser >= 1")
+        sys.exit(1)
+    rng = random.Random(args.semilla)
+    ensure_password_column()  # Requisito de iniciar_sesion
+    casos = definir_casos(muestrear_claves(rng), rng)
+    if args.caso:
+        casos = {n: f for n, f in casos.items() if any(c in n for c in args.caso)}
+
+    resultados = {}
+    print(f"{'caso':45} {'p50':>9} {'p95':>9} {'p99':>9} {'ops/s':>9}")
+    for nombre, funcion in casos.items():
+        r = medir(funcion, args.iteraciones, args.calentamiento)
+        resultados[nombre] = r
+        print(f"{nombre:45} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['ops_s']:>9.1f}")
+    flush_auditoria()  # Los LOGIN encolados no quedan pendientes al salir
+
+    if args.guardar:
+        salida = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "host": DB_HOST,
+            "base_de_datos": DB_NAME,
+            "python": platform.python_version(),
+            "iteraciones": args.iteraciones,
+            "resultados": resultados,
+        }
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump(salida, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)["resultados"]
+        regresiones = comparar(resultados, base, args.umbral)
+        if regresiones:
+            print(f"\n❌ {len(regresiones)} caso(s) con p95 más de {args.umbral:.0f}% peor que la base.")
+            sys.exit(1)  # Código de salida útil en CI
+        print("\n✅ Sin regresiones respecto de la base.")
+
+
+if __name__ == '__main__':
+    main()
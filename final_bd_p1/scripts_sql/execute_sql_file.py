@@ -3,22 +3,33 @@
 """
 Ejecutor de SQL para crear/actualizar la base de datos desde un archivo .sql
 - Detecta contraseña común de MySQL/XAMPP si no se especifica
-- Ejecuta el archivo con múltiples sentencias (CREATE, USE, DROP, INSERT, etc.)
+- Ejecuta el archivo en streaming (parser de sentencias con DELIMITER, cadenas y comentarios)
+  confirmando por lotes, sin cargarlo completo en memoria ni escribir copias temporales
+- Aplica migraciones versionadas (índices, columnas y rellenos), re-ejecutables sobre BDs existentes;
+  el particionado (migración 3) solo con --with-partitioning
 - Verifica la creación de la base de datos y lista las tablas
 """  # Docstring: propósito y funcionalidades
-
+
 import argparse  # Parseo de argumentos CLI
-import os        # Manejo de archivos temporales y entorno
+import os        # Manejo de archivos y entorno
+import re        # Tokens del parser de sentencias
 import sys       # Salidas y exit
+from datetime import date  # Límites de las particiones mensuales
+from typing import Iterable, Iterator, List, Optional, Tuple  # Tipos del parser
 import mysql.connector  # Driver MySQL
 from mysql.connector import Error  # Excepciones de MySQL
-
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Agrega raíz del proyecto al path
+
+from config import RETENCION_MESES, RETENCION_MESES_FUTUROS  # Mismo horizonte que modules/retencion.py
+
 CANDIDATE_PASSWORDS = [
     os.environ.get('MYSQL_PASSWORD') or '',  # Usa env si existe
     'root', 'admin', 'password', 'xampp', 'Jquin28'  # Contraseñas comunes
 ]
-
-
+
+DEFAULT_COMMIT_EVERY = 1000  # Sentencias por commit al ejecutar scripts grandes
+
+
 def detect_password(host: str, user: str, port: int = 3306):
     """Intenta conectar usando contraseñas comunes y devuelve la que funcione"""
     for pwd in CANDIDATE_PASSWORDS:
@@ -30,70 +41,363 @@ def detect_password(host: str, user: str, port: int = 3306):
         except Error:
             continue  # Intenta la siguiente
     return None  # No se detectó
-
-
-def execute_sql_file(connection, sql_path: str):
-    """Ejecuta el archivo SQL manejando cambios de DELIMITER y comentarios."""
-    if not os.path.isfile(sql_path):
-        raise FileNotFoundError(f"Archivo SQL no encontrado: {sql_path}")
 
-    with open(sql_path, 'r', encoding='utf-8') as f:
-        sql_script = f.read()  # Lee contenido completo
-
-    statements = []  # Lista de sentencias a ejecutar
-    delimiter = ';'  # Delimitador inicial
-    buffer = []  # Buffer de líneas por sentencia
-    in_block_comment = False  # Estado para /* ... */
-    for line in sql_script.splitlines():  # Itera por líneas
-        raw = line.rstrip('\n')
-        stripped = raw.strip()
-        if not stripped:
-            continue  # Salta líneas vacías
-        if in_block_comment:
-            if '*/' in stripped:
-                in_block_comment = False  # Fin de comentario de bloque
-            continue
-        if stripped.startswith('/*'):
-            in_block_comment = True  # Inicio de comentario de bloque
-            continue
-        if stripped.startswith('--'):
-            continue  # Comentario de línea
-        if stripped.upper().startswith('DELIMITER '):  # Cambio de delimitador
-            if buffer:
-                stmt = '\n'.join(buffer).strip()
-                if stmt:
-                    statements.append(stmt.rstrip(delimiter))  # Cierra sentencia previa
+
+class SQLSyntaxError(ValueError):
+    """Script SQL mal formado (comentario o cadena sin cerrar al final del archivo)."""
+
+
+_NO_RESET_TRANSFORMS = [
+    (re.compile(r'^DROP\s+TABLE\s+IF\s+EXISTS\s', re.I), None),  # Se omite: preserva datos
+    (re.compile(r'^CREATE\s+TABLE\s+(?!IF\s+NOT\s+EXISTS\s)', re.I), 'CREATE TABLE IF NOT EXISTS '),
+    (re.compile(r'^INSERT\s+INTO\s', re.I), 'INSERT IGNORE INTO '),  # Evita duplicados
+]
+
+
+def no_reset_transform(stmt: str):
+    """
+    Transformación sin --reset, aplicada a cada sentencia de nivel superior:
+    omite DROP TABLE, crea tablas solo si faltan e inserta con IGNORE.
+    Los cuerpos de triggers/procedimientos no se tocan. Devuelve None si se omite.
+    """
+    for patron, reemplazo in _NO_RESET_TRANSFORMS:
+        if patron.match(stmt):
+            return None if reemplazo is None else patron.sub(reemplazo, stmt, count=1)
+    return stmt
+
+
+_QUOTE_END = {  # Dentro de una cadena: escape con barra, comilla duplicada o cierre
+    "'": re.compile(r"\\.|''|'"),
+    '"': re.compile(r'\\.|""|"'),
+    '`': re.compile(r'``|`'),  # Identificadores: sin escapes con barra
+}
+
+
+def _token_regex(delimiter: str):
+    """Próximo token relevante fuera de cadenas/comentarios para el delimitador vigente."""
+    return re.compile(r"""--(?=\s|$)|#|/\*|['"`]|""" + re.escape(delimiter))
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """
+    Parser en streaming: consume líneas y genera (línea de inicio, sentencia) a medida que se completan.
+    - Respeta DELIMITER, cadenas ('...', "...", `...`) y comentarios (--, #, /* */)
+    - Un delimitador puede cerrar la sentencia en medio de una línea (p.ej. 'SET x = 0; -- comentario')
+    Memoria: solo la sentencia en curso, nunca el archivo completo.
+    """
+    delimiter = ';'
+    token = _token_regex(delimiter)
+    buffer: List[str] = []   # Fragmentos de la sentencia en curso
+    vacio = True             # La sentencia en curso solo tiene espacios (sin recorrer el buffer)
+    inicio = 1               # Línea donde empezó la sentencia
+    quote: Optional[str] = None  # Comilla abierta
+    in_block_comment = False
+    numero = 0
+    for numero, line in enumerate(lines, start=1):
+        if quote is None and not in_block_comment and vacio:
+            stripped = line.strip()
+            if stripped.upper().startswith('DELIMITER '):  # Cambio de delimitador (solo entre sentencias)
+                delimiter = stripped.split(None, 1)[1].strip()
+                token = _token_regex(delimiter)
                 buffer = []
-            delimiter = stripped.split('DELIMITER', 1)[1].strip()
-            continue
-        buffer.append(raw)  # Acumula la línea
-        if stripped.endswith(delimiter):  # Fin de sentencia
-            stmt = '\n'.join(buffer).rstrip(delimiter).strip()
-            if stmt:
-                statements.append(stmt)
-            buffer = []
-    if buffer:  # Última sentencia sin delimitador al final
-        stmt = '\n'.join(buffer).strip()
-        if stmt:
-            statements.append(stmt)
+                continue
+        pos = 0
+        largo_previo = len(buffer)
+        while pos < len(line):
+            if in_block_comment:
+                fin = line.find('*/', pos)
+                if fin < 0:
+                    break  # El comentario sigue en la próxima línea
+                in_block_comment, pos = False, fin + 2
+                buffer.append(' ')
+                continue
+            if quote is not None:
+                m = _QUOTE_END[quote].search(line, pos)
+                if m is None:
+                    buffer.append(line[pos:])  # La cadena sigue en la próxima línea
+                    break
+                buffer.append(line[pos:m.end()])
+                pos = m.end()
+                if m.group() == quote:
+                    quote = None
+                continue
+            m = token.search(line, pos)
+            if m is None:
+                buffer.append(line[pos:])
+                break
+            buffer.append(line[pos:m.start()])
+            encontrado = m.group()
+            if encontrado in ("'", '"', '`'):
+                quote = encontrado
+                buffer.append(encontrado)
+                pos = m.end()
+            elif encontrado == '/*':
+                in_block_comment, pos = True, m.end()
+            elif encontrado == delimiter:
+                stmt = ''.join(buffer).strip()
+                if stmt:
+                    yield inicio, stmt
+                buffer, pos, inicio, vacio = [], m.end(), numero, True  # Lo que siga en la línea es otra sentencia
+                largo_previo = 0
+            else:  # '--' o '#': comentario hasta fin de línea
+                buffer.append('\n')
+                break
+        if vacio:
+            vacio = not any(parte.strip() for parte in buffer[largo_previo:])  # Solo lo agregado en esta línea
+        if vacio:
+            inicio = numero + 1  # La próxima sentencia empieza después de esta línea
+    if quote is not None or in_block_comment:
+        raise SQLSyntaxError(f"{'Cadena' if quote else 'Comentario'} sin cerrar al final del script (línea {numero})")
+    stmt = ''.join(buffer).strip()
+    if stmt:
+        yield inicio, stmt  # Última sentencia sin delimitador al final
+
+
+def execute_sql_file(connection, sql_path: str, preserve_data: bool = False,
+                     commit_every: int = DEFAULT_COMMIT_EVERY) -> int:
+    """
+    Ejecuta el archivo SQL en streaming: cada sentencia se ejecuta apenas se termina de leer.
+    - preserve_data: aplica no_reset_transform (sin DROP, CREATE IF NOT EXISTS, INSERT IGNORE)
+    - commit_every: confirma cada N sentencias (el DDL confirma por sí mismo)
+    Devuelve la cantidad de sentencias ejecutadas. Si una falla, se deshace el lote en curso
+    y el error indica la línea; los lotes anteriores quedan confirmados.
+    """
+    if not os.path.isfile(sql_path):
+        raise FileNotFoundError(f"Archivo SQL no encontrado: {sql_path}")
+    if commit_every < 1:
+        raise ValueError("commit_every debe ser >= 1")
 
+    ejecutadas = 0
+    pendientes = 0  # Sentencias desde el último commit
     cursor = connection.cursor()
     try:
-        for stmt in statements:  # Ejecuta cada sentencia en orden
-            cursor.execute(stmt)
-            try:
-                if getattr(cursor, "with_rows", False):
-                    cursor.fetchall()  # Drena resultados (evita "Unread result found")
-            except Exception:
-                pass
-        connection.commit()  # Commit tras ejecutar todo
-    except Error as e:
-        connection.rollback()  # Rollback en fallo
-        raise e
+        with open(sql_path, 'r', encoding='utf-8') as f:
+            for linea, stmt in iter_statements(f):  # Lee y ejecuta a la par
+                if preserve_data:
+                    stmt = no_reset_transform(stmt)
+                    if stmt is None:
+                        continue
+                try:
+                    cursor.execute(stmt)
+                    if getattr(cursor, "with_rows", False):
+                        cursor.fetchall()  # Drena resultados (evita "Unread result found")
+                except Error as e:
+                    raise Error(msg=f"{e.msg} (sentencia en la línea {linea} de {sql_path})", errno=e.errno) from e
+                ejecutadas += 1
+                pendientes += 1
+                if pendientes >= commit_every:
+                    connection.commit()  # Lote confirmado: acota el tamaño de la transacción
+                    pendientes = 0
+        connection.commit()  # Último lote
+    except Error:
+        connection.rollback()  # Deshace el lote en curso
+        raise
     finally:
         cursor.close()  # Cierra cursor
-
-
+    return ejecutadas
+
+
+# ============================
+# Migraciones versionadas
+# ============================
+# Cada migración es (versión, descripción, pasos). Los pasos son idempotentes,
+# así que reintentar una migración que falló a medias es seguro. La versión
+# aplicada queda registrada en 'schema_migrations'. Las de OPTIONAL_MIGRATIONS
+# solo se aplican si se piden explícitamente (quedan pendientes hasta entonces).
+
+def _index_exists(cursor, db_name: str, table: str, index: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s AND INDEX_NAME=%s LIMIT 1",
+        (db_name, table, index),
+    )
+    return cursor.fetchone() is not None
+
+
+def add_index(table: str, index: str, columns: str):
+    """Paso: crea el índice si no existe, con DDL online (sin bloquear escrituras)."""
+    def paso(cursor, db_name: str):
+        if _index_exists(cursor, db_name, table, index):
+            return False  # Ya estaba
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} {columns}, ALGORITHM=INPLACE, LOCK=NONE")
+        return True
+    paso.descripcion = f"índice {index} en {table}{columns}"
+    return paso
+
+
+def _column_exists(cursor, db_name: str, table: str, column: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s AND COLUMN_NAME=%s LIMIT 1",
+        (db_name, table, column),
+    )
+    return cursor.fetchone() is not None
+
+
+def add_column(table: str, column: str, definition: str):
+    """Paso: agrega la columna si no existe (NULL al final: INSTANT en MySQL 8, sin copiar la tabla)."""
+    def paso(cursor, db_name: str):
+        if _column_exists(cursor, db_name, table, column):
+            return False  # Ya estaba
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    paso.descripcion = f"columna {table}.{column} {definition}"
+    return paso
+
+
+def drop_foreign_key(table: str, name: str):
+    """Paso: quita la FK si existe (InnoDB no admite FKs en tablas particionadas)."""
+    def paso(cursor, db_name: str):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.TABLE_CONSTRAINTS "
+            "WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s AND CONSTRAINT_NAME=%s AND CONSTRAINT_TYPE='FOREIGN KEY' LIMIT 1",
+            (db_name, table, name),
+        )
+        if cursor.fetchone() is None:
+            return False  # Ya no estaba
+        cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY {name}")
+        return True
+    paso.descripcion = f"sin FK {name} en {table}"
+    return paso
+
+
+def _add_months(first_day: date, months: int) -> date:
+    year, month = divmod(first_day.month - 1 + months, 12)
+    return date(first_day.year + year, month + 1, 1)
+
+
+def partition_by_month(table: str, pk: str, months_back: int, months_ahead: int):
+    """
+    Paso: particiona la tabla por mes de 'fecha' (RANGE COLUMNS, una partición pAAAAMM por mes y pmax).
+    MySQL exige que la columna de partición esté en la PK: la PK pasa a ({pk}, fecha) y fecha a NOT NULL
+    (las filas sin fecha van a 1970-01-01). Lo anterior a 'months_back' meses queda en la primera partición.
+    Ninguna clave única puede omitir 'fecha', así que la base deja de garantizar que {pk} sea único
+    por sí solo: lo garantiza 'secuencias', que entrega cada ID una sola vez.
+    Reconstruye la tabla bloqueando escrituras: aplicar en una ventana de mantenimiento.
+    """
+    def paso(cursor, db_name: str):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s AND PARTITION_NAME IS NOT NULL LIMIT 1",
+            (db_name, table),
+        )
+        if cursor.fetchone() is not None:
+            return False  # Ya particionada
+        cursor.execute(f"UPDATE {table} SET fecha = '1970-01-01' WHERE fecha IS NULL")
+        cursor.execute(f"SELECT MIN(fecha) FROM {table}")
+        (oldest,) = cursor.fetchone()
+        current = date.today().replace(day=1)
+        month = max(oldest.replace(day=1) if oldest else current, _add_months(current, -months_back))
+        partitions = []
+        while month <= _add_months(current, months_ahead):
+            upper = _add_months(month, 1)
+            partitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{upper.isoformat()}')")
+            month = upper
+        partitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+        cursor.execute(
+            f"ALTER TABLE {table} MODIFY fecha DATE NOT NULL, DROP PRIMARY KEY, ADD PRIMARY KEY ({pk}, fecha) "
+            f"PARTITION BY RANGE COLUMNS(fecha) ({', '.join(partitions)})"
+        )  # Una sola reconstrucción de la tabla
+        return True
+    paso.descripcion = f"particionado mensual de {table} por fecha"
+    return paso
+
+
+def backfill(table: str, pk: str, assignment: str, where: str, chunk: int = 10000):
+    """
+    Paso: UPDATE por rangos de PK con commit por rango (sin una transacción gigante ni bloquear la tabla).
+    Solo toca filas que cumplen 'where', así que reanudar tras un corte continúa donde quedó.
+    """
+    def paso(cursor, db_name: str):
+        cursor.execute(f"SELECT MIN({pk}), MAX({pk}) FROM {table}")
+        minimo, maximo = cursor.fetchone()
+        if minimo is None:
+            return False  # Tabla vacía
+        tocadas = 0
+        for inicio in range(minimo, maximo + 1, chunk):
+            cursor.execute(
+                f"UPDATE {table} SET {assignment} WHERE {pk} BETWEEN %s AND %s AND {where}",
+                (inicio, inicio + chunk - 1),
+            )
+            tocadas += cursor.rowcount
+            cursor.execute("COMMIT")  # Libera los locks del rango
+        return tocadas > 0
+    paso.descripcion = f"relleno de {table}: SET {assignment} WHERE {where}"
+    return paso
+
+
+MIGRATIONS = [
+    (1, "Índices para las rutas calientes", [
+        add_index('usuarios', 'idx_usuarios_nombre', '(nombre)'),                                 # Login por nombre
+        add_index('accesos', 'idx_accesos_usuario', '(id_usuario, id_acceso)'),                   # accesos_por_usuario
+        add_index('accesos', 'idx_accesos_usuario_fallos', '(id_usuario, exitoso, fecha)'),       # Trigger de bloqueo, fn_accesos_fallidos_ultimos_dias, consultas 1/7/9
+        add_index('accesos', 'idx_accesos_ip', '(ip, exitoso)'),                                  # Top IPs (consulta 2, cubriente)
+        add_index('accesos', 'idx_accesos_sistema_fecha', '(id_sistema, fecha, exitoso)'),        # Por sistema y día (consulta 3, cubriente)
+        add_index('eventos_seguridad', 'idx_eventos_usuario', '(id_usuario, id_evento)'),         # eventos_por_usuario
+        add_index('alertas', 'idx_alertas_usuario', '(id_usuario, id_alerta)'),                   # alertas_por_usuario
+        add_index('auditoria', 'idx_auditoria_tabla_accion', '(tabla_afectada, accion)'),         # Resumen de auditoría (consulta 8, cubriente)
+    ]),
+    (2, "IP binaria para consultas por CIDR y subred", [
+        add_column('accesos', 'ip_bin', 'VARBINARY(16) NULL'),                                    # INET6_ATON(ip): 4 bytes IPv4, 16 bytes IPv6
+        backfill('accesos', 'id_acceso', 'ip_bin = INET6_ATON(ip)', 'ip_bin IS NULL AND ip IS NOT NULL'),  # Antes del índice: se construye una sola vez
+        add_index('accesos', 'idx_accesos_ip_bin', '(ip_bin, exitoso)'),                          # Rangos CIDR y agregación por subred (cubriente)
+    ]),
+    (3, "Particionado mensual de accesos y auditoría (retención)", [
+        drop_foreign_key('accesos', 'fk_usuario'),
+        drop_foreign_key('accesos', 'fk_sistema'),
+        partition_by_month('accesos', 'id_acceso', RETENCION_MESES, RETENCION_MESES_FUTUROS),            # modules/retencion.py archiva los meses vencidos
+        partition_by_month('auditoria', 'id_auditoria', RETENCION_MESES, RETENCION_MESES_FUTUROS),
+    ]),
+    (4, "Contraseña de usuarios", [
+        add_column('usuarios', 'password', "VARCHAR(255) NOT NULL DEFAULT '1234'"),               # Login; los existentes quedan con '1234'
+    ]),
+]
+
+OPTIONAL_MIGRATIONS = {3: '--with-partitioning'}  # Versión -> opción que la habilita
+
+
+def apply_migrations(connection, db_name: str, include_optional: bool = False):
+    """
+    Aplica en orden las migraciones pendientes y devuelve las versiones aplicadas.
+    Las opcionales se omiten salvo con include_optional=True.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"USE {db_name}")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version INT PRIMARY KEY,
+              descripcion VARCHAR(255) NOT NULL,
+              aplicada_en DATETIME NOT NULL
+            ) ENGINE=InnoDB
+            """
+        )
+        cursor.execute("SELECT version FROM schema_migrations")
+        aplicadas = {row[0] for row in cursor.fetchall()}
+        nuevas = []
+        for version, descripcion, pasos in MIGRATIONS:
+            if version in aplicadas:
+                continue
+            if version in OPTIONAL_MIGRATIONS and not include_optional:
+                print(f"⏭️  Migración {version} omitida: {descripcion} (opcional, usa {OPTIONAL_MIGRATIONS[version]})")
+                continue
+            print(f"🛠️  Migración {version}: {descripcion}")
+            for paso in pasos:
+                hecho = paso(cursor, db_name)
+                print(f"   {'•' if hecho else '='} {paso.descripcion}{'' if hecho else ' (ya existía)'}")
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, descripcion, aplicada_en) VALUES (%s, %s, NOW())",
+                (version, descripcion),
+            )
+            connection.commit()  # Cada migración se confirma por separado
+            nuevas.append(version)
+        return nuevas
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
 def verify_schema(host: str, user: str, password: str, db_name: str, port: int = 3306):
     """Verifica tablas, rutinas y triggers."""
     conn = mysql.connector.connect(host=host, user=user, password=password, database=db_name, port=port)
@@ -116,18 +420,27 @@ def verify_schema(host: str, user: str, password: str, db_name: str, port: int =
     cursor.close()
     conn.close()
     return tables, routines, triggers
-
-
+
+
 def main():
     parser = argparse.ArgumentParser(description='Ejecutar archivo SQL en MySQL.')
     parser.add_argument('--host', default='localhost', help='Host de MySQL, por defecto localhost')
     parser.add_argument('--port', type=int, default=3306, help='Puerto de MySQL, por defecto 3306')
     parser.add_argument('--user', default='root', help='Usuario de MySQL, por defecto root')
     parser.add_argument('--password', default=None, help='Contraseña de MySQL (opcional)')
-    parser.add_argument('--sql-file', required=True, help='Ruta al archivo SQL a ejecutar')
+    parser.add_argument('--sql-file', help='Ruta al archivo SQL a ejecutar')
     parser.add_argument('--reset', action='store_true', help='Borrar y recrear datos (DROP + INSERTs). Por defecto no borra.')
+    parser.add_argument('--database', default='seguridad_db', help='Base a migrar/verificar, por defecto seguridad_db')
+    parser.add_argument('--migrate-only', action='store_true', help='Solo aplicar migraciones pendientes (no ejecuta --sql-file)')
+    parser.add_argument('--no-migrate', action='store_true', help='No aplicar migraciones tras ejecutar el SQL')
+    parser.add_argument('--with-partitioning', action='store_true',
+                        help='Aplicar también la migración 3 (particionado mensual; reconstruye accesos y auditoría)')
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY,
+                        help=f'Sentencias por commit, por defecto {DEFAULT_COMMIT_EVERY}')
 
     args = parser.parse_args()  # Parsea argumentos
+    if not args.sql_file and not args.migrate_only:
+        parser.error('--sql-file es obligatorio salvo con --migrate-only')
 
     # Detectar contraseña si no se proporciona
     password = args.password
@@ -148,37 +461,18 @@ def main():
             sys.exit(1)
         print("✅ Conexión establecida.")
 
-        # Ejecutar archivo SQL
-        print(f"📄 Ejecutando archivo SQL: {args.sql_file}")
-        # Preprocesamiento: si no hay reset, filtramos DROP TABLE y hacemos INSERT IGNORE
-        if not args.reset:
-            with open(args.sql_file, 'r', encoding='utf-8') as f:
-                original = f.read()  # Contenido original
-            lines = []  # Líneas transformadas
-            for raw in original.splitlines():
-                s = raw.strip()
-                if s.upper().startswith('DROP TABLE IF EXISTS '):
-                    continue  # Elimina DROP para preservar datos
-                if s.upper().startswith('CREATE TABLE '):
-                    raw = raw.replace('CREATE TABLE ', 'CREATE TABLE IF NOT EXISTS ')
-                if s.upper().startswith('INSERT INTO '):
-                    raw = raw.replace('INSERT INTO', 'INSERT IGNORE INTO')  # Evita duplicados
-                lines.append(raw)
-            temp_script = '\n'.join(lines)
-            tmp_path = args.sql_file + '.tmp_nodrop.sql'  # Archivo temporal
-            with open(tmp_path, 'w', encoding='utf-8') as tf:
-                tf.write(temp_script)
-            execute_sql_file(conn, tmp_path)  # Ejecuta SQL transformado
-            try:
-                os.remove(tmp_path)  # Limpia temporal
-            except Exception:
-                pass
-        else:
-            execute_sql_file(conn, args.sql_file)  # Ejecuta tal cual
-        print("✅ Archivo SQL ejecutado correctamente.")
+        # Ejecutar archivo SQL (se omite con --migrate-only)
+        if not args.migrate_only:
+            print(f"📄 Ejecutando archivo SQL: {args.sql_file}")
+            # Sin --reset se omiten los DROP TABLE y los INSERT pasan a INSERT IGNORE (en memoria)
+            total = execute_sql_file(conn, args.sql_file, preserve_data=not args.reset, commit_every=args.commit_every)
+            print(f"✅ Archivo SQL ejecutado correctamente ({total} sentencias).")
+
+        db_name = args.database
+        if not args.no_migrate:
+            nuevas = apply_migrations(conn, db_name, args.with_partitioning)  # Idempotente: seguro de re-ejecutar
+            print(f"✅ Migraciones aplicadas: {nuevas}" if nuevas else "✅ Esquema al día (sin migraciones pendientes).")
 
-        # Intentar obtener el nombre de la base creada desde el archivo (heurística)
-        db_name = 'seguridad_db'
         print(f"🔎 Verificando esquema en '{db_name}'...")
         tables, routines, triggers = verify_schema(args.host, args.user, password, db_name, args.port)
         print("📋 Tablas encontradas:")
@@ -208,7 +502,7 @@ def main():
                 conn.close()  # Cierra conexión
         except Exception:
             pass
-
-
-if __name__ == '__main__':
+
+
+if __name__ == '__main__':
     main()
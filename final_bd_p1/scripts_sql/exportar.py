@@ -0,0 +1,88 @@
+#!/usr/bin/env python3  # Shebang para ejecución directa
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Exportador de tablas operativas a CSV o JSONL (opcionalmente .gz) para el SIEM.
+- Lee con un cursor sin buffer y escribe fila a fila: memoria constante
+- Filtra por tablas y por rango de fechas
+- Reanuda desde el último ID exportado (--desde-id o archivo de estado); el archivo de estado
+  guarda también los IDs salteados, que se re-buscan en las corridas siguientes (confirmados tarde)
+
+Ejemplo (exportación nocturna incremental):
+  python scripts_sql/exportar.py --tabla accesos --tabla auditoria --formato jsonl --gzip \\
+      --salida /var/export --estado /var/export/estado.json
+"""  # Docstring: propósito y uso
+
+import argparse  # Parseo de argumentos CLI
+import json      # Archivo de estado
+import os, sys   # Manejo de rutas para importar 'db' y 'modules'
+import time      # Medición de throughput
+from datetime import date  # Parseo de fechas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Agrega raíz del proyecto al path
+
+from config import EXPORT_FETCH_SIZE, EXPORT_GAP_TTL, EXPORT_MAX_GAPS  # Tamaño de lote y huecos por defecto
+from db import Watermark  # Marca de agua con huecos
+from modules.exportacion import TABLAS_EXPORTABLES, exportar_tabla  # Exportación en streaming
+
+
+def leer_estado(ruta: str) -> dict:
+    """Lee la marca de agua exportada por tabla ({} si el archivo no existe)."""
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_estado(ruta: str, estado: dict) -> None:
+    """Guarda el estado de forma atómica (archivo temporal + rename)."""
+    tmp = ruta + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+    os.replace(tmp, ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportar tablas en streaming a CSV o JSONL.')
+    parser.add_argument('--tabla', action='append', choices=sorted(TABLAS_EXPORTABLES),
+                        help='Tabla a exportar (repetible; por defecto todas)')
+    parser.add_argument('--formato', choices=['csv', 'jsonl'], default='csv', help='Formato de salida')
+    parser.add_argument('--gzip', action='store_true', help='Comprimir la salida con gzip')
+    parser.add_argument('--salida', default='.', help='Directorio destino')
+    parser.add_argument('--desde', type=date.fromisoformat, default=None, help='Fecha mínima (YYYY-MM-DD)')
+    parser.add_argument('--hasta', type=date.fromisoformat, default=None, help='Fecha máxima (YYYY-MM-DD)')
+    parser.add_argument('--desde-id', type=int, default=None, help='Exportar solo IDs mayores a este valor')
+    parser.add_argument('--estado', default=None,
+                        help='Archivo JSON con el último ID exportado y los huecos pendientes por tabla (se lee y se actualiza)')
+    parser.add_argument('--lote', type=int, default=EXPORT_FETCH_SIZE, help=f'Filas por fetch (por defecto {EXPORT_FETCH_SIZE})')
+    args = parser.parse_args()  # Parsea argumentos
+
+    tablas = args.tabla or list(TABLAS_EXPORTABLES)
+    estado = leer_estado(args.estado) if args.estado else {}
+    os.makedirs(args.salida, exist_ok=True)
+    extension = args.formato + ('.gz' if args.gzip else '')
+
+    for tabla in tablas:
+        marca = None
+        if args.desde_id is not None:
+            marca = Watermark(args.desde_id, EXPORT_GAP_TTL, EXPORT_MAX_GAPS)
+        elif args.estado:
+            marca = Watermark.from_dict(estado.get(tabla, 0), EXPORT_GAP_TTL, EXPORT_MAX_GAPS)
+        ruta = os.path.join(args.salida, f"{tabla}.{extension}")
+        pendientes = len(marca.pending()) if marca else 0
+        print(f"📤 Exportando {tabla} → {ruta}"
+              + (f" (desde id {marca.mark}, {pendientes} huecos pendientes)" if marca else ""))
+        inicio = time.monotonic()
+        total, ultimo_id = exportar_tabla(
+            tabla, ruta, formato=args.formato, comprimir=args.gzip,
+            desde=args.desde, hasta=args.hasta, lote=args.lote, marca=marca,
+        )
+        duracion = time.monotonic() - inicio
+        tasa = total / duracion if duracion > 0 else 0.0
+        print(f"✅ {total} filas en {duracion:.1f}s ({tasa:.0f} filas/s), último id: {ultimo_id}")
+        if args.estado:
+            estado[tabla] = marca.to_dict()
+            guardar_estado(args.estado, estado)  # Se guarda por tabla: una falla posterior no pierde lo exportado
+
+
+if __name__ == '__main__':
+    main()
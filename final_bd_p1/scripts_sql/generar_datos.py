@@ -0,0 +1,168 @@
+#!/usr/bin/env python3  # Shebang para ejecución directa
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Generador de datos sintéticos para pruebas de volumen sobre 'seguridad_db'.
+- Crea usuarios, sistemas, accesos, eventos y alertas en cantidades configurables
+- Distribuciones sesgadas: pocos usuarios e IPs concentran la mayoría de los accesos (ley de Zipf)
+  y un subconjunto de IPs "atacantes" tiene una tasa de fallos mucho mayor
+- Los accesos se generan en streaming y se insertan por lotes con registrar_accesos_bulk,
+  así que pasan por los triggers (auditoría, resúmenes, bloqueo) como en producción
+- Reproducible con --semilla
+
+Ejemplo:
+  python scripts_sql/generar_datos.py --usuarios 5000 --sistemas 50 --accesos 2000000 --semilla 7
+"""  # Docstring: propósito y uso
+
+import argparse  # Parseo de argumentos CLI
+import bisect    # Muestreo por pesos acumulados
+import os, sys   # Manejo de rutas para importar 'db' y 'modules'
+import random    # Distribuciones sintéticas
+import time      # Medición de throughput
+from datetime import date, timedelta  # Fechas de los registros
+from itertools import accumulate, islice  # Pesos acumulados y corte en lotes
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Agrega raíz del proyecto al path
+
+from config import BULK_CHUNK_SIZE  # Tamaño de lote por defecto
+from db import db_connection, db_cursor, next_ids  # Helpers de BD
+from modules.consultas import registrar_accesos_bulk  # Ingesta por lotes
+from modules.seguridad import ensure_password_column  # Columna password requerida
+
+ACTOR = "GENERADOR"  # Actor registrado en auditoría
+ROLES = (("usuario", 90), ("auditor", 8), ("admin", 2))  # Rol y peso relativo
+TIPOS_EVENTO = ("Intento fallido", "Solicitud desbloqueo", "Cambio de contraseña", "Acceso fuera de horario", "Bloqueo")
+
+
+class Zipf:
+    """Muestreo de índices 0..n-1 con probabilidad proporcional a 1 / (rango + 1) ** s."""
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        self.rng = rng
+        self.acumulados = list(accumulate(1.0 / (k + 1) ** s for k in range(n)))  # Pesos acumulados
+
+    def muestra(self) -> int:
+        return bisect.bisect_left(self.acumulados, self.rng.random() * self.acumulados[-1])
+
+
+def insertar_por_lotes(sql: str, filas, tabla: str, pk: str, lote: int) -> list:
+    """Inserta filas (tuplas sin PK, puede ser un generador) con IDs de next_ids; devuelve los IDs asignados."""
+    asignados = []
+    it = iter(filas)
+    while True:
+        parte = list(islice(it, lote))  # Solo un lote en memoria
+        if not parte:
+            break
+        ids = next_ids(tabla, pk, len(parte))  # Bloque de IDs sin MAX(), antes de tomar la conexión
+        with db_connection() as conn:  # Un préstamo por lote: la reserva no pide un segundo
+            with db_cursor(conn) as cur:  # Un commit por lote
+                cur.executemany(sql, [(nuevo_id, *fila) for nuevo_id, fila in zip(ids, parte)])
+        asignados.extend(ids)
+    return asignados
+
+
+def generar_usuarios(n: int, rng: random.Random, lote: int) -> list:
+    roles = rng.choices([r for r, _ in ROLES], weights=[w for _, w in ROLES], k=n)
+    filas = [(f"Usuario Sintético {i:07d}", rol, 0, "1234") for i, rol in enumerate(roles, start=1)]
+    return insertar_por_lotes(
+        "INSERT INTO usuarios (id_usuario, nombre, rol, bloqueado, password) VALUES (%s, %s, %s, %s, %s)",
+        filas, "usuarios", "id_usuario", lote,
+    )
+
+
+def generar_sistemas(n: int, lote: int) -> list:
+    filas = [(f"Sistema Sintético {i:04d}", "Generado para pruebas de volumen") for i in range(1, n + 1)]
+    return insertar_por_lotes(
+        "INSERT INTO sistemas (id_sistema, nombre_sistema, descripcion) VALUES (%s, %s, %s)",
+        filas, "sistemas", "id_sistema", lote,
+    )
+
+
+def generar_accesos(n: int, usuarios: list, sistemas: list, ips: int, atacantes: float,
+                    tasa_fallos: float, dias: int, rng: random.Random):
+    """Genera n accesos (dicts para registrar_accesos_bulk) sin materializarlos en memoria."""
+    zipf_usuarios = Zipf(len(usuarios), 1.1, rng)  # Pocos usuarios muy activos
+    zipf_ips = Zipf(ips, 1.2, rng)                  # Pocas IPs concentran el tráfico
+    zipf_sistemas = Zipf(len(sistemas), 0.8, rng)
+    n_atacantes = max(1, int(ips * atacantes))
+    atacantes_ids = set(rng.sample(range(ips), n_atacantes))  # IPs con mucha tasa de fallos
+    hoy = date.today()
+    for _ in range(n):
+        ip_idx = zipf_ips.muestra()
+        fallo = rng.random() < (0.8 if ip_idx in atacantes_ids else tasa_fallos)
+        yield {
+            "id_usuario": usuarios[zipf_usuarios.muestra()],
+            "exitoso": not fallo,
+            "ip": f"10.{ip_idx >> 16 & 255}.{ip_idx >> 8 & 255}.{ip_idx & 255}",
+            "id_sistema": sistemas[zipf_sistemas.muestra()],
+            "fecha": hoy - timedelta(days=int(rng.expovariate(3.0 / dias)) % dias),  # Más tráfico reciente
+        }
+
+
+def generar_eventos(n: int, usuarios: list, dias: int, rng: random.Random, lote: int) -> None:
+    hoy = date.today()
+    tipos = (rng.choice(TIPOS_EVENTO) for _ in range(n))
+    insertar_por_lotes(
+        "INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha) VALUES (%s, %s, %s, %s, %s)",
+        ((rng.choice(usuarios), tipo, f"{tipo} (sintético)", hoy - timedelta(days=rng.randrange(dias))) for tipo in tipos),
+        "eventos_seguridad", "id_evento", lote,
+    )
+
+
+def generar_alertas(n: int, usuarios: list, dias: int, rng: random.Random, lote: int) -> None:
+    hoy = date.today()
+    insertar_por_lotes(
+        "INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha) VALUES (%s, %s, %s, %s)",
+        ((rng.choice(usuarios), "Alerta sintética de prueba", hoy - timedelta(days=rng.randrange(dias))) for _ in range(n)),
+        "alertas", "id_alerta", lote,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generar datos sintéticos en seguridad_db.')
+    parser.add_argument('--usuarios', type=int, default=1000, help='Usuarios a crear')
+    parser.add_argument('--sistemas', type=int, default=20, help='Sistemas a crear')
+    parser.add_argument('--accesos', type=int, default=100000, help='Accesos a crear')
+    parser.add_argument('--eventos', type=int, default=10000, help='Eventos de seguridad a crear')
+    parser.add_argument('--alertas', type=int, default=5000, help='Alertas a crear')
+    parser.add_argument('--ips', type=int, default=20000, help='IPs distintas de origen')
+    parser.add_argument('--atacantes', type=float, default=0.01, help='Fracción de IPs con alta tasa de fallos')
+    parser.add_argument('--tasa-fallos', type=float, default=0.05, help='Tasa de fallos de las IPs normales')
+    parser.add_argument('--dias', type=int, default=90, help='Días hacia atrás que cubren los datos')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla para resultados reproducibles')
+    parser.add_argument('--lote', type=int, default=BULK_CHUNK_SIZE, help=f'Filas por lote (por defecto {BULK_CHUNK_SIZE})')
+    args = parser.parse_args()  # Parsea argumentos
+
+    if args.usuarios < 1 or args.sistemas < 1 or args.ips < 1 or args.dias < 1:
+        print("❌ --usuarios, --sistemas, --ips y --dias deben ser >= 1")
+        sys.exit(1)
+    rng = random.Random(args.semilla)
+    ensure_password_column()  # Los usuarios sintéticos llevan contraseña
+    inicio = time.monotonic()
+
+    print(f"👥 Creando {args.usuarios} usuarios y {args.sistemas} sistemas...")
+    usuarios = generar_usuarios(args.usuarios, rng, args.lote)
+    sistemas = generar_sistemas(args.sistemas, args.lote)
+
+    print(f"📥 Creando {args.accesos} accesos...")
+    t0 = time.monotonic()
+    ultimo = {"t": t0}  # Momento del último reporte
+
+    def progreso(total: int):
+        ahora = time.monotonic()
+        if ahora - ultimo["t"] >= 5.0:  # Un reporte cada 5 segundos
+            ultimo["t"] = ahora
+            print(f"  … {total} accesos ({total / (ahora - t0):.0f} filas/s)")
+
+    registrar_accesos_bulk(
+        generar_accesos(args.accesos, usuarios, sistemas, args.ips, args.atacantes, args.tasa_fallos, args.dias, rng),
+        actor=ACTOR, chunk_size=args.lote, progreso=progreso,
+    )
+
+    print(f"🛡️ Creando {args.eventos} eventos y {args.alertas} alertas...")
+    generar_eventos(args.eventos, usuarios, args.dias, rng, args.lote)
+    generar_alertas(args.alertas, usuarios, args.dias, rng, args.lote)
+
+    print(f"✅ Datos generados en {time.monotonic() - inicio:.1f}s.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3  # Shebang para ejecución directa
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Importador de accesos desde archivos CSV o JSONL (logs de gateways).
+- Lee el archivo en streaming: memoria constante sin importar su tamaño
+- Inserta por lotes con consultas.registrar_accesos_bulk (executemany + un commit por lote)
+- Informa filas/segundo durante y al final de la importación
+
+Columnas/campos esperados: id_usuario, exitoso, ip, id_sistema y opcionalmente fecha (YYYY-MM-DD).
+"""  # Docstring: propósito y formato de entrada
+
+import argparse  # Parseo de argumentos CLI
+import csv       # Lectura CSV en streaming
+import json      # Lectura JSONL línea a línea
+import os, sys   # Manejo de rutas para importar 'db' y 'modules'
+import time      # Medición de throughput
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Agrega raíz del proyecto al path
+
+from config import BULK_CHUNK_SIZE  # Tamaño de lote por defecto
+from modules.consultas import registrar_accesos_bulk  # Ingesta por lotes
+
+VERDADEROS = {"1", "true", "t", "s", "si", "sí", "y", "yes"}  # Valores aceptados como éxito
+
+
+def normalizar(registro: dict, linea: int) -> dict:
+    """Convierte un registro crudo (strings) en los tipos que espera registrar_accesos_bulk."""
+    try:
+        exitoso = registro["exitoso"]
+        if not isinstance(exitoso, bool):
+            exitoso = str(exitoso).strip().lower() in VERDADEROS
+        return {
+            "id_usuario": int(registro["id_usuario"]),
+            "exitoso": exitoso,
+            "ip": str(registro["ip"]).strip(),
+            "id_sistema": int(registro["id_sistema"]),
+            "fecha": (registro.get("fecha") or None),  # None -> fecha de hoy
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Registro inválido en la línea {linea}: {e}") from e
+
+
+def leer_csv(f):
+    """Genera registros de un CSV con encabezado."""
+    for n, fila in enumerate(csv.DictReader(f), start=2):  # Línea 1 = encabezado
+        yield normalizar(fila, n)
+
+
+def leer_jsonl(f):
+    """Genera registros de un archivo JSON Lines (un objeto por línea)."""
+    for n, linea in enumerate(f, start=1):
+        linea = linea.strip()
+        if linea:
+            yield normalizar(json.loads(linea), n)
+
+
+def detectar_formato(ruta: str) -> str:
+    """Deduce el formato por extensión (.csv / .jsonl / .ndjson)."""
+    ext = os.path.splitext(ruta)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"No se pudo deducir el formato de '{ruta}'. Usa --formato.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importar accesos desde CSV o JSONL.')
+    parser.add_argument('archivo', help='Ruta al archivo CSV o JSONL')
+    parser.add_argument('--formato', choices=['csv', 'jsonl'], default=None, help='Formato (por defecto según extensión)')
+    parser.add_argument('--actor', default='IMPORTADOR', help='Actor registrado en auditoría')
+    parser.add_argument('--lote', type=int, default=BULK_CHUNK_SIZE, help=f'Filas por lote (por defecto {BULK_CHUNK_SIZE})')
+    parser.add_argument('--cada', type=float, default=5.0, help='Segundos entre reportes de progreso')
+    args = parser.parse_args()  # Parsea argumentos
+
+    try:
+        formato = args.formato or detectar_formato(args.archivo)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    lector = leer_csv if formato == "csv" else leer_jsonl
+
+    inicio = time.monotonic()
+    ultimo = {"t": inicio}  # Momento del último reporte
+
+    def progreso(total: int):
+        ahora = time.monotonic()
+        if ahora - ultimo["t"] >= args.cada:
+            ultimo["t"] = ahora
+            print(f"  … {total} filas ({total / (ahora - inicio):.0f} filas/s)")
+
+    print(f"📥 Importando {args.archivo} ({formato}, lotes de {args.lote})...")
+    try:
+        with open(args.archivo, 'r', encoding='utf-8', newline='') as f:
+            total = registrar_accesos_bulk(lector(f), actor=args.actor, chunk_size=args.lote, progreso=progreso)
+    except FileNotFoundError:
+        print(f"❌ Archivo no encontrado: {args.archivo}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    duracion = time.monotonic() - inicio
+    tasa = total / duracion if duracion > 0 else 0.0
+    print(f"✅ {total} accesos importados en {duracion:.1f}s ({tasa:.0f} filas/s).")
+
+
+if __name__ == '__main__':
+    main()
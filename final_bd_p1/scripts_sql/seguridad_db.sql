@@ -11,6 +11,15 @@ DROP TABLE IF EXISTS accesos;
 DROP TABLE IF EXISTS sistemas;
 DROP TABLE IF EXISTS usuarios;
 DROP TABLE IF EXISTS roles;
+DROP TABLE IF EXISTS secuencias;
+DROP TABLE IF EXISTS fallos_diarios;
+DROP TABLE IF EXISTS parametros_seguridad;
+DROP TABLE IF EXISTS resumen_accesos_usuario;
+DROP TABLE IF EXISTS resumen_accesos_ip;
+DROP TABLE IF EXISTS resumen_accesos_sistema_dia;
+DROP TABLE IF EXISTS resumen_alertas_usuario;
+DROP TABLE IF EXISTS resumen_auditoria;
+DROP TABLE IF EXISTS schema_migrations;
 SET FOREIGN_KEY_CHECKS = 1; -- Reactiva chequeo de claves foráneas
 
 -- Tabla: roles
@@ -31,6 +40,7 @@ CREATE TABLE usuarios (
   nombre VARCHAR(100) NOT NULL,                    -- Nombre completo
   rol VARCHAR(50) NOT NULL,                        -- Rol asignado (FK a roles.nombre_rol)
   bloqueado BOOLEAN DEFAULT FALSE,                 -- Estado de bloqueo
+  password VARCHAR(255) NOT NULL DEFAULT '1234',   -- Contraseña (los usuarios de ejemplo usan la de por defecto)
   CONSTRAINT fk_rol FOREIGN KEY (rol) REFERENCES roles (nombre_rol) -- Relación a roles
 ) ENGINE=InnoDB;
 
@@ -52,14 +62,17 @@ INSERT INTO sistemas (id_sistema, nombre_sistema, descripcion) VALUES
   (2, 'Portal Externo', 'Acceso desde clientes externos'),
   (3, 'Servidor de Administración', 'Módulo de gestión interna');
 
--- Tabla: accesos
+-- Tabla: accesos (la migración 3 la particiona por mes de 'fecha' y quita sus FK; ver modules/retencion.py)
 CREATE TABLE accesos (
   id_acceso INT PRIMARY KEY,                       -- Identificador del acceso (PK)
   id_usuario INT,                                  -- Usuario que intenta acceder (FK)
   fecha DATE,                                      -- Fecha del intento
   exitoso BOOLEAN,                                 -- Resultado (TRUE/FALSE)
   ip VARCHAR(50),                                  -- IP origen
+  ip_bin VARBINARY(16),                            -- IP empaquetada (INET6_ATON): 4 bytes IPv4, 16 bytes IPv6
   id_sistema INT,                                  -- Sistema destino (FK)
+  INDEX idx_accesos_usuario (id_usuario, id_acceso),                              -- Vistas por usuario (más recientes primero)
+  INDEX idx_accesos_ip_bin (ip_bin, exitoso),                                     -- Rangos CIDR y agregación por subred
   CONSTRAINT fk_usuario FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario), -- Relación a usuarios
   CONSTRAINT fk_sistema FOREIGN KEY (id_sistema) REFERENCES sistemas (id_sistema)  -- Relación a sistemas
 ) ENGINE=InnoDB;
@@ -78,6 +91,7 @@ CREATE TABLE eventos_seguridad (
   tipo_evento VARCHAR(100),                        -- Tipo (Bloqueo, Intento fallido, etc.)
   descripcion VARCHAR(255),                        -- Detalle del evento
   fecha DATE,                                      -- Fecha del evento
+  INDEX idx_eventos_usuario (id_usuario, id_evento),                              -- Vistas por usuario (más recientes primero)
   CONSTRAINT fk_evento_usuario FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario) -- Relación a usuarios
 ) ENGINE=InnoDB;
 
@@ -86,7 +100,7 @@ INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion,
   (2, 2, 'Intento fallido', 'Acceso fallido desde IP sospechosa', '2025-09-25'),
   (3, 3, 'Desbloqueo', 'Usuario reactivado por administrador', '2025-09-28');
 
--- Tabla: auditoria
+-- Tabla: auditoria (la migración 3 la particiona por mes de 'fecha'; ver modules/retencion.py)
 CREATE TABLE auditoria (
   id_auditoria INT PRIMARY KEY,                    -- Identificador de auditoría (PK)
   usuario VARCHAR(100),                            -- Actor (usuario o 'TRIGGER')
@@ -106,6 +120,7 @@ CREATE TABLE alertas (
   id_usuario INT,                                  -- Usuario asociado (FK)
   mensaje VARCHAR(255),                            -- Mensaje descriptivo
   fecha DATE,                                      -- Fecha de emisión
+  INDEX idx_alertas_usuario (id_usuario, id_alerta),                              -- Vistas por usuario (más recientes primero)
   CONSTRAINT fk_alerta_usuario FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario) -- Relación a usuarios
 ) ENGINE=InnoDB;
 
@@ -114,6 +129,113 @@ INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha) VALUES
   (2, 2, 'IP sospechosa detectada (10.0.0.5)', '2025-09-25'),
   (3, 3, 'Desbloqueo exitoso registrado', '2025-09-28');
 
+-- Tabla: secuencias (asignación de IDs sin MAX()+1)
+CREATE TABLE secuencias (
+  nombre VARCHAR(64) PRIMARY KEY,                  -- Tabla a la que pertenece la secuencia
+  siguiente INT NOT NULL                           -- Próximo ID libre (los bloques se reservan sumando)
+) ENGINE=InnoDB;
+
+INSERT INTO secuencias (nombre, siguiente)
+SELECT 'usuarios', COALESCE(MAX(id_usuario), 0) + 1 FROM usuarios
+UNION ALL SELECT 'accesos', COALESCE(MAX(id_acceso), 0) + 1 FROM accesos
+UNION ALL SELECT 'eventos_seguridad', COALESCE(MAX(id_evento), 0) + 1 FROM eventos_seguridad
+UNION ALL SELECT 'auditoria', COALESCE(MAX(id_auditoria), 0) + 1 FROM auditoria
+UNION ALL SELECT 'alertas', COALESCE(MAX(id_alerta), 0) + 1 FROM alertas;
+
+-- Tabla: parametros_seguridad (reglas configurables leídas por los triggers)
+CREATE TABLE parametros_seguridad (
+  clave VARCHAR(64) PRIMARY KEY,                   -- Nombre del parámetro
+  valor INT NOT NULL                               -- Valor entero
+) ENGINE=InnoDB;
+
+INSERT INTO parametros_seguridad (clave, valor) VALUES
+  ('bloqueo_max_fallos', 3),
+  ('bloqueo_ventana_dias', 7);
+
+-- Tabla: fallos_diarios (contador incremental de accesos fallidos por usuario y día)
+CREATE TABLE fallos_diarios (
+  id_usuario INT NOT NULL,                         -- Usuario
+  fecha DATE NOT NULL,                             -- Día del intento
+  fallos INT NOT NULL DEFAULT 0,                   -- Accesos fallidos ese día
+  PRIMARY KEY (id_usuario, fecha)                  -- La ventana es un rango de PK acotado
+) ENGINE=InnoDB;
+
+INSERT INTO fallos_diarios (id_usuario, fecha, fallos)
+SELECT id_usuario, fecha, COUNT(*) FROM accesos
+WHERE exitoso = FALSE AND id_usuario IS NOT NULL AND fecha IS NOT NULL
+GROUP BY id_usuario, fecha;
+
+-- ============================
+-- Resúmenes (rollups) para reportes
+-- ============================
+-- Se mantienen de forma incremental desde los triggers y se pueden
+-- reconstruir con modules/reportes.py (reconstruir_resumenes).
+
+-- Tabla: resumen_accesos_usuario (consultas 1 y 7)
+CREATE TABLE resumen_accesos_usuario (
+  id_usuario INT PRIMARY KEY,                      -- Usuario
+  total INT NOT NULL DEFAULT 0,                    -- Accesos totales
+  exitosos INT NOT NULL DEFAULT 0,                 -- Accesos exitosos
+  fallidos INT NOT NULL DEFAULT 0                  -- Accesos fallidos
+) ENGINE=InnoDB;
+
+INSERT INTO resumen_accesos_usuario (id_usuario, total, exitosos, fallidos)
+SELECT id_usuario, COUNT(*), COALESCE(SUM(exitoso = TRUE), 0), COALESCE(SUM(exitoso = FALSE), 0)
+FROM accesos WHERE id_usuario IS NOT NULL
+GROUP BY id_usuario;
+
+-- Tabla: resumen_accesos_ip (consulta 2)
+CREATE TABLE resumen_accesos_ip (
+  ip VARCHAR(50) PRIMARY KEY,                      -- IP origen ('' si no se informó)
+  total INT NOT NULL DEFAULT 0,                    -- Intentos desde la IP
+  fallidos INT NOT NULL DEFAULT 0,                 -- Fallos desde la IP
+  INDEX idx_resumen_ip_fallidos (fallidos, total)  -- Top de IPs sin ordenar toda la tabla
+) ENGINE=InnoDB;
+
+INSERT INTO resumen_accesos_ip (ip, total, fallidos)
+SELECT COALESCE(ip, ''), COUNT(*), COALESCE(SUM(exitoso = FALSE), 0)
+FROM accesos
+GROUP BY COALESCE(ip, '');
+
+-- Tabla: resumen_accesos_sistema_dia (consulta 3)
+CREATE TABLE resumen_accesos_sistema_dia (
+  fecha DATE NOT NULL,                             -- Día
+  id_sistema INT NOT NULL,                         -- Sistema destino
+  total INT NOT NULL DEFAULT 0,                    -- Accesos del día al sistema
+  exitosos INT NOT NULL DEFAULT 0,                 -- Accesos exitosos
+  PRIMARY KEY (fecha, id_sistema)                  -- Orden natural del reporte
+) ENGINE=InnoDB;
+
+INSERT INTO resumen_accesos_sistema_dia (fecha, id_sistema, total, exitosos)
+SELECT fecha, id_sistema, COUNT(*), COALESCE(SUM(exitoso = TRUE), 0)
+FROM accesos WHERE fecha IS NOT NULL AND id_sistema IS NOT NULL
+GROUP BY fecha, id_sistema;
+
+-- Tabla: resumen_alertas_usuario (consulta 6)
+CREATE TABLE resumen_alertas_usuario (
+  id_usuario INT PRIMARY KEY,                      -- Usuario
+  total INT NOT NULL DEFAULT 0,                    -- Alertas emitidas
+  ultima_fecha DATE                                -- Fecha de la alerta más reciente
+) ENGINE=InnoDB;
+
+INSERT INTO resumen_alertas_usuario (id_usuario, total, ultima_fecha)
+SELECT id_usuario, COUNT(*), MAX(fecha)
+FROM alertas WHERE id_usuario IS NOT NULL
+GROUP BY id_usuario;
+
+-- Tabla: resumen_auditoria (consulta 8)
+CREATE TABLE resumen_auditoria (
+  tabla_afectada VARCHAR(50) NOT NULL,             -- Tabla afectada ('' si no se informó)
+  accion VARCHAR(50) NOT NULL,                     -- Acción ('' si no se informó)
+  total INT NOT NULL DEFAULT 0,                    -- Registros de auditoría
+  PRIMARY KEY (tabla_afectada, accion)
+) ENGINE=InnoDB;
+
+INSERT INTO resumen_auditoria (tabla_afectada, accion, total)
+SELECT COALESCE(tabla_afectada, ''), COALESCE(accion, ''), COUNT(*)
+FROM auditoria
+GROUP BY COALESCE(tabla_afectada, ''), COALESCE(accion, '');
+
 -- Reafirmar base seleccionada antes de rutinas
 USE seguridad_db;
 
@@ -128,10 +250,9 @@ RETURNS INT  -- Devuelve cantidad de accesos fallidos en últimos 'p_dias'
 DETERMINISTIC
 BEGIN
   DECLARE cnt INT;  -- Variable de salida
-  SELECT COUNT(*) INTO cnt
-  FROM accesos
+  SELECT COALESCE(SUM(fallos), 0) INTO cnt  -- Suma de contadores diarios (no recorre accesos)
+  FROM fallos_diarios
   WHERE id_usuario = p_id_usuario
-    AND exitoso = FALSE
     AND fecha >= DATE_SUB(CURDATE(), INTERVAL p_dias DAY);
   RETURN cnt;
 END //
@@ -153,6 +274,27 @@ DELIMITER ;
 -- Procedimientos almacenados
 -- ============================
 
+DROP PROCEDURE IF EXISTS sp_siguiente_id;
+DELIMITER //
+CREATE PROCEDURE sp_siguiente_id(
+  IN p_secuencia VARCHAR(64),
+  IN p_cantidad INT,
+  OUT p_primero INT
+)
+BEGIN
+  -- Reserva p_cantidad IDs consecutivos y devuelve el primero con un único UPDATE atómico
+  -- (mismo esquema que IdAllocator en db.py: sin SELECT ... FOR UPDATE previo ni MAX()).
+  -- La fila queda bloqueada hasta el commit del llamador: quien llama desde un trigger no debe
+  -- reservar IDs de la misma secuencia en otra conexión antes de confirmar.
+  UPDATE secuencias SET siguiente = LAST_INSERT_ID(siguiente + p_cantidad) WHERE nombre = p_secuencia;
+  IF ROW_COUNT() = 0 THEN
+    SET p_primero = NULL;  -- Secuencia inexistente: el INSERT posterior falla por PK nula
+  ELSE
+    SET p_primero = LAST_INSERT_ID() - p_cantidad;  -- En triggers LAST_INSERT_ID se restaura al salir
+  END IF;
+END //
+DELIMITER ;
+
 DROP PROCEDURE IF EXISTS sp_registrar_acceso;
 DELIMITER //
 CREATE PROCEDURE sp_registrar_acceso(
@@ -165,12 +307,14 @@ CREATE PROCEDURE sp_registrar_acceso(
 )
 BEGIN
   DECLARE new_id INT;  -- Próximo ID
-  SELECT COALESCE(MAX(id_acceso),0)+1 INTO new_id FROM accesos;  -- Calcula ID
-  INSERT INTO accesos (id_acceso, id_usuario, fecha, exitoso, ip, id_sistema)
-  VALUES (new_id, p_id_usuario, p_fecha, p_exitoso, p_ip, p_id_sistema);
+  DECLARE aud_id INT;  -- ID de auditoría
+  CALL sp_siguiente_id('accesos', 1, new_id);  -- Reserva ID
+  INSERT INTO accesos (id_acceso, id_usuario, fecha, exitoso, ip, ip_bin, id_sistema)
+  VALUES (new_id, p_id_usuario, p_fecha, p_exitoso, p_ip, INET6_ATON(p_ip), p_id_sistema);  -- NULL si la IP no es válida
 
+  CALL sp_siguiente_id('auditoria', 1, aud_id);
   INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-  SELECT COALESCE(MAX(id_auditoria),0)+1, p_actor, 'INSERT', 'accesos', p_fecha FROM auditoria;
+  VALUES (aud_id, p_actor, 'INSERT', 'accesos', p_fecha);
 
   SELECT new_id AS id_acceso;
 END //
@@ -184,20 +328,25 @@ CREATE PROCEDURE sp_cambiar_estado_usuario(
   IN p_actor VARCHAR(100)
 )
 BEGIN
+  DECLARE v_id INT;  -- ID reservado en secuencias
   UPDATE usuarios SET bloqueado = p_bloqueado WHERE id_usuario = p_id_usuario; -- Aplica cambio de estado
 
+  CALL sp_siguiente_id('auditoria', 1, v_id);
   INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-  SELECT COALESCE(MAX(id_auditoria),0)+1, p_actor, 'UPDATE', 'usuarios', CURDATE() FROM auditoria;
+  VALUES (v_id, p_actor, 'UPDATE', 'usuarios', CURDATE());
 
   IF p_bloqueado THEN
+    CALL sp_siguiente_id('eventos_seguridad', 1, v_id);
     INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha)
-    SELECT COALESCE(MAX(id_evento),0)+1, p_id_usuario, 'Bloqueo', 'Bloqueado por administrador', CURDATE() FROM eventos_seguridad;
+    VALUES (v_id, p_id_usuario, 'Bloqueo', 'Bloqueado por administrador', CURDATE());
 
+    CALL sp_siguiente_id('alertas', 1, v_id);
     INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha)
-    SELECT COALESCE(MAX(id_alerta),0)+1, p_id_usuario, 'Usuario bloqueado por administrador', CURDATE() FROM alertas;
+    VALUES (v_id, p_id_usuario, 'Usuario bloqueado por administrador', CURDATE());
   ELSE
+    CALL sp_siguiente_id('eventos_seguridad', 1, v_id);
     INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha)
-    SELECT COALESCE(MAX(id_evento),0)+1, p_id_usuario, 'Desbloqueo', 'Desbloqueado por administrador', CURDATE() FROM eventos_seguridad;
+    VALUES (v_id, p_id_usuario, 'Desbloqueo', 'Desbloqueado por administrador', CURDATE());
   END IF;
 END //
 DELIMITER ;
@@ -212,11 +361,14 @@ CREATE PROCEDURE sp_crear_evento_seguridad(
   IN p_actor VARCHAR(100)
 )
 BEGIN
+  DECLARE v_id INT;  -- ID reservado en secuencias
+  CALL sp_siguiente_id('eventos_seguridad', 1, v_id);
   INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha)
-  SELECT COALESCE(MAX(id_evento),0)+1, p_id_usuario, p_tipo_evento, p_descripcion, p_fecha FROM eventos_seguridad;
+  VALUES (v_id, p_id_usuario, p_tipo_evento, p_descripcion, p_fecha);
 
+  CALL sp_siguiente_id('auditoria', 1, v_id);
   INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-  SELECT COALESCE(MAX(id_auditoria),0)+1, p_actor, 'INSERT', 'eventos_seguridad', p_fecha FROM auditoria;
+  VALUES (v_id, p_actor, 'INSERT', 'eventos_seguridad', p_fecha);
 END //
 DELIMITER ;
 
@@ -230,38 +382,68 @@ CREATE TRIGGER trg_accesos_after_insert
 AFTER INSERT ON accesos
 FOR EACH ROW
 BEGIN
-  DECLARE fails INT;  -- Cantidad de fallos en ventana de 7 días
+  DECLARE fails INT;   -- Cantidad de fallos en la ventana
+  DECLARE v_max INT;   -- Umbral de bloqueo (parametros_seguridad)
+  DECLARE v_dias INT;  -- Días de la ventana (parametros_seguridad)
+  DECLARE v_id INT;    -- ID reservado en secuencias
   
   -- Auditoría del insert en accesos
+  CALL sp_siguiente_id('auditoria', 1, v_id);
   INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-  SELECT COALESCE(MAX(id_auditoria),0)+1, 'TRIGGER', 'INSERT', 'accesos', NEW.fecha FROM auditoria;
+  VALUES (v_id, 'TRIGGER', 'INSERT', 'accesos', NEW.fecha);
+
+  -- Resúmenes incrementales para reportes (una fila por clave, sin recorrer accesos)
+  IF NEW.id_usuario IS NOT NULL THEN
+    INSERT INTO resumen_accesos_usuario (id_usuario, total, exitosos, fallidos)
+    VALUES (NEW.id_usuario, 1, IF(NEW.exitoso = TRUE, 1, 0), IF(NEW.exitoso = FALSE, 1, 0))
+    ON DUPLICATE KEY UPDATE total = total + 1,
+                            exitosos = exitosos + IF(NEW.exitoso = TRUE, 1, 0),
+                            fallidos = fallidos + IF(NEW.exitoso = FALSE, 1, 0);
+  END IF;
+
+  INSERT INTO resumen_accesos_ip (ip, total, fallidos)
+  VALUES (COALESCE(NEW.ip, ''), 1, IF(NEW.exitoso = FALSE, 1, 0))
+  ON DUPLICATE KEY UPDATE total = total + 1, fallidos = fallidos + IF(NEW.exitoso = FALSE, 1, 0);
 
-  -- Bloqueo automático y alertas si hay >=3 fallos en últimos 7 días
-  IF NEW.exitoso = FALSE THEN
-    SELECT COUNT(*) INTO fails
-    FROM accesos
+  IF NEW.fecha IS NOT NULL AND NEW.id_sistema IS NOT NULL THEN
+    INSERT INTO resumen_accesos_sistema_dia (fecha, id_sistema, total, exitosos)
+    VALUES (NEW.fecha, NEW.id_sistema, 1, IF(NEW.exitoso = TRUE, 1, 0))
+    ON DUPLICATE KEY UPDATE total = total + 1, exitosos = exitosos + IF(NEW.exitoso = TRUE, 1, 0);
+  END IF;
+
+  -- Bloqueo automático y alertas si hay >= v_max fallos en los últimos v_dias días
+  IF NEW.exitoso = FALSE AND NEW.id_usuario IS NOT NULL AND NEW.fecha IS NOT NULL THEN
+    -- Contador incremental: O(1) por acceso, no depende del historial del usuario
+    INSERT INTO fallos_diarios (id_usuario, fecha, fallos) VALUES (NEW.id_usuario, NEW.fecha, 1)
+    ON DUPLICATE KEY UPDATE fallos = fallos + 1;
+
+    SET v_max = COALESCE((SELECT valor FROM parametros_seguridad WHERE clave = 'bloqueo_max_fallos'), 3);
+    SET v_dias = COALESCE((SELECT valor FROM parametros_seguridad WHERE clave = 'bloqueo_ventana_dias'), 7);
+
+    SELECT COALESCE(SUM(fallos), 0) INTO fails  -- A lo sumo v_dias+1 filas por PK
+    FROM fallos_diarios
     WHERE id_usuario = NEW.id_usuario
-      AND exitoso = FALSE
-      AND fecha >= DATE_SUB(NEW.fecha, INTERVAL 7 DAY);
+      AND fecha >= DATE_SUB(NEW.fecha, INTERVAL v_dias DAY);
 
-    IF fails >= 3 THEN
+    IF fails >= v_max THEN
       UPDATE usuarios SET bloqueado = TRUE WHERE id_usuario = NEW.id_usuario;
 
+      CALL sp_siguiente_id('alertas', 1, v_id);
       INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha)
-      SELECT COALESCE(MAX(id_alerta),0)+1, NEW.id_usuario,
-             CONCAT('Bloqueo automático por ', fails, ' intentos fallidos en 7 días'),
-             NEW.fecha
-      FROM alertas;
+      VALUES (v_id, NEW.id_usuario,
+              CONCAT('Bloqueo automático por ', fails, ' intentos fallidos en ', v_dias, ' días'),
+              NEW.fecha);
 
+      CALL sp_siguiente_id('eventos_seguridad', 1, v_id);
       INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha)
-      SELECT COALESCE(MAX(id_evento),0)+1, NEW.id_usuario,
-             'Bloqueo automático',
-             'Usuario bloqueado por intentos fallidos',
-             NEW.fecha
-      FROM eventos_seguridad;
+      VALUES (v_id, NEW.id_usuario,
+              'Bloqueo automático',
+              'Usuario bloqueado por intentos fallidos',
+              NEW.fecha);
 
+      CALL sp_siguiente_id('auditoria', 1, v_id);
       INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-      SELECT COALESCE(MAX(id_auditoria),0)+1, 'TRIGGER', 'UPDATE', 'usuarios', NEW.fecha FROM auditoria;
+      VALUES (v_id, 'TRIGGER', 'UPDATE', 'usuarios', NEW.fecha);
     END IF;
   END IF;
 END //
@@ -273,10 +455,13 @@ CREATE TRIGGER trg_usuarios_after_update
 AFTER UPDATE ON usuarios
 FOR EACH ROW
 BEGIN
+  DECLARE v_id INT;  -- ID reservado en secuencias
   -- Registrar auditoría si cambia bloqueado
-  IF OLD.bloqueado <> NEW.bloqueado THEN
+  -- (las operaciones masivas fijan @omitir_auditoria_trigger y escriben la auditoría en lote)
+  IF OLD.bloqueado <> NEW.bloqueado AND COALESCE(@omitir_auditoria_trigger, 0) = 0 THEN
+    CALL sp_siguiente_id('auditoria', 1, v_id);
     INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-    SELECT COALESCE(MAX(id_auditoria),0)+1, NEW.nombre, 'UPDATE', 'usuarios', CURDATE() FROM auditoria;
+    VALUES (v_id, NEW.nombre, 'UPDATE', 'usuarios', CURDATE());
   END IF;
 END //
 DELIMITER ;
@@ -287,8 +472,31 @@ CREATE TRIGGER trg_alertas_after_insert
 AFTER INSERT ON alertas
 FOR EACH ROW
 BEGIN
+  DECLARE v_id INT;  -- ID reservado en secuencias
+  CALL sp_siguiente_id('auditoria', 1, v_id);
   INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
-  SELECT COALESCE(MAX(id_auditoria),0)+1, 'TRIGGER', 'INSERT', 'alertas', NEW.fecha FROM auditoria;
+  VALUES (v_id, 'TRIGGER', 'INSERT', 'alertas', NEW.fecha);
+
+  -- Resumen incremental de alertas por usuario
+  IF NEW.id_usuario IS NOT NULL THEN
+    INSERT INTO resumen_alertas_usuario (id_usuario, total, ultima_fecha)
+    VALUES (NEW.id_usuario, 1, NEW.fecha)
+    ON DUPLICATE KEY UPDATE total = total + 1,
+                            ultima_fecha = IF(ultima_fecha IS NULL OR NEW.fecha > ultima_fecha, NEW.fecha, ultima_fecha);
+  END IF;
+END //
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_auditoria_after_insert;
+DELIMITER //
+CREATE TRIGGER trg_auditoria_after_insert
+AFTER INSERT ON auditoria
+FOR EACH ROW
+BEGIN
+  -- Resumen incremental de auditoría por tabla y acción
+  INSERT INTO resumen_auditoria (tabla_afectada, accion, total)
+  VALUES (COALESCE(NEW.tabla_afectada, ''), COALESCE(NEW.accion, ''), 1)
+  ON DUPLICATE KEY UPDATE total = total + 1;
 END //
 DELIMITER ;
 
@@ -0,0 +1,357 @@
+-- Esquema para el motor SQLite embebido (DB_BACKEND=sqlite)
+-- Equivale a seguridad_db.sql con todas las migraciones aplicadas, salvo el particionado (sin retención).
+-- backends/sqlite.py lo ejecuta en una transacción al abrir por primera vez una BD vacía.
+-- Para reiniciar los datos de ejemplo basta con borrar el archivo SQLITE_PATH.
+
+-- Tabla: roles
+CREATE TABLE roles (
+  id_rol INTEGER PRIMARY KEY,                      -- Identificador de rol (PK)
+  nombre_rol VARCHAR(50) NOT NULL UNIQUE COLLATE NOCASE, -- Nombre del rol, único (sin distinguir mayúsculas, como MySQL)
+  permisos VARCHAR(255)                            -- CSV de permisos (ej: ver_todo,modificar)
+);
+
+INSERT INTO roles (id_rol, nombre_rol, permisos) VALUES
+  (1, 'admin', 'ver_todo,modificar,bloquear_usuario'),
+  (2, 'auditor', 'ver_todo'),
+  (3, 'usuario', 'ver_propios_accesos');
+
+-- Tabla: usuarios
+CREATE TABLE usuarios (
+  id_usuario INTEGER PRIMARY KEY,                  -- Identificador de usuario (PK)
+  nombre VARCHAR(100) NOT NULL COLLATE NOCASE,     -- Nombre completo (login sin distinguir mayúsculas, como MySQL)
+  rol VARCHAR(50) NOT NULL,                        -- Rol asignado (FK a roles.nombre_rol)
+  bloqueado BOOLEAN DEFAULT FALSE,                 -- Estado de bloqueo
+  password VARCHAR(255) NOT NULL DEFAULT '1234',   -- Contraseña (los usuarios de ejemplo usan la de por defecto)
+  CONSTRAINT fk_rol FOREIGN KEY (rol) REFERENCES roles (nombre_rol) -- Relación a roles
+);
+CREATE INDEX idx_usuarios_nombre ON usuarios (nombre);  -- Login por nombre
+
+INSERT INTO usuarios (id_usuario, nombre, rol, bloqueado) VALUES
+  (1, 'Ana Torres', 'admin', FALSE),
+  (2, 'Jorge Ruiz', 'auditor', FALSE),
+  (3, 'Lucía Pérez', 'usuario', FALSE),
+  (4, 'Carla Gómez', 'usuario', TRUE);
+
+-- Tabla: sistemas
+CREATE TABLE sistemas (
+  id_sistema INTEGER PRIMARY KEY,                  -- Identificador del sistema (PK)
+  nombre_sistema VARCHAR(100) NOT NULL,            -- Nombre del sistema
+  descripcion VARCHAR(255)                         -- Descripción breve
+);
+
+INSERT INTO sistemas (id_sistema, nombre_sistema, descripcion) VALUES
+  (1, 'Intranet Corporativa', 'Acceso interno de empleados'),
+  (2, 'Portal Externo', 'Acceso desde clientes externos'),
+  (3, 'Servidor de Administración', 'Módulo de gestión interna');
+
+-- Tabla: accesos (sin FK, como tras la migración 3 de MySQL)
+CREATE TABLE accesos (
+  id_acceso INTEGER PRIMARY KEY,                   -- Identificador del acceso (PK)
+  id_usuario INT,                                  -- Usuario que intenta acceder
+  fecha DATE,                                      -- Fecha del intento ('YYYY-MM-DD')
+  exitoso BOOLEAN,                                 -- Resultado (TRUE/FALSE)
+  ip VARCHAR(50),                                  -- IP origen
+  ip_bin BLOB,                                     -- IP empaquetada (INET6_ATON): 4 bytes IPv4, 16 bytes IPv6
+  id_sistema INT                                   -- Sistema destino
+);
+CREATE INDEX idx_accesos_usuario ON accesos (id_usuario, id_acceso);                -- accesos_por_usuario
+CREATE INDEX idx_accesos_usuario_fallos ON accesos (id_usuario, exitoso, fecha);    -- Consultas 1/7/9
+CREATE INDEX idx_accesos_ip ON accesos (ip, exitoso);                               -- Top IPs
+CREATE INDEX idx_accesos_sistema_fecha ON accesos (id_sistema, fecha, exitoso);     -- Por sistema y día
+CREATE INDEX idx_accesos_ip_bin ON accesos (ip_bin, exitoso);                       -- Rangos CIDR y agregación por subred
+
+INSERT INTO accesos (id_acceso, id_usuario, fecha, exitoso, ip, ip_bin, id_sistema) VALUES
+  (1, 1, '2025-09-25', TRUE,  '192.168.1.2',  X'C0A80102', 1),
+  (2, 2, '2025-09-25', FALSE, '10.0.0.5',     X'0A000005', 1),
+  (3, 2, '2025-09-26', TRUE,  '10.0.0.5',     X'0A000005', 2),
+  (4, 3, '2025-09-26', FALSE, '192.168.1.10', X'C0A8010A', 2),
+  (5, 4, '2025-09-27', FALSE, '192.168.1.15', X'C0A8010F', 3);
+
+-- Tabla: eventos_seguridad
+CREATE TABLE eventos_seguridad (
+  id_evento INTEGER PRIMARY KEY,                   -- Identificador del evento (PK)
+  id_usuario INT,                                  -- Usuario asociado (FK)
+  tipo_evento VARCHAR(100),                        -- Tipo (Bloqueo, Intento fallido, etc.)
+  descripcion VARCHAR(255),                        -- Detalle del evento
+  fecha DATE,                                      -- Fecha del evento
+  CONSTRAINT fk_evento_usuario FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario) -- Relación a usuarios
+);
+CREATE INDEX idx_eventos_usuario ON eventos_seguridad (id_usuario, id_evento);      -- eventos_por_usuario
+
+INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha) VALUES
+  (1, 4, 'Bloqueo automático', 'Usuario bloqueado por 3 intentos fallidos', '2025-09-27'),
+  (2, 2, 'Intento fallido', 'Acceso fallido desde IP sospechosa', '2025-09-25'),
+  (3, 3, 'Desbloqueo', 'Usuario reactivado por administrador', '2025-09-28');
+
+-- Tabla: auditoria
+CREATE TABLE auditoria (
+  id_auditoria INTEGER PRIMARY KEY,                -- Identificador de auditoría (PK)
+  usuario VARCHAR(100),                            -- Actor (usuario o 'TRIGGER')
+  accion VARCHAR(50),                              -- Acción (INSERT/UPDATE/DELETE/LOGIN)
+  tabla_afectada VARCHAR(50),                      -- Tabla afectada
+  fecha DATE                                       -- Fecha del registro
+);
+CREATE INDEX idx_auditoria_tabla_accion ON auditoria (tabla_afectada, accion);      -- Resumen de auditoría
+
+INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha) VALUES
+  (1, 'Ana Torres', 'INSERT', 'accesos', '2025-09-25'),
+  (2, 'Jorge Ruiz', 'UPDATE', 'usuarios', '2025-09-26'),
+  (3, 'Ana Torres', 'DELETE', 'eventos_seguridad', '2025-09-28');
+
+-- Tabla: alertas
+CREATE TABLE alertas (
+  id_alerta INTEGER PRIMARY KEY,                   -- Identificador de alerta (PK)
+  id_usuario INT,                                  -- Usuario asociado (FK)
+  mensaje VARCHAR(255),                            -- Mensaje descriptivo
+  fecha DATE,                                      -- Fecha de emisión
+  CONSTRAINT fk_alerta_usuario FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario) -- Relación a usuarios
+);
+CREATE INDEX idx_alertas_usuario ON alertas (id_usuario, id_alerta);                -- alertas_por_usuario
+
+INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha) VALUES
+  (1, 4, 'Usuario bloqueado por múltiples intentos fallidos', '2025-09-27'),
+  (2, 2, 'IP sospechosa detectada (10.0.0.5)', '2025-09-25'),
+  (3, 3, 'Desbloqueo exitoso registrado', '2025-09-28');
+
+-- Tabla: secuencias (asignación de IDs sin MAX()+1, compartida con los triggers)
+CREATE TABLE secuencias (
+  nombre VARCHAR(64) PRIMARY KEY,                  -- Tabla a la que pertenece la secuencia
+  siguiente INT NOT NULL                           -- Próximo ID libre (los bloques se reservan sumando)
+);
+
+INSERT INTO secuencias (nombre, siguiente)
+SELECT 'usuarios', COALESCE(MAX(id_usuario), 0) + 1 FROM usuarios
+UNION ALL SELECT 'accesos', COALESCE(MAX(id_acceso), 0) + 1 FROM accesos
+UNION ALL SELECT 'eventos_seguridad', COALESCE(MAX(id_evento), 0) + 1 FROM eventos_seguridad
+UNION ALL SELECT 'auditoria', COALESCE(MAX(id_auditoria), 0) + 1 FROM auditoria
+UNION ALL SELECT 'alertas', COALESCE(MAX(id_alerta), 0) + 1 FROM alertas;
+
+-- Tabla: parametros_seguridad (reglas configurables leídas por los triggers)
+CREATE TABLE parametros_seguridad (
+  clave VARCHAR(64) PRIMARY KEY,                   -- Nombre del parámetro
+  valor INT NOT NULL                               -- Valor entero
+);
+
+INSERT INTO parametros_seguridad (clave, valor) VALUES
+  ('bloqueo_max_fallos', 3),
+  ('bloqueo_ventana_dias', 7);
+
+-- Tabla: fallos_diarios (contador incremental de accesos fallidos por usuario y día)
+CREATE TABLE fallos_diarios (
+  id_usuario INT NOT NULL,                         -- Usuario
+  fecha DATE NOT NULL,                             -- Día del intento
+  fallos INT NOT NULL DEFAULT 0,                   -- Accesos fallidos ese día
+  PRIMARY KEY (id_usuario, fecha)                  -- La ventana es un rango de PK acotado
+);
+
+INSERT INTO fallos_diarios (id_usuario, fecha, fallos)
+SELECT id_usuario, fecha, COUNT(*) FROM accesos
+WHERE exitoso = FALSE AND id_usuario IS NOT NULL AND fecha IS NOT NULL
+GROUP BY id_usuario, fecha;
+
+-- Tabla: variables_sesion (equivalente de las variables @ de MySQL)
+-- backends/sqlite.py traduce 'SET @var = v' a una fila aquí; como SQLite admite un solo
+-- escritor, la fila solo la ve la transacción que la escribe (se borra con 'SET @var = NULL').
+CREATE TABLE variables_sesion (
+  nombre VARCHAR(64) PRIMARY KEY,                  -- Nombre de la variable (sin '@')
+  valor                                            -- Valor de cualquier tipo
+);
+
+-- Tabla: bloqueos_pendientes (cola interna del bloqueo automático)
+-- trg_accesos_after_insert deja aquí una fila cuando se supera el umbral; su trigger aplica
+-- el bloqueo (alerta, evento y auditoría) y la borra. Siempre está vacía fuera de un INSERT.
+CREATE TABLE bloqueos_pendientes (
+  id_usuario INT NOT NULL,                         -- Usuario a bloquear
+  fecha DATE NOT NULL,                             -- Fecha del acceso que superó el umbral
+  fallos INT NOT NULL,                             -- Fallos en la ventana
+  dias INT NOT NULL                                -- Días de la ventana
+);
+
+-- ============================
+-- Resúmenes (rollups) para reportes
+-- ============================
+
+-- Tabla: resumen_accesos_usuario (consultas 1 y 7)
+CREATE TABLE resumen_accesos_usuario (
+  id_usuario INTEGER PRIMARY KEY,                  -- Usuario
+  total INT NOT NULL DEFAULT 0,                    -- Accesos totales
+  exitosos INT NOT NULL DEFAULT 0,                 -- Accesos exitosos
+  fallidos INT NOT NULL DEFAULT 0                  -- Accesos fallidos
+);
+
+INSERT INTO resumen_accesos_usuario (id_usuario, total, exitosos, fallidos)
+SELECT id_usuario, COUNT(*), COALESCE(SUM(exitoso = TRUE), 0), COALESCE(SUM(exitoso = FALSE), 0)
+FROM accesos WHERE id_usuario IS NOT NULL
+GROUP BY id_usuario;
+
+-- Tabla: resumen_accesos_ip (consulta 2)
+CREATE TABLE resumen_accesos_ip (
+  ip VARCHAR(50) PRIMARY KEY,                      -- IP origen ('' si no se informó)
+  total INT NOT NULL DEFAULT 0,                    -- Intentos desde la IP
+  fallidos INT NOT NULL DEFAULT 0                  -- Fallos desde la IP
+);
+CREATE INDEX idx_resumen_ip_fallidos ON resumen_accesos_ip (fallidos, total);       -- Top de IPs sin ordenar toda la tabla
+
+INSERT INTO resumen_accesos_ip (ip, total, fallidos)
+SELECT COALESCE(ip, ''), COUNT(*), COALESCE(SUM(exitoso = FALSE), 0)
+FROM accesos
+GROUP BY COALESCE(ip, '');
+
+-- Tabla: resumen_accesos_sistema_dia (consulta 3)
+CREATE TABLE resumen_accesos_sistema_dia (
+  fecha DATE NOT NULL,                             -- Día
+  id_sistema INT NOT NULL,                         -- Sistema destino
+  total INT NOT NULL DEFAULT 0,                    -- Accesos del día al sistema
+  exitosos INT NOT NULL DEFAULT 0,                 -- Accesos exitosos
+  PRIMARY KEY (fecha, id_sistema)                  -- Orden natural del reporte
+);
+
+INSERT INTO resumen_accesos_sistema_dia (fecha, id_sistema, total, exitosos)
+SELECT fecha, id_sistema, COUNT(*), COALESCE(SUM(exitoso = TRUE), 0)
+FROM accesos WHERE fecha IS NOT NULL AND id_sistema IS NOT NULL
+GROUP BY fecha, id_sistema;
+
+-- Tabla: resumen_alertas_usuario (consulta 6)
+CREATE TABLE resumen_alertas_usuario (
+  id_usuario INTEGER PRIMARY KEY,                  -- Usuario
+  total INT NOT NULL DEFAULT 0,                    -- Alertas emitidas
+  ultima_fecha DATE                                -- Fecha de la alerta más reciente
+);
+
+INSERT INTO resumen_alertas_usuario (id_usuario, total, ultima_fecha)
+SELECT id_usuario, COUNT(*), MAX(fecha)
+FROM alertas WHERE id_usuario IS NOT NULL
+GROUP BY id_usuario;
+
+-- Tabla: resumen_auditoria (consulta 8)
+CREATE TABLE resumen_auditoria (
+  tabla_afectada VARCHAR(50) NOT NULL,             -- Tabla afectada ('' si no se informó)
+  accion VARCHAR(50) NOT NULL,                     -- Acción ('' si no se informó)
+  total INT NOT NULL DEFAULT 0,                    -- Registros de auditoría
+  PRIMARY KEY (tabla_afectada, accion)
+);
+
+INSERT INTO resumen_auditoria (tabla_afectada, accion, total)
+SELECT COALESCE(tabla_afectada, ''), COALESCE(accion, ''), COUNT(*)
+FROM auditoria
+GROUP BY COALESCE(tabla_afectada, ''), COALESCE(accion, '');
+
+-- ============================
+-- Triggers / Automatización
+-- ============================
+-- Mismo comportamiento que los triggers de seguridad_db.sql. SQLite no tiene variables ni
+-- procedimientos: los IDs salen de 'secuencias' con UPDATE + subconsulta (como sp_siguiente_id)
+-- y los condicionales se expresan con WHERE/WHEN. Solo usan funciones nativas de SQLite.
+
+CREATE TRIGGER trg_accesos_after_insert
+AFTER INSERT ON accesos
+FOR EACH ROW
+BEGIN
+  -- Auditoría del insert en accesos
+  UPDATE secuencias SET siguiente = siguiente + 1 WHERE nombre = 'auditoria';
+  INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
+  VALUES ((SELECT siguiente - 1 FROM secuencias WHERE nombre = 'auditoria'), 'TRIGGER', 'INSERT', 'accesos', NEW.fecha);
+
+  -- Resúmenes incrementales para reportes (una fila por clave, sin recorrer accesos)
+  INSERT INTO resumen_accesos_usuario (id_usuario, total, exitosos, fallidos)
+  SELECT NEW.id_usuario, 1, iif(NEW.exitoso = TRUE, 1, 0), iif(NEW.exitoso = FALSE, 1, 0)
+  WHERE NEW.id_usuario IS NOT NULL
+  ON CONFLICT (id_usuario) DO UPDATE SET total = total + 1,
+                                         exitosos = exitosos + excluded.exitosos,
+                                         fallidos = fallidos + excluded.fallidos;
+
+  INSERT INTO resumen_accesos_ip (ip, total, fallidos)
+  VALUES (COALESCE(NEW.ip, ''), 1, iif(NEW.exitoso = FALSE, 1, 0))
+  ON CONFLICT (ip) DO UPDATE SET total = total + 1, fallidos = fallidos + excluded.fallidos;
+
+  INSERT INTO resumen_accesos_sistema_dia (fecha, id_sistema, total, exitosos)
+  SELECT NEW.fecha, NEW.id_sistema, 1, iif(NEW.exitoso = TRUE, 1, 0)
+  WHERE NEW.fecha IS NOT NULL AND NEW.id_sistema IS NOT NULL
+  ON CONFLICT (fecha, id_sistema) DO UPDATE SET total = total + 1, exitosos = exitosos + excluded.exitosos;
+
+  -- Contador incremental de fallos: O(1) por acceso, no depende del historial del usuario
+  INSERT INTO fallos_diarios (id_usuario, fecha, fallos)
+  SELECT NEW.id_usuario, NEW.fecha, 1
+  WHERE NEW.exitoso = FALSE AND NEW.id_usuario IS NOT NULL AND NEW.fecha IS NOT NULL
+  ON CONFLICT (id_usuario, fecha) DO UPDATE SET fallos = fallos + 1;
+
+  -- Bloqueo automático si hay >= bloqueo_max_fallos fallos en los últimos bloqueo_ventana_dias días
+  INSERT INTO bloqueos_pendientes (id_usuario, fecha, fallos, dias)
+  SELECT NEW.id_usuario, NEW.fecha, v.fallos, v.dias
+  FROM (
+    SELECT p.max_fallos, p.dias,
+           (SELECT COALESCE(SUM(fd.fallos), 0) FROM fallos_diarios AS fd  -- A lo sumo dias+1 filas por PK
+            WHERE fd.id_usuario = NEW.id_usuario
+              AND fd.fecha >= date(NEW.fecha, '-' || p.dias || ' days')) AS fallos
+    FROM (SELECT COALESCE((SELECT valor FROM parametros_seguridad WHERE clave = 'bloqueo_max_fallos'), 3) AS max_fallos,
+                 COALESCE((SELECT valor FROM parametros_seguridad WHERE clave = 'bloqueo_ventana_dias'), 7) AS dias) AS p
+  ) AS v
+  WHERE NEW.exitoso = FALSE AND NEW.id_usuario IS NOT NULL AND NEW.fecha IS NOT NULL
+    AND v.fallos >= v.max_fallos;
+END;
+
+CREATE TRIGGER trg_bloqueos_pendientes_after_insert
+AFTER INSERT ON bloqueos_pendientes
+FOR EACH ROW
+BEGIN
+  UPDATE usuarios SET bloqueado = TRUE WHERE id_usuario = NEW.id_usuario;
+
+  UPDATE secuencias SET siguiente = siguiente + 1 WHERE nombre = 'alertas';
+  INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha)
+  VALUES ((SELECT siguiente - 1 FROM secuencias WHERE nombre = 'alertas'), NEW.id_usuario,
+          'Bloqueo automático por ' || NEW.fallos || ' intentos fallidos en ' || NEW.dias || ' días',
+          NEW.fecha);
+
+  UPDATE secuencias SET siguiente = siguiente + 1 WHERE nombre = 'eventos_seguridad';
+  INSERT INTO eventos_seguridad (id_evento, id_usuario, tipo_evento, descripcion, fecha)
+  VALUES ((SELECT siguiente - 1 FROM secuencias WHERE nombre = 'eventos_seguridad'), NEW.id_usuario,
+          'Bloqueo automático',
+          'Usuario bloqueado por intentos fallidos',
+          NEW.fecha);
+
+  UPDATE secuencias SET siguiente = siguiente + 1 WHERE nombre = 'auditoria';
+  INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
+  VALUES ((SELECT siguiente - 1 FROM secuencias WHERE nombre = 'auditoria'), 'TRIGGER', 'UPDATE', 'usuarios', NEW.fecha);
+
+  DELETE FROM bloqueos_pendientes WHERE rowid = NEW.rowid;  -- Cola interna: no guarda historial
+END;
+
+-- Registrar auditoría si cambia bloqueado
+-- (las operaciones masivas fijan @omitir_auditoria_trigger y escriben la auditoría en lote)
+CREATE TRIGGER trg_usuarios_after_update
+AFTER UPDATE OF bloqueado ON usuarios
+FOR EACH ROW
+WHEN OLD.bloqueado <> NEW.bloqueado
+  AND NOT EXISTS (SELECT 1 FROM variables_sesion WHERE nombre = 'omitir_auditoria_trigger' AND COALESCE(valor, 0) <> 0)
+BEGIN
+  UPDATE secuencias SET siguiente = siguiente + 1 WHERE nombre = 'auditoria';
+  INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
+  VALUES ((SELECT siguiente - 1 FROM secuencias WHERE nombre = 'auditoria'), NEW.nombre, 'UPDATE', 'usuarios', date('now', 'localtime'));
+END;
+
+CREATE TRIGGER trg_alertas_after_insert
+AFTER INSERT ON alertas
+FOR EACH ROW
+BEGIN
+  UPDATE secuencias SET siguiente = siguiente + 1 WHERE nombre = 'auditoria';
+  INSERT INTO auditoria (id_auditoria, usuario, accion, tabla_afectada, fecha)
+  VALUES ((SELECT siguiente - 1 FROM secuencias WHERE nombre = 'auditoria'), 'TRIGGER', 'INSERT', 'alertas', NEW.fecha);
+
+  -- Resumen incremental de alertas por usuario
+  INSERT INTO resumen_alertas_usuario (id_usuario, total, ultima_fecha)
+  SELECT NEW.id_usuario, 1, NEW.fecha
+  WHERE NEW.id_usuario IS NOT NULL
+  ON CONFLICT (id_usuario) DO UPDATE SET total = total + 1,
+                                         ultima_fecha = iif(ultima_fecha IS NULL OR excluded.ultima_fecha > ultima_fecha,
+                                                            excluded.ultima_fecha, ultima_fecha);
+END;
+
+CREATE TRIGGER trg_auditoria_after_insert
+AFTER INSERT ON auditoria
+FOR EACH ROW
+BEGIN
+  -- Resumen incremental de auditoría por tabla y acción
+  INSERT INTO resumen_auditoria (tabla_afectada, accion, total)
+  VALUES (COALESCE(NEW.tabla_afectada, ''), COALESCE(NEW.accion, ''), 1)
+  ON CONFLICT (tabla_afectada, accion) DO UPDATE SET total = total + 1;
+END;
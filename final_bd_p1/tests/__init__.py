@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Pruebas sobre el motor SQLite embebido (sin servidor MySQL):
+- Fija DB_BACKEND=sqlite con una BD temporal (':memory:') antes de que se importe config
+- La BD se crea con scripts_sql/seguridad_sqlite.sql y la comparten todas las pruebas del proceso
+Correr desde final_bd_p1:
+    python -m unittest discover -s tests -t .
+    python -m pytest tests
+"""  # Docstring: cómo correr las pruebas
+
+import os  # Variables de entorno que lee config
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = ":memory:"
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Exportación incremental con marca de agua: lo escrito después de una corrida sale en la siguiente.
+"""  # Docstring de módulo: qué se prueba
+
+import json      # Lectura de la salida JSONL
+import os        # Rutas temporales
+import tempfile  # Carpeta de salida
+import unittest  # Framework de pruebas
+
+from db import Watermark  # Marca de agua con huecos
+from modules import auditoria, consultas, seguridad  # Escrituras de la app y de los triggers
+from modules.exportacion import exportar_tabla  # Función bajo prueba
+
+
+class ExportacionIncrementalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        seguridad.configurar_regla_bloqueo(1000, 7, "test")  # Sin bloqueos automáticos de por medio
+
+    def _exportar(self, tabla: str, marca: Watermark) -> list:
+        """Exporta lo nuevo de 'tabla' según 'marca' y devuelve las filas escritas."""
+        ruta = os.path.join(self.dir.name, f"{tabla}.jsonl")
+        exportar_tabla(tabla, ruta, formato="jsonl", marca=marca)
+        with open(ruta, encoding="utf-8") as f:
+            return [json.loads(linea) for linea in f]
+
+    def test_filas_de_la_app_despues_de_filas_de_triggers(self):
+        # Cada acceso fallido hace que los triggers escriban auditoría; la app escribe la suya
+        consultas.crear_alerta(1, "antes del primer export", "test")
+        consultas.registrar_acceso(3, False, "10.9.9.9", 1, "test")
+        auditoria.flush_auditoria()
+        marca_auditoria = Watermark(ttl=0)  # Sin recuperar huecos: solo cuenta el orden de los IDs
+        marca_alertas = Watermark(ttl=0)
+        self._exportar("auditoria", marca_auditoria)
+        self._exportar("alertas", marca_alertas)
+
+        consultas.registrar_acceso(3, False, "10.9.9.9", 1, "test")  # Triggers primero...
+        id_alerta = consultas.crear_alerta(1, "después del primer export", "test")  # ...la app después
+        auditoria.flush_auditoria()
+
+        alertas = self._exportar("alertas", marca_alertas)
+        self.assertEqual([a["id_alerta"] for a in alertas], [id_alerta])
+        filas = self._exportar("auditoria", marca_auditoria)
+        de_la_app = [f for f in filas if f["usuario"] == "test" and f["tabla_afectada"] == "alertas"]
+        de_triggers = [f for f in filas if f["usuario"] == "TRIGGER" and f["tabla_afectada"] == "accesos"]
+        self.assertEqual(len(de_la_app), 1)
+        self.assertTrue(de_triggers)
+        self.assertGreater(de_la_app[0]["id_auditoria"], max(f["id_auditoria"] for f in de_triggers))
+
+        self.assertEqual(self._exportar("auditoria", marca_auditoria), [])  # Nada nuevo: no repite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Modo en vivo: el poller entrega las filas de la app escritas después de filas de triggers,
+y las que confirma tarde una transacción que ya tenía su ID reservado al suscribirse.
+"""  # Docstring de módulo: qué se prueba
+
+import threading  # Espera de las entregas del poller
+import time       # Plazo de espera
+import unittest   # Framework de pruebas
+
+from db import db_connection, db_cursor, next_id  # Inserción directa con un ID reservado
+from modules import consultas, seguridad  # Escrituras de la app y de los triggers
+from modules.monitor import Monitor  # Clase bajo prueba
+
+
+class MonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        seguridad.configurar_regla_bloqueo(1000, 7, "test")  # Sin bloqueos automáticos de por medio
+        self.monitor = Monitor(intervalo=0.02)
+        self.addCleanup(self.monitor.detener)
+        self.recibidas = []
+        self.llegaron = threading.Condition()
+
+    def _recibir(self, tabla, filas):
+        with self.llegaron:
+            self.recibidas.extend((tabla, f) for f in filas)
+            self.llegaron.notify_all()
+
+    def _esperar(self, condicion, plazo: float = 5.0) -> None:
+        limite = time.monotonic() + plazo
+        with self.llegaron:
+            while not condicion() and time.monotonic() < limite:
+                self.llegaron.wait(0.05)
+
+    def _ids(self, tabla: str, pk: str) -> list:
+        return [f[pk] for t, f in self.recibidas if t == tabla]
+
+    def test_filas_de_la_app_despues_de_filas_de_triggers(self):
+        self.monitor.suscribir(self._recibir, ["alertas", "auditoria"])
+        consultas.registrar_acceso(3, False, "10.8.8.8", 1, "test")  # Triggers: auditoría de 'accesos'
+        ids = [consultas.crear_alerta(1, f"app {i}", "test") for i in range(2)]
+        self._esperar(lambda: len(self._ids("alertas", "id_alerta")) >= 2)
+        self.assertEqual(self._ids("alertas", "id_alerta"), ids)
+        self._esperar(lambda: sum(f["usuario"] == "test" for t, f in self.recibidas if t == "auditoria") >= 3)
+        de_la_app = [f for t, f in self.recibidas if t == "auditoria" and f["usuario"] == "test"]
+        self.assertEqual(sorted(f["tabla_afectada"] for f in de_la_app), ["accesos", "alertas", "alertas"])
+
+    def test_id_reservado_antes_de_suscribirse_y_confirmado_despues(self):
+        reservado = next_id("alertas", "id_alerta")  # Transacción "en vuelo": ID tomado, fila sin confirmar
+        posterior = consultas.crear_alerta(1, "confirmada antes de suscribirse", "test")
+        self.assertGreater(posterior, reservado)
+        self.monitor.suscribir(self._recibir, ["alertas"])
+        with db_connection() as conn:
+            with db_cursor(conn) as cur:  # Se confirma ahora, por debajo de la marca inicial
+                cur.execute(
+                    "INSERT INTO alertas (id_alerta, id_usuario, mensaje, fecha) VALUES (%s, %s, %s, CURDATE())",
+                    (reservado, 1, "confirmada tarde"),
+                )
+        self._esperar(lambda: reservado in self._ids("alertas", "id_alerta"))
+        self.assertEqual(self._ids("alertas", "id_alerta"), [reservado])  # La ya confirmada no se repite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-  # Codificación del archivo fuente
+"""
+Traducción del dialecto MySQL en el motor SQLite: la aritmética con '/' no cambia de significado
+y da lo mismo que en MySQL (contra un servidor real si hay uno configurado y accesible).
+"""  # Docstring de módulo: qué se prueba
+
+import unittest  # Framework de pruebas
+from decimal import Decimal  # Resultados DECIMAL de MySQL
+
+from backends import cargar  # Motor MySQL para comparar
+from backends.sqlite import _traducir  # Traducción bajo prueba
+from db import db_connection, db_cursor  # Consultas sobre el motor de las pruebas (SQLite)
+
+# Expresiones con '/', con el resultado que da MySQL
+DIVISIONES = [
+    ("ROUND(100.0 * %s / NULLIF(%s, 0), 2)", (2, 3), Decimal("66.67")),  # Porcentajes de modules/reportes.py
+    ("ROUND(100.0 * %s / NULLIF(%s, 0), 2)", (5, 0), None),
+    ("(10 - 4) / 2.0", (), Decimal("3.0")),
+    ("7 / 2.0 * 2", (), Decimal("7.0")),
+]
+
+
+def _evaluar(conn, expresion: str, params: tuple):
+    with db_cursor(conn) as cur:
+        cur.execute(f"SELECT {expresion} AS v", params)
+        return cur.fetchone()["v"]
+
+
+def _conexion_mysql():
+    """Conexión al MySQL configurado, o None si el driver o el servidor no están."""
+    try:
+        motor = cargar("mysql")
+        return motor.connect()
+    except Exception:
+        return None
+
+
+class DivisionTest(unittest.TestCase):
+
+    def test_traduccion_no_reescribe_la_division(self):
+        sql, _ = _traducir("SELECT a / b, 'x/y' FROM t /* a/b */ WHERE c = %s -- a/b", True)
+        self.assertEqual(sql, "SELECT a / b, 'x/y' FROM t /* a/b */ WHERE c = ? -- a/b")
+
+    def test_sqlite_da_el_resultado_de_mysql(self):
+        with db_connection() as conn:
+            for expresion, params, esperado in DIVISIONES:
+                with self.subTest(expresion=expresion, params=params):
+                    valor = _evaluar(conn, expresion, params)
+                    self.assertEqual(None if valor is None else Decimal(str(valor)), esperado)
+
+    def test_mismo_resultado_en_ambos_motores(self):
+        mysql_conn = _conexion_mysql()
+        if mysql_conn is None:
+            self.skipTest("Sin MySQL accesible (MYSQL_HOST/MYSQL_USER/...)")
+        try:
+            with db_connection() as conn:
+                for expresion, params, _ in DIVISIONES:
+                    with self.subTest(expresion=expresion, params=params):
+                        en_sqlite = _evaluar(conn, expresion, params)
+                        en_mysql = _evaluar(mysql_conn, expresion, params)
+                        self.assertEqual(None if en_sqlite is None else Decimal(str(en_sqlite)), en_mysql)
+        finally:
+            mysql_conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()